@@ -1,12 +1,454 @@
-from fastapi import FastAPI
-from fastapi.responses import JSONResponse
-from fastapi import FastAPI, Request, HTTPException
+import asyncio
+import math
+import os
+import threading
+import time
+import warnings
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Any
+import numpy as np
+import orjson
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, Response
+from settings import (
+    PERSIST_DIR,
+    PERSIST_FLUSH_INTERVAL,
+    PERSIST_ROTATE_INTERVAL,
+    PERSIST_ROTATE_ROWS,
+    PERSIST_ROW_GROUP_SIZE,
+)
+
+# Fixed-width record of the 'binary' encoding of the generators, see
+# 'encoders.py' of the genserver
+BINARY_DTYPE = np.dtype(
+    [
+        ("timestamp", "<i8"),
+        ("latitude", "<f8"),
+        ("longitude", "<f8"),
+        ("elevation", "<f8"),
+        ("identifier", "S32"),
+    ]
+)
+
+
+class RunningStats:
+    """Count, mean, standard deviation, minimum and maximum of a stream of
+    values, updated a batch of values at a time without keeping them."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        # Sum of the squared deviations from the mean
+        self._m2 = 0.0
+        self.minimum = math.inf
+        self.maximum = -math.inf
+
+    def add(self, values: np.ndarray) -> None:
+        if len(values) == 0:
+            return
+        # Combine the statistics of the batch with those so far (Chan et al.)
+        count = len(values)
+        mean = float(np.add.reduce(values)) / count
+        deviations = values - mean
+        m2 = float(np.dot(deviations, deviations))
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self._m2 += m2 + delta**2 * self.count * count / total
+        self.count = total
+        self.minimum = min(self.minimum, float(np.minimum.reduce(values)))
+        self.maximum = max(self.maximum, float(np.maximum.reduce(values)))
+
+    def add_value(self, value: float) -> None:
+        # Update the statistics by a single value (Welford), without the
+        # overhead of an array
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        self.minimum = min(self.minimum, value)
+        self.maximum = max(self.maximum, value)
+
+    def summary(self) -> dict[str, Any]:
+        if self.count == 0:
+            return {"count": 0, "mean": None, "std": None, "min": None, "max": None}
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "std": math.sqrt(self._m2 / self.count),
+            "min": self.minimum,
+            "max": self.maximum,
+        }
+
+
+class GeneratorStats:
+    """Ingestion statistics of the datapoints of a generator: the time
+    between its requests, the latency of its datapoints, i.e. their arrival
+    time minus their timestamp, and the number of datapoints that arrived
+    with a timestamp before that of an earlier datapoint."""
+
+    def __init__(self):
+        self.requests = 0
+        self.datapoints = 0
+        self.out_of_order = 0
+        self.first_arrival = None
+        self.last_arrival = None
+        self.last_timestamp = None
+        self.inter_arrival = RunningStats()
+        self.latency = RunningStats()
+
+    def add(self, arrival: float, timestamps: np.ndarray) -> None:
+        # 'arrival' in seconds and 'timestamps' in microseconds since the Unix
+        # epoch
+        if self.last_arrival is None:
+            self.first_arrival = arrival
+        else:
+            self.inter_arrival.add_value(arrival - self.last_arrival)
+        self.last_arrival = arrival
+        self.requests += 1
+        self.datapoints += len(timestamps)
+        self.latency.add(arrival - timestamps / 1e6)
+        if self.last_timestamp is not None and timestamps[0] < self.last_timestamp:
+            self.out_of_order += 1
+        if len(timestamps) > 1:
+            self.out_of_order += int(np.count_nonzero(timestamps[1:] < timestamps[:-1]))
+        self.last_timestamp = timestamps[-1]
+
+    def summary(self) -> dict[str, Any]:
+        duration = (self.last_arrival or 0.0) - (self.first_arrival or 0.0)
+        return {
+            "requests": self.requests,
+            "datapoints": self.datapoints,
+            "datapoints_per_second": (
+                self.datapoints / duration if duration > 0 else None
+            ),
+            "out_of_order": self.out_of_order,
+            "inter_arrival": self.inter_arrival.summary(),
+            "latency": self.latency.summary(),
+        }
+
+
+class IngestionStats:
+    """Ingestion statistics of all generators, see `GeneratorStats`."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.start = time.time()
+        self.requests = 0
+        self.datapoints = 0
+        self.rejected = 0
+        self.generators: dict[str, GeneratorStats] = dict()
+
+    def add(self, arrival: float, identifiers: np.ndarray, timestamps: np.ndarray):
+        self.requests += 1
+        self.datapoints += len(identifiers)
+        # A batch usually holds the datapoints of a single generator
+        if (identifiers == identifiers[0]).all():
+            groups = [(identifiers[0], timestamps)]
+        else:
+            names, inverse = np.unique(identifiers, return_inverse=True)
+            groups = [(name, timestamps[inverse == i]) for i, name in enumerate(names)]
+        for identifier, group_timestamps in groups:
+            if identifier not in self.generators:
+                self.generators[identifier] = GeneratorStats()
+            self.generators[identifier].add(arrival, group_timestamps)
+
+    def summary(self) -> dict[str, Any]:
+        duration = time.time() - self.start
+        return {
+            "uptime": duration,
+            "requests": self.requests,
+            "datapoints": self.datapoints,
+            "datapoints_per_second": (
+                self.datapoints / duration if duration > 0 else None
+            ),
+            "rejected": self.rejected,
+            "generators": {
+                identifier: stats.summary()
+                for identifier, stats in self.generators.items()
+            },
+        }
+
+
+class RotatingParquetWriter:
+    """Writer of the received datapoints to Parquet files in a directory
+    (requires `pyarrow`). Datapoints are buffered and written as a row group
+    once `row_group_size` datapoints are buffered, or once the oldest has
+    waited `flush_interval` seconds. A new file is started once the current
+    file holds `rotate_rows` datapoints or has been open for
+    `rotate_interval` seconds, so that completed files can be read while the
+    conserver runs.
+
+    > *Input arguments*
+
+    * `directory` (*type:* `str`): Directory of the files
+    * `row_group_size` (*type:* `int`): Number of datapoints buffered before they are written
+    * `rotate_rows` (*type:* `int`): Maximum number of datapoints in a file
+    * `rotate_interval` (*type:* `float`): Maximum number of seconds a file is written to
+    * `flush_interval` (*type:* `float`): Maximum number of seconds datapoints are buffered
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        row_group_size: int,
+        rotate_rows: int,
+        rotate_interval: float,
+        flush_interval: float,
+    ):
+        import pyarrow
+        import pyarrow.parquet
+
+        self._pyarrow = pyarrow
+        self._schema = pyarrow.schema(
+            [
+                ("latitude", pyarrow.float64()),
+                ("longitude", pyarrow.float64()),
+                ("elevation", pyarrow.float64()),
+                ("timestamp", pyarrow.timestamp("us")),
+                ("identifier", pyarrow.string()),
+                ("received", pyarrow.timestamp("us")),
+            ]
+        )
+        self._directory = directory
+        self._row_group_size = row_group_size
+        self._rotate_rows = rotate_rows
+        self._rotate_interval = rotate_interval
+        self._flush_interval = flush_interval
+        os.makedirs(directory, exist_ok=True)
+        # Batches are buffered by the request handlers and written by a
+        # thread, so that writing does not block the event loop
+        self._buffer_lock = threading.Lock()
+        self._buffer = list()
+        self._buffered_rows = 0
+        self._buffer_start = None
+        self._write_lock = threading.Lock()
+        self._writer = None
+        self._file_rows = 0
+        self._file_start = None
+
+    def append(self, columns: dict[str, np.ndarray]) -> bool:
+        """Buffer a batch of datapoints given as columns.
+
+        > *Returns*
+
+        `bool`: Whether the buffer is full and should be flushed
+        """
+        batch = self._pyarrow.RecordBatch.from_pydict(columns, schema=self._schema)
+        with self._buffer_lock:
+            if not self._buffer:
+                self._buffer_start = time.monotonic()
+            self._buffer.append(batch)
+            self._buffered_rows += batch.num_rows
+            return self._buffered_rows >= self._row_group_size
+
+    def is_due(self) -> bool:
+        """Whether buffered datapoints have waited `flush_interval` seconds,
+        or the current file has been open for `rotate_interval` seconds."""
+        now = time.monotonic()
+        return bool(
+            self._buffer and now - self._buffer_start >= self._flush_interval
+        ) or (
+            self._writer is not None and now - self._file_start >= self._rotate_interval
+        )
+
+    def flush(self) -> None:
+        """Write the buffered datapoints, starting a new file if the current
+        one is full or too old."""
+        with self._buffer_lock:
+            buffer, self._buffer = self._buffer, list()
+            self._buffered_rows = 0
+        with self._write_lock:
+            if self._writer is not None and (
+                self._file_rows >= self._rotate_rows
+                or time.monotonic() - self._file_start >= self._rotate_interval
+            ):
+                self._close_file()
+            if not buffer:
+                return
+            if self._writer is None:
+                self._open_file()
+            table = self._pyarrow.Table.from_batches(buffer, schema=self._schema)
+            self._writer.write_table(table, row_group_size=len(table))
+            self._file_rows += len(table)
+
+    def close(self) -> None:
+        self.flush()
+        with self._write_lock:
+            self._close_file()
+
+    def _open_file(self) -> None:
+        name = "uuv-trajectory-{}.parquet".format(
+            datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+        )
+        self._writer = self._pyarrow.parquet.ParquetWriter(
+            os.path.join(self._directory, name), self._schema
+        )
+        self._file_rows = 0
+        self._file_start = time.monotonic()
+
+    def _close_file(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+def parse_json_datapoints(body: bytes) -> dict[str, np.ndarray]:
+    # A single datapoint is sent as a JSON object, a batch as a JSON list
+    datapoints = orjson.loads(body)
+    if isinstance(datapoints, dict):
+        datapoints = [datapoints]
+    timestamps = [d["timestamp"] for d in datapoints]
+    identifiers = [d["identifier"] for d in datapoints]
+    if not all(isinstance(value, str) for value in timestamps + identifiers):
+        raise ValueError("The timestamps and identifiers must be strings")
+    return {
+        "latitude": parse_numbers([d["latitude"] for d in datapoints]),
+        "longitude": parse_numbers([d["longitude"] for d in datapoints]),
+        "elevation": parse_numbers([d["elevation"] for d in datapoints]),
+        "timestamp": parse_timestamps(timestamps),
+        "identifier": np.array(identifiers, dtype=object),
+    }
+
+
+def parse_numbers(values: list) -> np.ndarray:
+    # Only accept numbers, which numpy would otherwise convert from e.g.
+    # strings and booleans. Each value is checked, since a batch mixing
+    # booleans with numbers is converted to floats as a whole
+    if not all(type(v) in (int, float) for v in values):
+        raise ValueError("The coordinates must be numbers")
+    return np.array(values, dtype=float)
+
+
+def parse_binary_datapoints(body: bytes) -> dict[str, np.ndarray]:
+    # Records of the 'binary' encoding, concatenated
+    if len(body) % BINARY_DTYPE.itemsize:
+        raise ValueError(
+            f"The body is not a whole number of {BINARY_DTYPE.itemsize} byte records"
+        )
+    records = np.frombuffer(body, dtype=BINARY_DTYPE)
+    return {
+        "latitude": records["latitude"],
+        "longitude": records["longitude"],
+        "elevation": records["elevation"],
+        "timestamp": records["timestamp"],
+        "identifier": np.char.decode(records["identifier"]).astype(object),
+    }
+
+
+def parse_timestamps(timestamps: list[str]) -> np.ndarray:
+    # Convert ISO 8601 timestamps to microseconds since the Unix epoch.
+    # Timestamps without a UTC offset are taken to be in UTC, and are parsed
+    # all at once by numpy, which warns of (and ignores) UTC offsets
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            return np.array(timestamps, dtype="datetime64[us]").astype("int64")
+    except (Warning, ValueError):
+        pass
+    timestamps = [datetime.fromisoformat(timestamp) for timestamp in timestamps]
+    if any(timestamp.tzinfo is not None for timestamp in timestamps):
+        timestamps = [
+            (
+                timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+                if timestamp.tzinfo is not None
+                else timestamp
+            )
+            for timestamp in timestamps
+        ]
+    return np.array(timestamps, dtype="datetime64[us]").astype("int64")
+
+
+# Parsers of the request bodies by their content type
+PARSERS = {
+    "application/json": parse_json_datapoints,
+    "application/octet-stream": parse_binary_datapoints,
+}
+
+stats = IngestionStats()
+writer = (
+    RotatingParquetWriter(
+        directory=PERSIST_DIR,
+        row_group_size=PERSIST_ROW_GROUP_SIZE,
+        rotate_rows=PERSIST_ROTATE_ROWS,
+        rotate_interval=PERSIST_ROTATE_INTERVAL,
+        flush_interval=PERSIST_FLUSH_INTERVAL,
+    )
+    if PERSIST_DIR is not None
+    else None
+)
+
+
+async def flush_periodically(writer: RotatingParquetWriter) -> None:
+    # Write the buffered datapoints and rotate the files also when few or no
+    # datapoints arrive
+    while True:
+        await asyncio.sleep(1.0)
+        if writer.is_due():
+            await asyncio.to_thread(writer.flush)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if writer is None:
+        yield
+        return
+    task = asyncio.create_task(flush_periodically(writer))
+    try:
+        yield
+    finally:
+        task.cancel()
+        await asyncio.to_thread(writer.close)
+
+
+app = FastAPI(lifespan=lifespan)
 
-app = FastAPI()
 
 @app.post("/consumer/uuv/trajectory")
 async def uuv_trajectory(request: Request):
-    json = await request.json()
-    print("The consumer received JSON data: ")
-    print(json)
-    return JSONResponse({"message": "Placeholder"}, 200)
\ No newline at end of file
+    arrival = time.time()
+    body = await request.body()
+    content_type = request.headers.get("content-type", "application/json")
+    parser = PARSERS.get(content_type.split(";")[0].strip())
+    if parser is None:
+        stats.rejected += 1
+        raise HTTPException(
+            status_code=415, detail=f"Unsupported content type '{content_type}'"
+        )
+    try:
+        columns = parser(body)
+    except (orjson.JSONDecodeError, KeyError, TypeError, ValueError) as e:
+        stats.rejected += 1
+        raise HTTPException(
+            status_code=400, detail="Invalid datapoints, message={}".format(e)
+        )
+    if len(columns["timestamp"]) == 0:
+        return Response(status_code=204)
+
+    stats.add(arrival, columns["identifier"], columns["timestamp"])
+    if writer is not None:
+        columns["received"] = np.full(
+            len(columns["timestamp"]), int(arrival * 1e6), dtype="int64"
+        )
+        if writer.append(columns):
+            await asyncio.to_thread(writer.flush)
+    return Response(status_code=204)
+
+
+@app.get("/stats")
+async def get_stats():
+    # Ingestion statistics since the start of the conserver or the last reset
+    return Response(
+        orjson.dumps(stats.summary()),
+        media_type="application/json",
+    )
+
+
+@app.delete("/stats")
+async def reset_stats():
+    # Reset the statistics, e.g. between benchmark runs
+    stats.reset()
+    return JSONResponse({"message": "Statistics reset."}, 200)
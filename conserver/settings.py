@@ -0,0 +1,13 @@
+import os
+
+# Directory of the Parquet files the received datapoints are written to. If
+# not set, the datapoints are not persisted, only counted in the statistics
+PERSIST_DIR = os.environ.get("PERSIST_DIR") or None
+# Number of datapoints buffered before they are written as a row group
+PERSIST_ROW_GROUP_SIZE = int(os.environ.get("PERSIST_ROW_GROUP_SIZE", 10000))
+# A new file is started once the current file holds this many datapoints...
+PERSIST_ROTATE_ROWS = int(os.environ.get("PERSIST_ROTATE_ROWS", 1000000))
+# ... or has been open for this many seconds
+PERSIST_ROTATE_INTERVAL = float(os.environ.get("PERSIST_ROTATE_INTERVAL", 300.0))
+# Maximum number of seconds datapoints are buffered before they are written
+PERSIST_FLUSH_INTERVAL = float(os.environ.get("PERSIST_FLUSH_INTERVAL", 5.0))
@@ -0,0 +1,325 @@
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import shapely
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(SCRIPT_DIR))
+
+from uuv_trajectory_generator.path_generator import DubinsInterpolator
+from uuv_trajectory_generator.path_generator.bezier_curve import BezierCurve
+from uuv_trajectory_generator.trajectory_generator import (
+    add_spatial_noise,
+    all_cartesian_to_latlon,
+    all_latlon_to_cartesian,
+    generate_path,
+    sample_path,
+)
+from uuv_waypoints.waypoint_set import WaypointSet
+
+# Directory of the stored baselines
+BASELINE_DIR = os.path.join(SCRIPT_DIR, "baselines")
+
+# Parameter grids of the benchmarks
+NUM_WAYPOINTS = [10, 100, 1000]
+TURNING_RADIUS = [10.0, 25.0, 100.0]
+# Mission durations (s) used to size the sampled trajectories
+DURATION = [600, 3600, 36000]
+# Number of coordinates converted between latitude/longitude and UTM
+NUM_COORDINATES = [100, 10000]
+
+# Sampling parameters, see 'genserver/main.py'
+MEAN_TIME_DELTA = 1.0
+STD_TIME_DELTA = 0.25
+MEAN_SPEED = 1.25
+STD_SPEED = 0.25
+STD_SPATIAL = 0.25
+
+# Ratio of the current and baseline timings above which a benchmark is
+# reported as a regression
+REGRESSION_THRESHOLD = 1.25
+
+
+def get_waypoints(num_waypoints: int, spacing: float = 250.0) -> np.ndarray:
+    # A random walk of waypoints, with legs of 'spacing' meters that turn at
+    # most 90 degrees and a slowly changing depth. The seed is fixed so that
+    # every run benchmarks the same mission
+    rng = np.random.default_rng(num_waypoints)
+    heading = np.cumsum(rng.uniform(-np.pi / 2, np.pi / 2, num_waypoints))
+    waypoints = np.zeros((num_waypoints, 3))
+    waypoints[1:, 0] = np.cumsum(spacing * np.cos(heading[1:]))
+    waypoints[1:, 1] = np.cumsum(spacing * np.sin(heading[1:]))
+    waypoints[:, 2] = -10.0 + 5.0 * np.sin(np.arange(num_waypoints) / 10)
+    # Shift the waypoints into UTM zone 35, see 'settings.py'
+    waypoints[:, 0] += 6.7e6
+    waypoints[:, 1] += 5.0e5
+    return waypoints
+
+
+def get_latlon_waypoints(num_coordinates: int) -> list[dict[str, float]]:
+    rng = np.random.default_rng(num_coordinates)
+    return [
+        {"latitude": latitude, "longitude": longitude, "elevation": 0.0}
+        for latitude, longitude in zip(
+            rng.uniform(60.0, 60.1, num_coordinates).tolist(),
+            rng.uniform(25.0, 25.1, num_coordinates).tolist(),
+        )
+    ]
+
+
+def get_interpolator(num_waypoints: int, turning_radius: float) -> DubinsInterpolator:
+    waypoints = WaypointSet()
+    waypoints.add_waypoints(get_waypoints(num_waypoints), max_forward_speed=0.5)
+    interpolator = DubinsInterpolator(radius=turning_radius)
+    interpolator.init_waypoints(waypoints, copy=False)
+    return interpolator
+
+
+def get_mission_path(duration: float) -> shapely.LineString:
+    # A path that takes 'duration' seconds to follow at the mean speed
+    waypoints = get_waypoints(max(2, int(duration * MEAN_SPEED / 250.0) + 1))
+    return shapely.LineString(waypoints)
+
+
+# Benchmarks. Each benchmark is a function of its parameters that sets up
+# its inputs and returns the function to be timed
+
+
+def bench_bezier_interpolate(num_samples):
+    rng = np.random.default_rng(0)
+    curve = BezierCurve.from_control_pnts(list(rng.uniform(-100, 100, (4, 3))))
+    u = np.linspace(0, 1, num_samples)
+    return lambda: curve.interpolate(u)
+
+
+def bench_dubins_init_interpolator(num_waypoints, turning_radius):
+    interpolator = get_interpolator(num_waypoints, turning_radius)
+    return interpolator.init_interpolator
+
+
+def bench_dubins_get_samples(num_waypoints, turning_radius):
+    interpolator = get_interpolator(num_waypoints, turning_radius)
+    interpolator.init_interpolator()
+    return lambda: interpolator.get_samples(max_time=None)
+
+
+def bench_generate_path(num_waypoints, turning_radius):
+    coordinates = get_waypoints(num_waypoints).tolist()
+    return lambda: generate_path(coordinates=coordinates, turning_radius=turning_radius)
+
+
+def bench_sample_path(duration):
+    path = get_mission_path(duration)
+    start_datetime = datetime(2024, 1, 1)
+
+    def run():
+        np.random.seed(0)
+        sample_path(
+            path=path,
+            mean_time_delta=MEAN_TIME_DELTA,
+            std_time_delta=STD_TIME_DELTA,
+            mean_speed=MEAN_SPEED,
+            std_speed=STD_SPEED,
+            start_datetime=start_datetime,
+            std_spatial=STD_SPATIAL,
+        )
+
+    return run
+
+
+def bench_add_spatial_noise(duration):
+    path = get_mission_path(duration)
+    num_samples = int(duration / MEAN_TIME_DELTA)
+    sample_points = list(
+        shapely.line_interpolate_point(
+            path, np.linspace(0, 1, num_samples), normalized=True
+        )
+    )
+    return lambda: add_spatial_noise(
+        sample_points=sample_points, std_spatial=STD_SPATIAL
+    )
+
+
+def bench_latlon_to_cartesian(num_coordinates):
+    datapoints = get_latlon_waypoints(num_coordinates)
+    return lambda: all_latlon_to_cartesian(datapoints=datapoints)
+
+
+def bench_cartesian_to_latlon(num_coordinates):
+    datapoints = [
+        {"northing": northing, "easting": easting, "elevation": elevation}
+        for northing, easting, elevation in all_latlon_to_cartesian(
+            datapoints=get_latlon_waypoints(num_coordinates)
+        )
+    ]
+    return lambda: all_cartesian_to_latlon(datapoints=datapoints)
+
+
+BENCHMARKS = [
+    (bench_bezier_interpolate, {"num_samples": [100, 10000]}),
+    (
+        bench_dubins_init_interpolator,
+        {"num_waypoints": NUM_WAYPOINTS, "turning_radius": TURNING_RADIUS},
+    ),
+    (
+        bench_dubins_get_samples,
+        {"num_waypoints": NUM_WAYPOINTS, "turning_radius": TURNING_RADIUS},
+    ),
+    (
+        bench_generate_path,
+        {"num_waypoints": NUM_WAYPOINTS, "turning_radius": TURNING_RADIUS},
+    ),
+    (bench_sample_path, {"duration": DURATION}),
+    (bench_add_spatial_noise, {"duration": DURATION}),
+    (bench_latlon_to_cartesian, {"num_coordinates": NUM_COORDINATES}),
+    (bench_cartesian_to_latlon, {"num_coordinates": NUM_COORDINATES}),
+]
+
+
+def get_cases(pattern: str = ""):
+    # Expand the parameter grids into named benchmark cases, e.g.
+    # 'generate_path[num_waypoints=10,turning_radius=25.0]'
+    for bench, grid in BENCHMARKS:
+        for values in itertools.product(*grid.values()):
+            params = dict(zip(grid.keys(), values))
+            name = "{}[{}]".format(
+                bench.__name__[len("bench_") :],
+                ",".join(f"{key}={value}" for key, value in params.items()),
+            )
+            if pattern in name:
+                yield name, bench, params
+
+
+def time_case(bench, params, repeat: int, min_time: float) -> dict[str, float]:
+    # The path generators print progress messages, which are discarded so as
+    # not to time the terminal output
+    with contextlib.redirect_stdout(io.StringIO()):
+        return _time_fcn(bench(**params), repeat, min_time)
+
+
+def _time_fcn(fcn, repeat: int, min_time: float) -> dict[str, float]:
+    # Calibrate the number of calls per round so that a round takes at least
+    # 'min_time' seconds
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fcn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or number >= 1000:
+            break
+        number *= 10
+    rounds = [elapsed / number]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            fcn()
+        rounds.append((time.perf_counter() - start) / number)
+    return {
+        "min": min(rounds),
+        "median": statistics.median(rounds),
+        "rounds": repeat,
+        "number": number,
+    }
+
+
+def format_time(seconds: float) -> str:
+    for unit, scale in [("s", 1.0), ("ms", 1e-3), ("us", 1e-6)]:
+        if seconds >= scale:
+            return f"{seconds / scale:8.2f} {unit}"
+    return f"{seconds / 1e-9:8.2f} ns"
+
+
+def load_baseline(name: str) -> dict:
+    with open(os.path.join(BASELINE_DIR, name + ".json")) as baseline_file:
+        return json.load(baseline_file)["results"]
+
+
+def save_baseline(name: str, results: dict) -> str:
+    os.makedirs(BASELINE_DIR, exist_ok=True)
+    filename = os.path.join(BASELINE_DIR, name + ".json")
+    with open(filename, "w") as baseline_file:
+        json.dump(
+            {
+                "datetime": datetime.now().isoformat(),
+                "machine": platform.machine(),
+                "python": platform.python_version(),
+                "numpy": np.__version__,
+                "shapely": shapely.__version__,
+                "results": results,
+            },
+            baseline_file,
+            indent=2,
+        )
+    return filename
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Benchmark the UUV trajectory pipeline."
+    )
+    parser.add_argument(
+        "-k", "--filter", default="", help="Only run benchmarks containing FILTER."
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="Number of timed rounds per benchmark."
+    )
+    parser.add_argument(
+        "--min-time",
+        type=float,
+        default=0.05,
+        help="Minimum duration (s) of a timed round.",
+    )
+    parser.add_argument(
+        "--save", metavar="NAME", help="Store the results as baseline NAME."
+    )
+    parser.add_argument(
+        "--compare",
+        metavar="NAME",
+        help="Compare the results with baseline NAME and exit with status 1 on regressions.",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=REGRESSION_THRESHOLD,
+        help="Ratio to the baseline above which a benchmark has regressed.",
+    )
+    args = parser.parse_args()
+
+    baseline = load_baseline(args.compare) if args.compare else {}
+    results = {}
+    regressions = []
+    for name, bench, params in get_cases(args.filter):
+        result = time_case(bench, params, args.repeat, args.min_time)
+        results[name] = result
+        line = f"{name:<70} {format_time(result['min'])}"
+        if name in baseline:
+            ratio = result["min"] / baseline[name]["min"]
+            line += f"  {ratio:6.2f}x"
+            if ratio > args.threshold:
+                regressions.append(name)
+                line += "  REGRESSION"
+        print(line, flush=True)
+
+    if args.save:
+        print(f"Saved baseline to '{save_baseline(args.save, results)}'")
+    if regressions:
+        print(
+            f"{len(regressions)} benchmark(s) regressed by more than {args.threshold}x"
+        )
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,408 @@
+import argparse
+import json
+import os
+import re
+import sys
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+GENSERVER_DIR = os.path.dirname(SCRIPT_DIR)
+sys.path.append(GENSERVER_DIR)
+
+# Mission of each generator, see 'request.py'
+WAYPOINTS = [
+    {"latitude": 43.187634, "longitude": 27.926699, "elevation": 0.0},
+    {"latitude": 43.190732, "longitude": 27.926570, "elevation": 3.0},
+    {"latitude": 43.194048, "longitude": 27.926184, "elevation": 6.0},
+    {"latitude": 43.195237, "longitude": 27.929190, "elevation": 9.0},
+    {"latitude": 43.194361, "longitude": 27.930994, "elevation": 12.0},
+    {"latitude": 43.192546, "longitude": 27.931337, "elevation": 15.0},
+    {"latitude": 43.189793, "longitude": 27.931809, "elevation": 12.0},
+    {"latitude": 43.188166, "longitude": 27.931808, "elevation": 9.0},
+    {"latitude": 43.189042, "longitude": 27.929103, "elevation": 6.0},
+    {"latitude": 43.192265, "longitude": 27.928330, "elevation": 4.0},
+]
+
+# Log entries sent over the WebSocket, see 'log_entry_template' in 'genserver.py'
+LOG_ENTRY_PATTERN = re.compile(r"<p>Index (\d+): ")
+
+
+class Consumer:
+    """Stand-in for the consumer service ('conserver') that records the
+    arrival time of every datapoint instead of printing it.
+    """
+
+    def __init__(self, delay: float = 0.0):
+        self.lock = threading.Lock()
+        # Arrival times and datapoint timestamps for each generator
+        self.arrivals = {}
+        consumer = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                arrival = time.perf_counter()
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                datapoints = json.loads(body)
+                # Overdue datapoints may be sent together as a list
+                if isinstance(datapoints, dict):
+                    datapoints = [datapoints]
+                with consumer.lock:
+                    for datapoint in datapoints:
+                        consumer.arrivals.setdefault(
+                            datapoint["identifier"], []
+                        ).append(
+                            (arrival, datetime.fromisoformat(datapoint["timestamp"]))
+                        )
+                # Simulate a slow consumer
+                time.sleep(delay)
+                response = b'{"message": "Placeholder"}'
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(response)))
+                self.end_headers()
+                self.wfile.write(response)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = "http://127.0.0.1:{}/consumer/uuv/trajectory".format(
+            self.server.server_address[1]
+        )
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class RedisCommandCounter:
+    """Count the Redis commands sent by all clients in this process, by
+    wrapping the packing of commands of the Redis connections.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def install(self):
+        from redis.connection import AbstractConnection
+
+        pack_command = AbstractConnection.pack_command
+        pack_commands = AbstractConnection.pack_commands
+        counter = self
+
+        def count_pack_command(self, *args):
+            with counter.lock:
+                counter.count += 1
+            return pack_command(self, *args)
+
+        def count_pack_commands(self, commands):
+            commands = list(commands)
+            with counter.lock:
+                counter.count += len(commands)
+            return pack_commands(self, commands)
+
+        AbstractConnection.pack_command = count_pack_command
+        AbstractConnection.pack_commands = count_pack_commands
+
+
+def use_fakeredis():
+    # Make every Redis client created from now on, i.e. those of the API and
+    # the Celery worker modules, connect to the same in-process fake server
+    import fakeredis
+    import redis
+
+    server = fakeredis.FakeServer()
+
+    class FakeRedis(fakeredis.FakeRedis):
+        def __init__(self, *args, **kwargs):
+            kwargs.pop("host", None)
+            kwargs.pop("port", None)
+            super().__init__(*args, server=server, **kwargs)
+
+    redis.Redis = FakeRedis
+
+
+def get_specification(identifier: str, url: str, args) -> str:
+    # The specification is validated as it would be by the API
+    from models import TrajectoryGeneratorSpecification
+
+    return TrajectoryGeneratorSpecification(
+        identifier=identifier,
+        url=url,
+        waypoints=WAYPOINTS,
+        mean_time_delta=args.mean_time_delta,
+        std_time_delta=args.std_time_delta,
+        mean_speed=args.mean_speed,
+        std_speed=0.0,
+        std_spatial=0.25,
+        turning_radius=5,
+        max_schedule_lag=args.max_schedule_lag,
+        lag_policy=args.lag_policy,
+    ).model_dump_json()
+
+
+def watch_log(client, generator_id: str, arrivals: list, stop: threading.Event):
+    # Follow the log of a generator over the WebSocket of the API and record
+    # the arrival time of every log entry
+    with client.websocket_connect(f"/ws/generators/log/{generator_id}") as websocket:
+        while not stop.is_set():
+            text = websocket.receive_text()
+            arrival = time.perf_counter()
+            for index in LOG_ENTRY_PATTERN.findall(text):
+                arrivals.append((int(index), arrival))
+
+
+def get_percentiles(values) -> dict[str, float]:
+    if len(values) == 0:
+        return {}
+    values = np.asarray(values, dtype=float)
+    return {
+        "mean": float(np.mean(values)),
+        "p50": float(np.percentile(values, 50)),
+        "p95": float(np.percentile(values, 95)),
+        "p99": float(np.percentile(values, 99)),
+        "max": float(np.max(values)),
+    }
+
+
+def compile_report(
+    args,
+    start: float,
+    end: float,
+    consumer: Consumer,
+    log_arrivals: dict,
+    num_commands: int,
+) -> dict:
+    jitter, drift, startup, num_datapoints = [], [], [], 0
+    for arrivals in consumer.arrivals.values():
+        num_datapoints += len(arrivals)
+        received = np.array([arrival for arrival, _ in arrivals])
+        startup.append(received[0] - start)
+        scheduled = np.array(
+            [(timestamp - arrivals[0][1]).total_seconds() for _, timestamp in arrivals]
+        )
+        # The datapoints are emitted at the time increments between their
+        # timestamps, so the emission schedule is given by the timestamps
+        lag = (received - received[0]) - scheduled
+        jitter += np.abs(np.diff(lag)).tolist()
+        drift.append(lag[-1])
+
+    # The sustained throughput is measured once all generators have generated
+    # their paths and emit datapoints
+    sustained_start = max(startup, default=end - start) + start
+    num_sustained = sum(
+        np.sum(np.array([arrival for arrival, _ in arrivals]) >= sustained_start)
+        for arrivals in consumer.arrivals.values()
+    )
+
+    # The log entries of a generator are indexed in the order in which the
+    # consumer received the datapoints
+    latency = []
+    for generator_id, entries in log_arrivals.items():
+        received = consumer.arrivals.get(generator_id, [])
+        latency += [
+            arrival - received[index][0]
+            for index, arrival in entries
+            if index < len(received)
+        ]
+
+    return {
+        "generators": args.generators,
+        "duration": end - start,
+        "mean_time_delta": args.mean_time_delta,
+        "datapoints": num_datapoints,
+        "datapoints_per_second": float(
+            num_sustained / max(end - sustained_start, 1e-9)
+        ),
+        "scheduled_datapoints_per_second": args.generators / args.mean_time_delta,
+        "startup_time": get_percentiles(startup),
+        "emission_jitter": get_percentiles(jitter),
+        "schedule_drift": get_percentiles(drift),
+        "redis_commands": num_commands,
+        "redis_commands_per_second": num_commands / (end - start),
+        "websocket_clients": len(log_arrivals),
+        "websocket_latency": get_percentiles(latency),
+    }
+
+
+def print_report(report: dict):
+    print("=" * 64)
+    print(f"Generators:            {report['generators']}")
+    print(f"Duration:              {report['duration']:.1f} s")
+    print(
+        f"Datapoints:            {report['datapoints']} "
+        f"(sustained {report['datapoints_per_second']:.1f}/s, "
+        f"scheduled {report['scheduled_datapoints_per_second']:.1f}/s)"
+    )
+    print(
+        f"Redis commands:        {report['redis_commands']} "
+        f"({report['redis_commands_per_second']:.1f}/s)"
+    )
+    for key, label in [
+        ("startup_time", "Startup time (s)"),
+        ("emission_jitter", "Emission jitter (s)"),
+        ("schedule_drift", "Schedule drift (s)"),
+        ("websocket_latency", "WebSocket latency (s)"),
+    ]:
+        stats = report[key]
+        if stats:
+            print(
+                f"{label + ':':<22} "
+                + ", ".join(f"{name} {value:.4f}" for name, value in stats.items())
+            )
+    print("=" * 64)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Load test the UUV trajectory generators against a local "
+        "consumer stand-in and report their throughput and timing."
+    )
+    parser.add_argument(
+        "-k", "--generators", type=int, default=10, help="Number of generators."
+    )
+    parser.add_argument(
+        "--duration", type=float, default=30.0, help="Duration (s) of the test."
+    )
+    parser.add_argument(
+        "--mean-time-delta",
+        type=float,
+        default=0.1,
+        help="Average time (s) between the datapoints of a generator.",
+    )
+    parser.add_argument(
+        "--std-time-delta",
+        type=float,
+        default=0.01,
+        help="Standard deviation of the time between datapoints.",
+    )
+    parser.add_argument(
+        "--mean-speed", type=float, default=1.25, help="Speed (m/s) of the UUVs."
+    )
+    parser.add_argument(
+        "--consumer-delay",
+        type=float,
+        default=0.0,
+        help="Time (s) the consumer stand-in takes to respond to each request.",
+    )
+    parser.add_argument(
+        "--max-schedule-lag",
+        type=float,
+        default=None,
+        help="Maximum schedule lag (s) of the generators, see the specification.",
+    )
+    parser.add_argument(
+        "--lag-policy",
+        choices=["skip", "coalesce"],
+        default="skip",
+        help="Handling of overdue datapoints, see the specification.",
+    )
+    parser.add_argument(
+        "--websockets",
+        type=int,
+        default=1,
+        help="Number of WebSocket clients following the log of each generator.",
+    )
+    parser.add_argument(
+        "--redis",
+        default="fakeredis",
+        help="'fakeredis' for an in-process fake server, or 'HOST:PORT' of a "
+        "local Redis server. NOTE: The API flushes all data of the server.",
+    )
+    parser.add_argument("--report", help="Write the report as JSON to REPORT.")
+    args = parser.parse_args()
+
+    if args.redis == "fakeredis":
+        use_fakeredis()
+    else:
+        host, _, port = args.redis.partition(":")
+        os.environ["REDIS_HOST"] = host
+        os.environ["REDIS_PORT"] = port or "6379"
+    counter = RedisCommandCounter()
+    counter.install()
+
+    # The API serves its templates and static files relative to its directory
+    os.chdir(GENSERVER_DIR)
+    from fastapi.testclient import TestClient
+    import genserver
+    from celery_worker import _uuv_trajectory_producer, preload_trajectory_generator
+    from settings import REDIS_KV_STORE_PREFIX_GENERATOR, REDIS_SORTED_SET_GENERATORS
+
+    consumer = Consumer(delay=args.consumer_delay)
+    consumer.start()
+
+    # Import the trajectory generator up front, as a Celery worker does
+    preload_trajectory_generator()
+
+    # Register and start the generators as the API does, but run them in
+    # threads of this process instead of Celery workers
+    generator_ids = [f"loadtest{i}" for i in range(args.generators)]
+    specifications = [
+        get_specification(generator_id, consumer.url, args)
+        for generator_id in generator_ids
+    ]
+    for generator_id in generator_ids:
+        genserver.r.zadd(REDIS_SORTED_SET_GENERATORS, {generator_id: time.time()})
+        genserver.r.set(
+            REDIS_KV_STORE_PREFIX_GENERATOR + "-" + generator_id,
+            json.dumps({"start_time": datetime.now().isoformat()}),
+        )
+    generators = [
+        threading.Thread(target=_uuv_trajectory_producer, args=(specification,))
+        for specification in specifications
+    ]
+
+    stop = threading.Event()
+    client = TestClient(genserver.app)
+    log_arrivals = {generator_id: [] for generator_id in generator_ids}
+    watchers = [
+        threading.Thread(
+            target=watch_log,
+            args=(client, generator_id, log_arrivals[generator_id], stop),
+            daemon=True,
+        )
+        for generator_id in generator_ids
+        for _ in range(args.websockets)
+    ]
+
+    print(f"Starting {args.generators} generators for {args.duration:.0f} s...")
+    start = time.perf_counter()
+    num_commands = counter.count
+    for thread in generators + watchers:
+        thread.start()
+    # Starting the threads can take a while, as the generators already
+    # compete for the GIL while generating their paths
+    time.sleep(max(0.0, start + args.duration - time.perf_counter()))
+
+    # Stop the generators as the '/generators/{generator_id}/stop' endpoint does
+    genserver.r.zrem(REDIS_SORTED_SET_GENERATORS, *generator_ids)
+    end = time.perf_counter()
+    num_commands = counter.count - num_commands
+    stop.set()
+    for thread in generators:
+        thread.join()
+    consumer.stop()
+
+    report = compile_report(args, start, end, consumer, log_arrivals, num_commands)
+    print_report(report)
+    if args.report:
+        with open(args.report, "w") as report_file:
+            json.dump(report, report_file, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
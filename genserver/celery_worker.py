@@ -1,111 +1,568 @@
-from typing import Any
+from typing import TYPE_CHECKING, Any, Optional
 import datetime
 import json
+import os
+import threading
 import time
-import httpx
+from contextlib import contextmanager
 import redis
-from celery import Celery
-from uuv_trajectory_generator.trajectory_generator import (
-    generate_path,
-    sample_path,
-    all_latlon_to_cartesian,
-    cartesian_to_latlon,
+from celery.signals import worker_init, worker_process_shutdown
+from metrics import (
+    DATAPOINTS_EMITTED,
+    DATAPOINTS_SKIPPED,
+    GENERATORS_ACTIVE,
+    SCHEDULE_LAG,
+    clear_multiprocess_dir,
+    mark_process_dead,
+    observe_path_stage,
+    observe_redis,
+    start_exporter,
 )
+from profiling import StageProfiler, span
+from sinks import get_sink
+from tasks import celery_app, UUV_TRAJECTORY_PRODUCER
 from settings import (
     REDIS_HOST,
     REDIS_PORT,
     REDIS_DB,
-    REDIS_URL,
+    REDIS_KV_STORE_PREFIX_SPECIFICATION,
+    REDIS_KV_STORE_PREFIX_WAYPOINTS,
     REDIS_SORTED_SET_PREFIX_GENERATOR,
     REDIS_SORTED_SET_GENERATORS,
+    METRICS_PORT,
+    PROFILE_DIR,
 )
 
+if TYPE_CHECKING:
+    from encoders import Encoder
+
 # Connect to Redis
 r = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=REDIS_DB)
 
-# Connect Celery to Redis
-celery_app = Celery("celery-tasks", broker=REDIS_URL, backend=REDIS_URL)
-celery_app.conf.broker_connection_retry_on_startup = True
 
+class SpecificationError(Exception):
+    """Raised if a generator cannot be run as specified, e.g. if no path can
+    be generated through its waypoints or its sink does not support its
+    encoding. Unlike other errors, it recurs whenever the generator is run."""
 
-def compile_uuv_datapoint_request(
-    noisy_sample_point: tuple, timestamp: str, identifier: str
-) -> str:
-    latitude, longitude = cartesian_to_latlon(
-        noisy_sample_point[0], noisy_sample_point[1]
-    )
-    return json.dumps(
-        {
-            "latitude": latitude,
-            "longitude": longitude,
-            "elevation": noisy_sample_point[2],
-            "timestamp": timestamp.isoformat(),
-            "identifier": identifier,
-        }
-    )
 
+@contextmanager
+def check_specification():
+    # Raise the errors of the code run with the specification of a generator,
+    # e.g. of the path generation, as 'SpecificationError'
+    try:
+        yield
+    except (AssertionError, ImportError, KeyError, TypeError, ValueError) as e:
+        raise SpecificationError(str(e)) from e
 
-@celery_app.task()
-def _uuv_trajectory_producer(specification: str) -> None:
-    # Load serialized 'TrajectoryGeneratorSpecification'
-    specification = json.loads(specification)
 
-    # Generate a detailed trace of a UUV path
-    waypoints = all_latlon_to_cartesian(datapoints=specification["waypoints"])
-    path = generate_path(
-        coordinates=waypoints, turning_radius=specification["turning_radius"]
+@worker_init.connect
+def start_metrics_exporter(**kwargs) -> None:
+    # Serve the metrics of all worker processes from the main worker process
+    clear_multiprocess_dir()
+    start_exporter(METRICS_PORT)
+
+
+@worker_init.connect
+def preload_trajectory_generator(**kwargs) -> None:
+    # The trajectory generator (numpy, shapely, pyproj) is imported lazily by
+    # the tasks, so that importing this module is cheap. A worker imports it
+    # once in the main process, before the pool processes are forked, so that
+    # the pool processes (including those added by autoscaling) share it
+    import uuv_trajectory_generator.trajectory_generator
+
+
+@worker_process_shutdown.connect
+def remove_metrics_process(pid: int = None, **kwargs) -> None:
+    mark_process_dead(pid or os.getpid())
+
+
+def get_specification_encoder(specification: dict[str, Any]) -> "Encoder":
+    from encoders import get_encoder
+
+    # The encoder of the datapoints delivered to the sink of a generator
+    encoding = specification.get("encoding") or "json"
+    if encoding == "nmea":
+        return get_encoder(
+            encoding,
+            specification["identifier"],
+            sentences=specification.get("nmea_sentences"),
+        )
+    return get_encoder(encoding, specification["identifier"])
+
+
+def encode_specification_path(
+    log_encoder: "Encoder",
+    encoder: "Encoder",
+    noisy_sample_points: list,
+    timestamps: list,
+) -> tuple[list[bytes], list[bytes]]:
+    import numpy as np
+    from uuv_trajectory_generator.trajectory_generator import cartesian_to_latlon
+
+    # Convert all sample points to latitude/longitude at once and encode them,
+    # both as the JSON log entries of the generator (which are read back to
+    # continue it and by the UI) and as the payloads delivered to its sink
+    points = np.asarray(noisy_sample_points, dtype=float).reshape(-1, 3)
+    latitude, longitude = cartesian_to_latlon(points[:, 0], points[:, 1])
+    log_entries = log_encoder.encode(latitude, longitude, points[:, 2], timestamps)
+    if encoder is log_encoder:
+        return log_entries, log_entries
+    payloads = encoder.encode(latitude, longitude, points[:, 2], timestamps)
+    return log_entries, payloads
+
+
+def get_stage_profiler(specification: dict[str, Any]) -> StageProfiler:
+    # Time the stages of constructing the path of a generator, and profile
+    # them if requested by the specification
+    return StageProfiler(
+        name=specification["identifier"],
+        observers=[observe_path_stage],
+        profiler=specification.get("profile"),
+        profile_dir=PROFILE_DIR,
     )
 
+
+def sample_specification_path(
+    specification: dict[str, Any], path: Any, start_datetime: datetime.datetime
+) -> tuple[list, list, list]:
+    from uuv_trajectory_generator.trajectory_generator import sample_path
+
     # Sample coordinates with corresponding timestamps along the path
-    noisy_sample_points, timestamps, time_increments = sample_path(
+    return sample_path(
         path=path,
         mean_time_delta=specification["mean_time_delta"],
         std_time_delta=specification["std_time_delta"],
         mean_speed=specification["mean_speed"],
         std_speed=specification["std_speed"],
-        start_datetime=datetime.datetime.fromisoformat(specification["start_datetime"]),
+        start_datetime=start_datetime,
         std_spatial=specification["std_spatial"],
     )
 
-    # Create an 'index' for keeping track of the current coordinates and
-    # timestamps to send off
-    index = 0
 
-    # Create an httpx client for sending POST requests with the coordinate
-    # and timestamp data
-    client = httpx.Client(timeout=2.5)
-    while True:
-        if index >= len(noisy_sample_points):
-            # Since there are no more data to send, clean up the entry in the
-            # sorted set containing all running generators
-            r.zrem(REDIS_SORTED_SET_GENERATORS, specification["identifier"])
-            break
+def splice_waypoints_update(
+    specification: dict[str, Any],
+    waypoints_update: str,
+    path: Any,
+    index: int,
+    noisy_sample_points: list,
+    timestamps: list,
+    time_increments: list,
+) -> tuple[Any, list, list, list]:
+    from uuv_trajectory_generator.trajectory_generator import (
+        all_latlon_to_cartesian,
+        cartesian_to_latlon,
+        generate_path,
+        get_path_pose,
+    )
+
+    # Start the new path at the last emitted position and heading (or at the
+    # start of the current path if nothing has been emitted yet)
+    if index > 0:
+        point, start_datetime = noisy_sample_points[index - 1], timestamps[index - 1]
+    else:
+        point, start_datetime = path.coords[0], timestamps[0]
+    with span("get_path_pose"):
+        position, heading = get_path_pose(path=path, point=point)
+
+    # Only generate the path through the new waypoints
+    with span("latlon_to_cartesian"):
+        waypoints = [position] + all_latlon_to_cartesian(
+            datapoints=json.loads(waypoints_update)["waypoints"]
+        )
+    with span("generate_path"):
+        new_path = generate_path(
+            coordinates=waypoints,
+            turning_radius=specification["turning_radius"],
+            tolerance=specification.get("path_tolerance"),
+            simplify_tolerance=specification.get("simplify_tolerance"),
+            simplify_method=specification.get("simplify_method") or "douglas_peucker",
+            initial_heading=heading,
+        )
+    with span("sample_path"):
+        new_noisy_sample_points, new_timestamps, new_time_increments = (
+            sample_specification_path(
+                specification=specification,
+                path=new_path,
+                start_datetime=start_datetime,
+            )
+        )
+
+    # Record the new path in the specification, starting at its first
+    # position and heading, so that it can be regenerated if the generator is
+    # continued on another emitter node
+    latitude, longitude = cartesian_to_latlon(position[0], position[1])
+    specification["waypoints"] = [
+        {"latitude": latitude, "longitude": longitude, "elevation": position[2]}
+    ] + json.loads(waypoints_update)["waypoints"]
+    specification["initial_heading"] = float(heading)
+
+    # Keep the datapoints emitted so far. The first sample of the new path is
+    # the last emitted position, so it is skipped
+    skip = 1 if index > 0 else 0
+    return (
+        new_path,
+        noisy_sample_points[:index] + new_noisy_sample_points[skip:],
+        timestamps[:index] + new_timestamps[skip:],
+        time_increments[:index] + new_time_increments[skip:],
+    )
+
+
+def generate_specification_path(
+    specification: dict[str, Any],
+) -> tuple[Any, list, list, list]:
+    from uuv_trajectory_generator.trajectory_generator import (
+        all_latlon_to_cartesian,
+        generate_path,
+    )
+
+    # Generate a detailed trace of a UUV path
+    with span("latlon_to_cartesian"):
+        waypoints = all_latlon_to_cartesian(datapoints=specification["waypoints"])
+    with span("generate_path"):
+        path = generate_path(
+            coordinates=waypoints,
+            turning_radius=specification["turning_radius"],
+            tolerance=specification.get("path_tolerance"),
+            simplify_tolerance=specification.get("simplify_tolerance"),
+            simplify_method=specification.get("simplify_method") or "douglas_peucker",
+        )
+
+    # Sample coordinates with corresponding timestamps along the path
+    with span("sample_path"):
+        noisy_sample_points, timestamps, time_increments = sample_specification_path(
+            specification=specification,
+            path=path,
+            start_datetime=datetime.datetime.fromisoformat(
+                specification["start_datetime"]
+            ),
+        )
+    return path, noisy_sample_points, timestamps, time_increments
+
+
+def resume_specification_path(
+    specification: dict[str, Any], datapoint: dict[str, Any]
+) -> tuple[Any, list, list, list]:
+    from uuv_trajectory_generator.trajectory_generator import (
+        all_latlon_to_cartesian,
+        generate_path,
+        get_remaining_path,
+        latlon_to_cartesian,
+    )
+
+    # Regenerate the path of a generator that was started elsewhere, e.g. by
+    # another emitter node, and continue it from its last emitted 'datapoint'
+    with span("latlon_to_cartesian"):
+        waypoints = all_latlon_to_cartesian(datapoints=specification["waypoints"])
+        northing, easting = latlon_to_cartesian(
+            datapoint["latitude"], datapoint["longitude"]
+        )
+    with span("generate_path"):
+        path = generate_path(
+            coordinates=waypoints,
+            turning_radius=specification["turning_radius"],
+            tolerance=specification.get("path_tolerance"),
+            simplify_tolerance=specification.get("simplify_tolerance"),
+            simplify_method=specification.get("simplify_method") or "douglas_peucker",
+            initial_heading=specification.get("initial_heading"),
+        )
+    with span("get_remaining_path"):
+        path = get_remaining_path(
+            path=path, point=(northing, easting, datapoint["elevation"])
+        )
+    if path is None:
+        return None, [], [], []
+
+    # The first sample of the remaining path is the last emitted datapoint, so
+    # it is skipped
+    with span("sample_path"):
+        noisy_sample_points, timestamps, time_increments = sample_specification_path(
+            specification=specification,
+            path=path,
+            start_datetime=datetime.datetime.fromisoformat(datapoint["timestamp"]),
+        )
+    return path, noisy_sample_points[1:], timestamps[1:], time_increments[1:]
+
+
+def get_overdue_datapoints(
+    time_increments: list, index: int, deadline: float, now: float
+) -> tuple[int, float]:
+    # Count the datapoints following the datapoint at 'index' whose deadlines
+    # have passed at time 'now', and return their number and the deadline of
+    # the last of them
+    num_overdue = 0
+    while (
+        index + num_overdue + 1 < len(time_increments)
+        and deadline + time_increments[index + num_overdue + 1] <= now
+    ):
+        num_overdue += 1
+        deadline += time_increments[index + num_overdue]
+    return num_overdue, deadline
+
+
+def log_delivered_datapoints(
+    identifier: str, pending: list[tuple[bytes, int]], num_delivered: int
+) -> None:
+    # Log the first 'num_delivered' of the 'pending' datapoints sent to the
+    # sink, i.e. those it has delivered, as pairs of the log entry and index.
+    # A generator is continued from its last logged datapoint, so datapoints
+    # are only logged once they have been delivered
+    if num_delivered == 0:
+        return
+    with observe_redis("log_datapoint"):
+        r.zadd(
+            REDIS_SORTED_SET_PREFIX_GENERATOR + "-" + identifier,
+            dict(pending[:num_delivered]),
+        )
+    del pending[:num_delivered]
+
+
+def get_lag_percentiles(lags: list[float]) -> dict[str, float]:
+    # Nearest-rank percentiles of the schedule lags of a generator
+    if len(lags) == 0:
+        return {}
+    lags = sorted(lags)
+    return {
+        name: lags[min(len(lags) - 1, int(q * len(lags)))]
+        for name, q in [("p50", 0.5), ("p95", 0.95), ("p99", 0.99), ("max", 1.0)]
+    }
+
+
+@celery_app.task(name=UUV_TRAJECTORY_PRODUCER)
+def _uuv_trajectory_producer(specification: str) -> None:
+    # Load serialized 'TrajectoryGeneratorSpecification'
+    run_uuv_trajectory_producer(specification=json.loads(specification))
+
+
+def run_uuv_trajectory_producer(
+    specification: dict[str, Any],
+    checkpoint: Optional[tuple[dict[str, Any], int]] = None,
+    stop: Optional[threading.Event] = None,
+) -> None:
+    # Run a generator until its path has been emitted, it is stopped through
+    # the API or, if given, the 'stop' event is set. A generator that has
+    # already emitted datapoints, e.g. on another emitter node, is continued
+    # from the 'checkpoint' of its last emitted datapoint and its index
+
+    from encoders import JsonEncoder
+
+    # The datapoints are logged as JSON, and delivered to the sink in the
+    # encoding given by the specification
+    with check_specification():
+        log_encoder = JsonEncoder(specification["identifier"])
+        encoder = get_specification_encoder(specification)
+    if encoder.name == log_encoder.name:
+        encoder = log_encoder
+
+    # Generate, sample and encode the path, timing each stage
+    with get_stage_profiler(specification) as profiler, check_specification():
+        if checkpoint is None:
+            path, noisy_sample_points, timestamps, time_increments = (
+                generate_specification_path(specification=specification)
+            )
         else:
-            scores = r.zmscore(
-                key=REDIS_SORTED_SET_GENERATORS, members=[specification["identifier"]]
+            path, noisy_sample_points, timestamps, time_increments = (
+                resume_specification_path(
+                    specification=specification, datapoint=checkpoint[0]
+                )
+            )
+        # Encode all datapoints at once, rather than one by one as they are sent
+        with span("encode"):
+            log_entries, payloads = encode_specification_path(
+                log_encoder=log_encoder,
+                encoder=encoder,
+                noisy_sample_points=noisy_sample_points,
+                timestamps=timestamps,
             )
-            # Check if the generator has been stopped manually by a 'POST' request
-            # to '/generators/{generator_id}/stop'
-            if None in scores:
+    print(profiler.summary())
+
+    # Create an 'index' for keeping track of the current coordinates and
+    # timestamps to send off. The datapoints are logged by their index in the
+    # full path, which is offset for continued generators
+    index = 0
+    log_offset = 0 if checkpoint is None else checkpoint[1] + 1
+
+    # The emission times of the datapoints are scheduled by deadlines on the
+    # monotonic clock, i.e. the emission time of the first datapoint plus the
+    # time increments since then. Waiting for the deadline rather than for the
+    # time increment compensates for the time spent sending each datapoint
+    deadline = None
+    lags = []
+    num_skipped = 0
+    max_lag = specification.get("max_schedule_lag")
+    lag_policy = specification.get("lag_policy") or "skip"
+
+    # The log entries and indices of the datapoints sent to the sink, which
+    # are logged once the sink has delivered them
+    pending = []
+    stopped = False
+
+    # Create the sink the encoded datapoints are delivered to, selected by the
+    # scheme of the URL
+    with check_specification():
+        sink = get_sink(
+            url=specification["url"],
+            identifier=specification["identifier"],
+            batch_size=specification.get("batch_size") or 1,
+            batch_interval=specification.get("batch_interval"),
+            encoder=encoder,
+        )
+    GENERATORS_ACTIVE.inc()
+    failed = True
+    try:
+        while True:
+            if index >= len(noisy_sample_points):
+                # Since there are no more data to send, clean up the entry in the
+                # sorted set containing all running generators
+                r.zrem(REDIS_SORTED_SET_GENERATORS, specification["identifier"])
                 break
             else:
-                json_data = compile_uuv_datapoint_request(
-                    noisy_sample_point=noisy_sample_points[index],
-                    timestamp=timestamps[index],
-                    identifier=specification["identifier"],
+                # Check if the generator has been stopped manually by a 'POST' request
+                # to '/generators/{generator_id}/stop' and if its waypoints have been
+                # updated by a 'PATCH' request to '/generators/{generator_id}/waypoints'
+                pipe = r.pipeline()
+                pipe.zmscore(
+                    key=REDIS_SORTED_SET_GENERATORS,
+                    members=[specification["identifier"]],
                 )
-                client.request(
-                    method="POST",
-                    url=specification["url"],
-                    data=json_data,
+                pipe.getdel(
+                    REDIS_KV_STORE_PREFIX_WAYPOINTS + "-" + specification["identifier"]
                 )
-                r.zadd(
-                    REDIS_SORTED_SET_PREFIX_GENERATOR
-                    + "-"
-                    + specification["identifier"],
-                    {json_data: index},
-                )
-                index += 1
-                # print(f"Waiting: {time_increments[index]} seconds...")
-                time.sleep(time_increments[index])
-    client.close()
+                with observe_redis("generator_status"):
+                    scores, waypoints_update = pipe.execute()
+                if None in scores:
+                    stopped = True
+                    break
+                elif stop is not None and stop.is_set():
+                    break
+                else:
+                    if waypoints_update is not None:
+                        # The deadline of the next datapoint includes its time
+                        # increment on the current path
+                        previous_increment = time_increments[index]
+                        with get_stage_profiler(specification) as profiler:
+                            try:
+                                spliced = splice_waypoints_update(
+                                    specification=specification,
+                                    waypoints_update=waypoints_update,
+                                    path=path,
+                                    index=index,
+                                    noisy_sample_points=noisy_sample_points,
+                                    timestamps=timestamps,
+                                    time_increments=time_increments,
+                                )
+                            except ValueError as e:
+                                # Keep following the current path if the update
+                                # is invalid
+                                print(e)
+                                spliced = None
+                            if spliced is not None:
+                                (
+                                    path,
+                                    noisy_sample_points,
+                                    timestamps,
+                                    time_increments,
+                                ) = spliced
+                                # Only the datapoints of the new path are encoded
+                                with span("encode"):
+                                    new_log_entries, new_payloads = (
+                                        encode_specification_path(
+                                            log_encoder=log_encoder,
+                                            encoder=encoder,
+                                            noisy_sample_points=noisy_sample_points[
+                                                index:
+                                            ],
+                                            timestamps=timestamps[index:],
+                                        )
+                                    )
+                                log_entries = log_entries[:index] + new_log_entries
+                                payloads = payloads[:index] + new_payloads
+                        if spliced is not None:
+                            print(profiler.summary())
+                            if deadline is not None and index < len(time_increments):
+                                # Reschedule the next datapoint of the new path
+                                deadline += time_increments[index] - previous_increment
+                            # Store the new path of the generator, if it is run by
+                            # an emitter node, so that another node continues it
+                            with observe_redis("update_specification"):
+                                r.set(
+                                    REDIS_KV_STORE_PREFIX_SPECIFICATION
+                                    + "-"
+                                    + specification["identifier"],
+                                    json.dumps(specification),
+                                    xx=True,
+                                )
+                        if index >= len(noisy_sample_points):
+                            continue
+                    emission_time = time.monotonic()
+                    if deadline is None:
+                        deadline = emission_time
+
+                    # If the generator has fallen too far behind its schedule, the
+                    # datapoints whose deadlines have passed as well are either
+                    # skipped or sent together with the current datapoint
+                    num_overdue = 0
+                    if max_lag is not None and emission_time - deadline > max_lag:
+                        num_overdue, deadline = get_overdue_datapoints(
+                            time_increments=time_increments,
+                            index=index,
+                            deadline=deadline,
+                            now=emission_time,
+                        )
+                        if lag_policy == "skip":
+                            index += num_overdue
+                            num_skipped += num_overdue
+                            DATAPOINTS_SKIPPED.labels(specification["identifier"]).inc(
+                                num_overdue
+                            )
+                            num_overdue = 0
+                    lag = emission_time - deadline
+                    lags.append(lag)
+                    SCHEDULE_LAG.observe(lag)
+
+                    datapoints = payloads[index : index + num_overdue + 1]
+                    pending.extend(
+                        (log_entries[index + i], log_offset + index + i)
+                        for i in range(len(datapoints))
+                    )
+                    num_delivered = sink.send(datapoints)
+                    DATAPOINTS_EMITTED.labels(specification["identifier"]).inc(
+                        len(datapoints)
+                    )
+                    log_delivered_datapoints(
+                        identifier=specification["identifier"],
+                        pending=pending,
+                        num_delivered=num_delivered,
+                    )
+                    index += len(datapoints)
+                    if index < len(time_increments):
+                        # Wait until the deadline of the next datapoint, or
+                        # until the generator is stopped by its emitter node
+                        deadline += time_increments[index]
+                        timeout = max(0.0, deadline - time.monotonic())
+                        if stop is None:
+                            time.sleep(timeout)
+                        else:
+                            stop.wait(timeout)
+        failed = False
+    finally:
+        GENERATORS_ACTIVE.dec()
+        # Deliver the last (partial) batch, unless the generator failed
+        num_delivered = sink.close(flush=not failed)
+    # The log of a generator stopped through the API has been deleted
+    if not stopped:
+        log_delivered_datapoints(
+            identifier=specification["identifier"],
+            pending=pending,
+            num_delivered=num_delivered,
+        )
+    print(
+        "Generator '{}' schedule lag: {} ({} datapoints skipped)".format(
+            specification["identifier"],
+            ", ".join(
+                "{} {:.4f} s".format(name, value)
+                for name, value in get_lag_percentiles(lags).items()
+            ),
+            num_skipped,
+        )
+    )
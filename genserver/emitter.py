@@ -0,0 +1,353 @@
+import argparse
+import bisect
+import hashlib
+import json
+import os
+import signal
+import socket
+import threading
+import time
+from typing import Any, Optional
+import redis
+from celery_worker import (
+    SpecificationError,
+    preload_trajectory_generator,
+    r,
+    run_uuv_trajectory_producer,
+)
+from metrics import observe_redis, start_exporter
+from settings import (
+    EMITTER_HEARTBEAT_INTERVAL,
+    EMITTER_LEASE_TTL,
+    EMITTER_NODE_TIMEOUT,
+    EMITTER_RETRY_MAX_DELAY,
+    EMITTER_VIRTUAL_NODES,
+    REDIS_KV_STORE_PREFIX_LEASE,
+    REDIS_KV_STORE_PREFIX_SPECIFICATION,
+    REDIS_KV_STORE_PREFIX_WAYPOINTS,
+    REDIS_SORTED_SET_EMITTERS,
+    REDIS_SORTED_SET_GENERATORS,
+    REDIS_SORTED_SET_PREFIX_GENERATOR,
+)
+
+# Extend the lease of a generator, but only if it is still owned by the node
+RENEW_LEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("pexpire", KEYS[1], ARGV[2])
+end
+return 0
+"""
+# Release the lease of a generator, but only if it is still owned by the node
+RELEASE_LEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+def hash_key(key: str) -> int:
+    # A stable hash, unlike the builtin 'hash' which is salted per process, so
+    # that all nodes place the nodes and generators on the same ring positions
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Consistent hash ring assigning keys to nodes. Each node is placed on
+    the ring at `num_replicas` points, and a key is assigned to the node at
+    the first point following the hash of the key. When a node joins or
+    leaves, only the keys between its points and those of their predecessors
+    move to another node.
+
+    > *Input arguments*
+
+    * `nodes` (*type:* list of `str`): Identifiers of the nodes
+    * `num_replicas` (*type:* `int`, *default:* `EMITTER_VIRTUAL_NODES`): Number of points of each node on the ring
+    """
+
+    def __init__(self, nodes: list[str], num_replicas: int = EMITTER_VIRTUAL_NODES):
+        points = sorted(
+            (hash_key(f"{node}#{i}"), node)
+            for node in nodes
+            for i in range(num_replicas)
+        )
+        self._hashes = [point for point, _ in points]
+        self._nodes = [node for _, node in points]
+
+    def get_node(self, key: str) -> Optional[str]:
+        """Return the node the `key` is assigned to, or `None` if the ring is
+        empty.
+
+        > *Input arguments*
+
+        * `key` (*type:* `str`): Key to look up, e.g. a generator identifier
+
+        > *Returns*
+
+        `str`: Identifier of the node
+        """
+        if not self._hashes:
+            return None
+        index = bisect.bisect(self._hashes, hash_key(key)) % len(self._hashes)
+        return self._nodes[index]
+
+
+class EmitterNode:
+    """Node of an emitter cluster. The node runs the generators that the
+    consistent hash ring of all live nodes assigns to it, each in a thread.
+
+    Nodes announce themselves by heartbeats in a Redis sorted set, and a node
+    without a heartbeat for `EMITTER_NODE_TIMEOUT` seconds is considered gone.
+    A generator is only run by the node holding its lease in Redis, which the
+    node renews with every heartbeat. When nodes join or leave, the ring
+    changes and a node stops the generators it is no longer assigned and
+    releases their leases, after which their new nodes continue them from
+    their last logged datapoints. The leases of a node that fails expire
+    after `EMITTER_LEASE_TTL` seconds.
+
+    > *Input arguments*
+
+    * `node_id` (*type:* `str`): Identifier of the node, unique in the cluster
+    * `redis_client` (*type:* `redis.Redis`, *default:* `None`): Redis connection, defaults to that of the Celery worker module
+    """
+
+    def __init__(self, node_id: str, redis_client: Optional[redis.Redis] = None):
+        self._node_id = node_id
+        self._r = redis_client or r
+        self._renew_lease = self._r.register_script(RENEW_LEASE_SCRIPT)
+        self._release_lease = self._r.register_script(RELEASE_LEASE_SCRIPT)
+        self._lock = threading.Lock()
+        # Stop events of the generators run by this node, including those
+        # that have been stopped but whose threads have not finished yet
+        self._generators: dict[str, threading.Event] = dict()
+        self._threads: dict[str, threading.Thread] = dict()
+        # Number of consecutive failures of the generators whose sinks failed,
+        # and the monotonic time after which they are restarted
+        self._retries: dict[str, tuple[int, float]] = dict()
+        self._shutdown = threading.Event()
+
+    @property
+    def node_id(self) -> str:
+        """`str`: Identifier of the node"""
+        return self._node_id
+
+    @property
+    def generator_ids(self) -> list[str]:
+        """`list`: Identifiers of the generators currently run by the node"""
+        with self._lock:
+            return [
+                generator_id
+                for generator_id, stop in self._generators.items()
+                if not stop.is_set()
+            ]
+
+    def run(self) -> None:
+        """Send heartbeats and rebalance the generators until `shutdown` is
+        called, then stop all generators and leave the cluster."""
+        preload_trajectory_generator()
+        print(f"Emitter node '{self._node_id}' joined the cluster")
+        while not self._shutdown.is_set():
+            start = time.monotonic()
+            try:
+                self.heartbeat()
+            except redis.RedisError as e:
+                print("Error occured during heartbeat, message={}".format(e))
+            self._shutdown.wait(
+                max(0.0, EMITTER_HEARTBEAT_INTERVAL - (time.monotonic() - start))
+            )
+        self._leave()
+
+    def shutdown(self) -> None:
+        self._shutdown.set()
+
+    def heartbeat(self) -> None:
+        """Announce the node, renew the leases of its generators, and start
+        and stop generators as assigned by the hash ring of the live nodes."""
+        with self._lock:
+            owned_ids = list(self._generators)
+        now = time.time()
+        lease_ttl = int(1000 * EMITTER_LEASE_TTL)
+        pipe = self._r.pipeline()
+        pipe.zadd(REDIS_SORTED_SET_EMITTERS, {self._node_id: now})
+        pipe.zremrangebyscore(
+            REDIS_SORTED_SET_EMITTERS, "-inf", now - EMITTER_NODE_TIMEOUT
+        )
+        pipe.zrange(REDIS_SORTED_SET_EMITTERS, 0, -1)
+        pipe.zrange(REDIS_SORTED_SET_GENERATORS, 0, -1)
+        for generator_id in owned_ids:
+            self._renew_lease(
+                keys=[REDIS_KV_STORE_PREFIX_LEASE + "-" + generator_id],
+                args=[self._node_id, lease_ttl],
+                client=pipe,
+            )
+        with observe_redis("emitter_heartbeat"):
+            _, _, node_ids, generator_ids, *renewed = pipe.execute()
+        ring = HashRing([node_id.decode() for node_id in node_ids])
+        generator_ids = [generator_id.decode() for generator_id in generator_ids]
+
+        # Stop the generators whose leases were lost, e.g. after a pause longer
+        # than the lease, and those assigned to other nodes
+        for generator_id, lease_renewed in zip(owned_ids, renewed):
+            if not lease_renewed or ring.get_node(generator_id) != self._node_id:
+                self._stop_generator(generator_id)
+
+        # Start the generators assigned to this node that it does not run yet.
+        # A generator whose lease is still held by its previous node is started
+        # with a later heartbeat, once that node has released the lease, and a
+        # generator whose sink failed once its retry delay has passed
+        with self._lock:
+            for generator_id in set(self._retries) - set(generator_ids):
+                del self._retries[generator_id]
+            retries = dict(self._retries)
+        for generator_id in generator_ids:
+            if (
+                ring.get_node(generator_id) == self._node_id
+                and generator_id not in self._generators
+                and time.monotonic() >= retries.get(generator_id, (0, 0.0))[1]
+            ):
+                self._start_generator(generator_id, lease_ttl)
+
+    def _start_generator(self, generator_id: str, lease_ttl: int) -> None:
+        lease_key = REDIS_KV_STORE_PREFIX_LEASE + "-" + generator_id
+        if not self._r.set(lease_key, self._node_id, nx=True, px=lease_ttl):
+            return
+        specification = self._r.get(
+            REDIS_KV_STORE_PREFIX_SPECIFICATION + "-" + generator_id
+        )
+        if specification is None:
+            # The generator has been stopped, or its specification has not
+            # been stored by the API yet
+            self._release_lease(keys=[lease_key], args=[self._node_id])
+            return
+        checkpoint = self._get_checkpoint(generator_id)
+        stop = threading.Event()
+        thread = threading.Thread(
+            target=self._run_generator,
+            args=(generator_id, json.loads(specification), checkpoint, stop),
+            name=f"generator-{generator_id}",
+            daemon=True,
+        )
+        with self._lock:
+            self._generators[generator_id] = stop
+            self._threads[generator_id] = thread
+        print(
+            "Emitter node '{}' started generator '{}'{}".format(
+                self._node_id,
+                generator_id,
+                "" if checkpoint is None else f" at index {checkpoint[1] + 1}",
+            )
+        )
+        thread.start()
+
+    def _stop_generator(self, generator_id: str) -> None:
+        with self._lock:
+            stop = self._generators.get(generator_id)
+        if stop is not None and not stop.is_set():
+            print(f"Emitter node '{self._node_id}' stopped generator '{generator_id}'")
+            stop.set()
+
+    def _get_checkpoint(self, generator_id: str) -> Optional[tuple[dict, int]]:
+        # The last datapoint logged by the generator and its index, if it has
+        # already been run by another node
+        log_entries = self._r.zrange(
+            REDIS_SORTED_SET_PREFIX_GENERATOR + "-" + generator_id,
+            -1,
+            -1,
+            withscores=True,
+        )
+        if not log_entries:
+            return None
+        datapoint, index = log_entries[0]
+        return json.loads(datapoint), int(index)
+
+    def _run_generator(
+        self,
+        generator_id: str,
+        specification: dict[str, Any],
+        checkpoint: Optional[tuple[dict, int]],
+        stop: threading.Event,
+    ) -> None:
+        try:
+            run_uuv_trajectory_producer(
+                specification=specification, checkpoint=checkpoint, stop=stop
+            )
+        except SpecificationError as e:
+            print("Error occured in generator '{}', message={}".format(generator_id, e))
+            # An invalid specification fails whenever the generator is
+            # restarted, so the generator is removed instead
+            if not stop.is_set():
+                pipe = self._r.pipeline()
+                pipe.zrem(REDIS_SORTED_SET_GENERATORS, generator_id)
+                pipe.delete(
+                    REDIS_KV_STORE_PREFIX_SPECIFICATION + "-" + generator_id,
+                    REDIS_KV_STORE_PREFIX_WAYPOINTS + "-" + generator_id,
+                )
+                pipe.execute()
+        except Exception as e:
+            # Other errors, e.g. of the sink or Redis, may be transient, so the
+            # generator is restarted from its last logged datapoint, after a
+            # delay that grows with every consecutive failure
+            with self._lock:
+                failures = self._retries.get(generator_id, (0, 0.0))[0] + 1
+                delay = min(
+                    EMITTER_RETRY_MAX_DELAY,
+                    EMITTER_HEARTBEAT_INTERVAL * 2 ** (failures - 1),
+                )
+                self._retries[generator_id] = (failures, time.monotonic() + delay)
+            print(
+                "Error occured in generator '{}', retrying in {:.1f} s, message={}".format(
+                    generator_id, delay, e
+                )
+            )
+        else:
+            with self._lock:
+                self._retries.pop(generator_id, None)
+        finally:
+            self._release_lease(
+                keys=[REDIS_KV_STORE_PREFIX_LEASE + "-" + generator_id],
+                args=[self._node_id],
+            )
+            with self._lock:
+                del self._generators[generator_id]
+                del self._threads[generator_id]
+
+    def _leave(self) -> None:
+        # Stop all generators, so that their leases are released, and remove
+        # the node from the cluster
+        for generator_id in self.generator_ids:
+            self._stop_generator(generator_id)
+        with self._lock:
+            threads = list(self._threads.values())
+        for thread in threads:
+            thread.join()
+        self._r.zrem(REDIS_SORTED_SET_EMITTERS, self._node_id)
+        print(f"Emitter node '{self._node_id}' left the cluster")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Run an emitter node of the generator cluster."
+    )
+    parser.add_argument(
+        "--node-id",
+        default=f"{socket.gethostname()}-{os.getpid()}",
+        help="Identifier of the node, unique in the cluster.",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        help="Serve the metrics of the node on METRICS_PORT.",
+    )
+    args = parser.parse_args()
+
+    if args.metrics_port is not None:
+        start_exporter(args.metrics_port)
+    node = EmitterNode(node_id=args.node_id)
+    # Leave the cluster gracefully when stopped, e.g. by 'docker stop'
+    signal.signal(signal.SIGTERM, lambda *_: node.shutdown())
+    signal.signal(signal.SIGINT, lambda *_: node.shutdown())
+    node.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,341 @@
+import json
+from datetime import datetime, timezone
+import numpy as np
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Mean radius (m) of the Earth, used to derive the speed and course of the
+# UUV between consecutive datapoints
+EARTH_RADIUS = 6371008.8
+# Conversion of speeds from m/s to knots and km/h
+MS_TO_KNOTS = 3600.0 / 1852.0
+MS_TO_KMH = 3.6
+# NMEA 0183 sentences that can be emitted for each datapoint
+NMEA_SENTENCES = ["GGA", "RMC", "VTG"]
+# Fixed-width little-endian record of the binary encoding (64 bytes): the
+# timestamp in microseconds since the Unix epoch (UTC), the position, and
+# the identifier of the generator as UTF-8, truncated to 32 bytes
+BINARY_DTYPE = np.dtype(
+    [
+        ("timestamp", "<i8"),
+        ("latitude", "<f8"),
+        ("longitude", "<f8"),
+        ("elevation", "<f8"),
+        ("identifier", "S32"),
+    ]
+)
+
+
+class Encoder:
+    """Encoding of the datapoints of a generator. Encoders encode whole
+    arrays of datapoints at once, each datapoint into `bytes`.
+
+    Subclasses implement `_encode`, and set the `content_type` and the
+    `separator` of consecutive datapoints in a stream of datapoints.
+
+    > *Input arguments*
+
+    * `identifier` (*type:* `str`): Identifier of the generator
+    """
+
+    name = None
+    content_type = "application/octet-stream"
+    separator = b"\n"
+
+    def __init__(self, identifier: str):
+        self.identifier = identifier
+
+    def encode(
+        self,
+        latitude: np.ndarray,
+        longitude: np.ndarray,
+        elevation: np.ndarray,
+        timestamps: list[datetime],
+    ) -> list[bytes]:
+        """Encode datapoints given as arrays.
+
+        > *Input arguments*
+
+        * `latitude` (*type:* `numpy.array`): Latitudes in degrees
+        * `longitude` (*type:* `numpy.array`): Longitudes in degrees
+        * `elevation` (*type:* `numpy.array`): Elevations in meters
+        * `timestamps` (*type:* list of `datetime`): Timestamps of the datapoints
+
+        > *Returns*
+
+        List of `bytes`, one per datapoint
+        """
+        if len(timestamps) == 0:
+            return list()
+        timestamps, utc_offset = get_timestamp_array(timestamps)
+        return self._encode(
+            np.ascontiguousarray(latitude, dtype=float),
+            np.ascontiguousarray(longitude, dtype=float),
+            np.ascontiguousarray(elevation, dtype=float),
+            timestamps,
+            utc_offset,
+        )
+
+    def frame(self, batch: list[bytes]) -> bytes:
+        """Join encoded datapoints into a stream, e.g. lines of a file."""
+        return self.separator.join(batch) + self.separator
+
+    def payload(self, batch: list[bytes]) -> bytes:
+        """Join encoded datapoints into the body of a single message."""
+        return self.frame(batch)
+
+    def _encode(self, latitude, longitude, elevation, timestamps, utc_offset):
+        raise NotImplementedError
+
+
+class JsonEncoder(Encoder):
+    """Encoding of each datapoint as a JSON object with the fields
+    `latitude`, `longitude`, `elevation`, `timestamp` (ISO 8601) and
+    `identifier`. The numbers are formatted by `orjson` a column at a time,
+    if installed."""
+
+    name = "json"
+    content_type = "application/json"
+    separator = b"\n"
+
+    def __init__(self, identifier: str):
+        super().__init__(identifier)
+        # Fill in the fields by '%' formatting, the identifier is escaped
+        # once and is the only field that may contain a '%'
+        self._template = (
+            b'{"latitude":%s,"longitude":%s,"elevation":%s,"timestamp":"%s","identifier":'
+            + json.dumps(identifier).encode().replace(b"%", b"%%")
+            + b"}"
+        )
+
+    def payload(self, batch: list[bytes]) -> bytes:
+        # A single datapoint is sent as a JSON object, several as a JSON list
+        if len(batch) == 1:
+            return batch[0]
+        return b"[" + b",".join(batch) + b"]"
+
+    def _encode(self, latitude, longitude, elevation, timestamps, utc_offset):
+        timestamps = [
+            timestamp + utc_offset
+            for timestamp in np.datetime_as_string(timestamps, unit="us")
+            .astype("S")
+            .tolist()
+        ]
+        template = self._template
+        return [
+            template % fields
+            for fields in zip(
+                format_floats(latitude),
+                format_floats(longitude),
+                format_floats(elevation),
+                timestamps,
+            )
+        ]
+
+
+class NmeaEncoder(Encoder):
+    """Encoding of each datapoint as NMEA 0183 sentences (`GGA`, `RMC` and/or
+    `VTG`), separated by `\\r\\n`. The speed and course over ground are
+    derived from consecutive datapoints, and the fix quality, number of
+    satellites and HDOP of `GGA` sentences are fixed. The checksums of all
+    sentences are computed at once.
+
+    > *Input arguments*
+
+    * `identifier` (*type:* `str`): Identifier of the generator
+    * `sentences` (*type:* list of `str`, *default:* `None`): Sentences emitted for each datapoint, defaults to all of `NMEA_SENTENCES`
+    """
+
+    name = "nmea"
+    content_type = "text/plain"
+    separator = b"\r\n"
+
+    def __init__(self, identifier: str, sentences: list[str] = None):
+        super().__init__(identifier)
+        self.sentences = sentences or NMEA_SENTENCES
+        assert all(
+            sentence in NMEA_SENTENCES for sentence in self.sentences
+        ), "Invalid NMEA sentence"
+
+    def _encode(self, latitude, longitude, elevation, timestamps, utc_offset):
+        time = format_nmea_time(timestamps)
+        lat_deg, lat_min = get_degrees_minutes(latitude)
+        lon_deg, lon_min = get_degrees_minutes(longitude)
+        lat_hemisphere = np.where(latitude < 0, b"S", b"N").tolist()
+        lon_hemisphere = np.where(longitude < 0, b"W", b"E").tolist()
+        speed, course = get_speed_course(latitude, longitude, timestamps)
+        position = list(
+            zip(
+                time, lat_deg, lat_min, lat_hemisphere, lon_deg, lon_min, lon_hemisphere
+            )
+        )
+
+        # The sentences without the leading '$' and the checksum, grouped by
+        # datapoint
+        bodies = list()
+        if "GGA" in self.sentences:
+            bodies.append(
+                [
+                    b"GPGGA,%s,%02d%09.6f,%s,%03d%09.6f,%s,1,08,1.0,%.1f,M,0.0,M,,"
+                    % (*fields, altitude)
+                    for fields, altitude in zip(position, elevation.tolist())
+                ]
+            )
+        if "RMC" in self.sentences:
+            bodies.append(
+                [
+                    b"GPRMC,%s,A,%02d%09.6f,%s,%03d%09.6f,%s,%.2f,%.1f,%s,,,A"
+                    % (*fields, knots, degrees, date)
+                    for fields, knots, degrees, date in zip(
+                        position,
+                        (speed * MS_TO_KNOTS).tolist(),
+                        course.tolist(),
+                        format_nmea_date(timestamps),
+                    )
+                ]
+            )
+        if "VTG" in self.sentences:
+            bodies.append(
+                [
+                    b"GPVTG,%.1f,T,,M,%.2f,N,%.2f,K,A" % fields
+                    for fields in zip(
+                        course.tolist(),
+                        (speed * MS_TO_KNOTS).tolist(),
+                        (speed * MS_TO_KMH).tolist(),
+                    )
+                ]
+            )
+
+        # Interleave the sentences of each datapoint and add their checksums
+        bodies = [body for group in zip(*bodies) for body in group]
+        sentences = [
+            b"$%s*%02X" % fields for fields in zip(bodies, get_nmea_checksums(bodies))
+        ]
+        num_sentences = len(self.sentences)
+        return [
+            b"\r\n".join(sentences[i : i + num_sentences])
+            for i in range(0, len(sentences), num_sentences)
+        ]
+
+
+class BinaryEncoder(Encoder):
+    """Encoding of each datapoint as a fixed-width 64 byte record, see
+    `BINARY_DTYPE`. Records are not separated in a stream."""
+
+    name = "binary"
+    content_type = "application/octet-stream"
+    separator = b""
+
+    def _encode(self, latitude, longitude, elevation, timestamps, utc_offset):
+        records = np.empty(len(timestamps), dtype=BINARY_DTYPE)
+        records["timestamp"] = timestamps.astype("int64")
+        records["latitude"] = latitude
+        records["longitude"] = longitude
+        records["elevation"] = elevation
+        records["identifier"] = self.identifier.encode()[
+            : BINARY_DTYPE["identifier"].itemsize
+        ]
+        data = records.tobytes()
+        size = BINARY_DTYPE.itemsize
+        return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+# Encoders by the name used in a 'TrajectoryGeneratorSpecification'
+ENCODERS = {
+    "json": JsonEncoder,
+    "nmea": NmeaEncoder,
+    "binary": BinaryEncoder,
+}
+
+
+def get_encoder(name: str, identifier: str, **kwargs) -> Encoder:
+    return ENCODERS[name](identifier, **kwargs)
+
+
+def get_timestamp_array(timestamps: list[datetime]) -> tuple[np.ndarray, bytes]:
+    # Convert the timestamps to 'datetime64[us]'. Timezone aware timestamps
+    # are converted to UTC, and the UTC offset to append to their ISO 8601
+    # strings is returned
+    if timestamps[0].tzinfo is not None:
+        timestamps = [
+            timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+            for timestamp in timestamps
+        ]
+        return np.array(timestamps, dtype="datetime64[us]"), b"+00:00"
+    return np.array(timestamps, dtype="datetime64[us]"), b""
+
+
+def format_floats(values: np.ndarray) -> list[bytes]:
+    # Format floats as the shortest strings that round-trip, formatting the
+    # whole array at once with 'orjson' if installed
+    if orjson is not None and len(values):
+        return orjson.dumps(values, option=orjson.OPT_SERIALIZE_NUMPY)[1:-1].split(b",")
+    return [repr(value).encode() for value in values.tolist()]
+
+
+def get_degrees_minutes(values: np.ndarray) -> tuple[list[int], list[float]]:
+    # Split absolute coordinates in degrees into whole degrees and minutes,
+    # rounded as in the NMEA sentences so that they never show 60 minutes
+    values = np.abs(values)
+    degrees = np.floor(values)
+    minutes = np.round((values - degrees) * 60.0, 6)
+    carry = minutes >= 60.0
+    degrees[carry] += 1
+    minutes[carry] -= 60.0
+    return degrees.astype(int).tolist(), minutes.tolist()
+
+
+def get_speed_course(
+    latitude: np.ndarray, longitude: np.ndarray, timestamps: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    # Speed (m/s) and course (degrees from true north) of the UUV towards
+    # each datapoint from the previous one, by an equirectangular
+    # approximation which is accurate over the short distances involved. The
+    # first datapoint gets the speed and course towards the second one
+    if len(latitude) < 2:
+        return np.zeros(len(latitude)), np.zeros(len(latitude))
+    latitude, longitude = np.radians(latitude), np.radians(longitude)
+    north = np.diff(latitude) * EARTH_RADIUS
+    east = (
+        np.diff(longitude) * EARTH_RADIUS * np.cos((latitude[1:] + latitude[:-1]) / 2)
+    )
+    seconds = np.diff(timestamps).astype("int64") / 1e6
+    speed = np.divide(
+        np.hypot(north, east),
+        seconds,
+        out=np.zeros_like(seconds),
+        where=seconds > 0,
+    )
+    course = np.degrees(np.arctan2(east, north)) % 360.0
+    return np.concatenate([speed[:1], speed]), np.concatenate([course[:1], course])
+
+
+def format_nmea_time(timestamps: np.ndarray) -> list[bytes]:
+    # 'hhmmss.ss' (UTC)
+    microseconds = (timestamps - timestamps.astype("datetime64[D]")).astype("int64")
+    hours, microseconds = np.divmod(microseconds, 3_600_000_000)
+    minutes, microseconds = np.divmod(microseconds, 60_000_000)
+    centiseconds = microseconds // 10_000
+    return [
+        b"%02d%02d%02d.%02d" % (hh, mm, cs // 100, cs % 100)
+        for hh, mm, cs in zip(hours.tolist(), minutes.tolist(), centiseconds.tolist())
+    ]
+
+
+def format_nmea_date(timestamps: np.ndarray) -> list[bytes]:
+    # 'ddmmyy' (UTC)
+    dates = np.datetime_as_string(timestamps, unit="D").astype("S").tolist()
+    return [date[8:10] + date[5:7] + date[2:4] for date in dates]
+
+
+def get_nmea_checksums(bodies: list[bytes]) -> list[int]:
+    # The checksum of an NMEA sentence is the XOR of the characters between
+    # '$' and '*'. The checksums of all sentences are reduced at once over
+    # their concatenation
+    lengths = np.fromiter((len(body) for body in bodies), dtype=np.int64)
+    offsets = np.concatenate([[0], np.cumsum(lengths[:-1])])
+    data = np.frombuffer(b"".join(bodies), dtype=np.uint8)
+    return np.bitwise_xor.reduceat(data, offsets).tolist()
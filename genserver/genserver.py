@@ -5,18 +5,25 @@ import time
 import asyncio
 import redis
 from fastapi import WebSocket
-from celery_worker import _uuv_trajectory_producer
-from models import TrajectoryGeneratorSpecification
-from fastapi.responses import JSONResponse
-from fastapi import FastAPI, Request, HTTPException
+from metrics import observe_redis
+from prometheus_client import CONTENT_TYPE_LATEST, Gauge, generate_latest
+from models import TrajectoryGeneratorSpecification, TrajectoryWaypointsUpdate
+from tasks import start_uuv_trajectory_producer
+from pydantic import ValidationError
+from fastapi.responses import JSONResponse, Response
+from fastapi import FastAPI, Request, HTTPException, UploadFile, File, Form
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from datetime import datetime
 from settings import (
+    EMITTER_CLUSTER,
+    MAX_YAML_MISSION_PLAN_SIZE,
     REDIS_HOST,
     REDIS_PORT,
     REDIS_DB,
     REDIS_KV_STORE_PREFIX_GENERATOR,
+    REDIS_KV_STORE_PREFIX_WAYPOINTS,
+    REDIS_KV_STORE_PREFIX_SPECIFICATION,
     REDIS_SORTED_SET_PREFIX_GENERATOR,
     REDIS_SORTED_SET_GENERATORS,
 )
@@ -39,12 +46,27 @@ r = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=REDIS_DB)
 # Make sure all data are flushed from redis on startup
 r.flushall()
 
+# Number of generators registered in Redis, read whenever the metrics are
+# collected
+GENERATORS_REGISTERED = Gauge(
+    "uuv_generators_registered",
+    "Number of generators registered as running.",
+)
+GENERATORS_REGISTERED.set_function(lambda: r.zcard(REDIS_SORTED_SET_GENERATORS))
+
 
 @app.get("/")
 def home_page(request: Request):
     return templates.TemplateResponse("home/index.html", {"request": request})
 
 
+@app.get("/metrics")
+def metrics():
+    # Metrics of the API in the Prometheus text format. The metrics of the
+    # generators are exported by the Celery workers
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
 def format_timedelta(td, digits: int = 2) -> str:
     if digits < 0:
         ValueError("Input 'digits' < 0. Valid input is 'digits' >= 0.")
@@ -96,12 +118,13 @@ async def ws_generators_status(websocket: WebSocket) -> None:
     await websocket.accept()
     try:
         while True:
-            generator_ids = [
-                member.decode()
-                for member in r.zrange(
-                    REDIS_SORTED_SET_GENERATORS, 0, -1, withscores=False
-                )
-            ]
+            with observe_redis("generators_status"):
+                generator_ids = [
+                    member.decode()
+                    for member in r.zrange(
+                        REDIS_SORTED_SET_GENERATORS, 0, -1, withscores=False
+                    )
+                ]
 
             table = await compile_generator_status_table(generator_ids=generator_ids)
 
@@ -164,18 +187,18 @@ async def ws_generator_log(websocket: WebSocket, generator_id: str) -> None:
 
         while True:
             # Track the current number of log entries in the sorted set
-            cardinality = r.zcard(
-                REDIS_SORTED_SET_PREFIX_GENERATOR + "-" + generator_id
-            )
+            with observe_redis("generator_log"):
+                cardinality = r.zcard(
+                    REDIS_SORTED_SET_PREFIX_GENERATOR + "-" + generator_id
+                )
 
             # Decide if we need to display any new log entries
-            if cardinality == cardinality_seen:
-                continue
-            else:
+            if cardinality > cardinality_seen:
+                # Fetch all entries added since the last update
                 new_log_entries = r.zrange(
                     REDIS_SORTED_SET_PREFIX_GENERATOR + "-" + generator_id,
                     cardinality_seen,
-                    cardinality_seen,
+                    cardinality - 1,
                     withscores=True,
                 )
                 # Update the current number of entries seen
@@ -208,10 +231,73 @@ async def stop_task(generator_id: str):
     # associated with the specific generator
     r.delete(REDIS_SORTED_SET_PREFIX_GENERATOR + "-" + generator_id)
     r.delete(REDIS_KV_STORE_PREFIX_GENERATOR + "-" + generator_id)
+    r.delete(REDIS_KV_STORE_PREFIX_WAYPOINTS + "-" + generator_id)
+    r.delete(REDIS_KV_STORE_PREFIX_SPECIFICATION + "-" + generator_id)
 
     return JSONResponse({"message": f"Generator '{generator_id}' shut down."}, 200)
 
 
+@app.patch("/generators/{generator_id}/waypoints")
+async def update_waypoints(generator_id: str, update: TrajectoryWaypointsUpdate):
+    scores = r.zmscore(key=REDIS_SORTED_SET_GENERATORS, members=[generator_id])
+
+    # If 'None' is in the list then the generator is not running
+    if None in scores:
+        raise HTTPException(
+            status_code=404,
+            detail=f"No running generator with the identifier '{generator_id}'.",
+        )
+
+    # Hand the new waypoints over to the running generator, which picks them
+    # up before emitting its next datapoint. A pending update that has not
+    # been picked up yet is replaced
+    r.set(
+        REDIS_KV_STORE_PREFIX_WAYPOINTS + "-" + generator_id, update.model_dump_json()
+    )
+
+    return JSONResponse(
+        {"message": f"Waypoints of generator '{generator_id}' updated."}, 200
+    )
+
+
+@app.post(
+    "/producer/uuv/trajectory/upload",
+    description=(
+        "Start a generator with the waypoints of an uploaded mission plan, a "
+        "GeoJSON 'LineString' ('.geojson', '.json'), CSV ('.csv') or YAML "
+        "('.yaml', '.yml') file. The other fields of the specification are "
+        "given as a JSON string. YAML mission plans are limited to "
+        f"{MAX_YAML_MISSION_PLAN_SIZE} bytes, larger mission plans are read "
+        "much faster from CSV or GeoJSON files."
+    ),
+)
+async def uuv_trajectory_producer_upload(
+    specification: str = Form(...), mission_plan: UploadFile = File(...)
+):
+    # The waypoints are read from the uploaded mission plan (GeoJSON 'LineString',
+    # CSV or YAML file), the other fields of the 'TrajectoryGeneratorSpecification'
+    # are given as a JSON string. The mission plan readers (numpy, PyYAML) are
+    # only imported once a mission plan is uploaded
+    from mission_plan import read_mission_plan, mission_plan_to_waypoints
+
+    try:
+        waypoints = read_mission_plan(
+            filename=mission_plan.filename or "", data=await mission_plan.read()
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    try:
+        specification = TrajectoryGeneratorSpecification.model_validate(
+            {
+                **json.loads(specification),
+                "waypoints": mission_plan_to_waypoints(waypoints),
+            }
+        )
+    except (ValueError, ValidationError) as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return await uuv_trajectory_producer(specification=specification)
+
+
 @app.post("/producer/uuv/trajectory")
 async def uuv_trajectory_producer(specification: TrajectoryGeneratorSpecification):
     scores = r.zmscore(
@@ -220,6 +306,15 @@ async def uuv_trajectory_producer(specification: TrajectoryGeneratorSpecificatio
 
     # If 'None' is not in the list then the identifier is not already in use
     if None in scores:
+        if EMITTER_CLUSTER:
+            # Store the specification for the emitter node that the generator
+            # is assigned to, which picks it up once the generator is inserted
+            # into the sorted set below
+            r.set(
+                REDIS_KV_STORE_PREFIX_SPECIFICATION + "-" + specification.identifier,
+                specification.model_dump_json(),
+            )
+
         # Insert the generator ID and corresponding current time into a sorted set
         r.zadd(REDIS_SORTED_SET_GENERATORS, {specification.identifier: time.time()})
 
@@ -231,8 +326,9 @@ async def uuv_trajectory_producer(specification: TrajectoryGeneratorSpecificatio
             REDIS_KV_STORE_PREFIX_GENERATOR + "-" + specification.identifier, metadata
         )
 
-        # Start the generator
-        _uuv_trajectory_producer.delay(specification.model_dump_json())
+        # Start the generator, unless it is started by an emitter node
+        if not EMITTER_CLUSTER:
+            start_uuv_trajectory_producer(specification.model_dump_json())
 
         return JSONResponse(
             {"message": f"Generator '{specification.identifier}' started."}, 200
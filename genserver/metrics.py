@@ -0,0 +1,128 @@
+import os
+import shutil
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+from prometheus_client import (
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    start_http_server,
+)
+from prometheus_client import multiprocess
+
+# Buckets (s) for the latency of requests to consumers and Redis commands
+LATENCY_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+)
+# Buckets (s) for the lag of emitted datapoints behind their schedule
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Buckets (s) for the duration of the stages of the path construction
+STAGE_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Metrics of the generators, updated by the Celery workers. With a prefork
+# pool, each worker process writes its metrics to 'PROMETHEUS_MULTIPROC_DIR'
+# and the exporter aggregates them
+GENERATORS_ACTIVE = Gauge(
+    "uuv_generators_active",
+    "Number of generators currently running in the worker.",
+    multiprocess_mode="livesum",
+)
+DATAPOINTS_EMITTED = Counter(
+    "uuv_datapoints_emitted",
+    "Number of datapoints emitted by each generator.",
+    ["generator"],
+)
+DATAPOINTS_SKIPPED = Counter(
+    "uuv_datapoints_skipped",
+    "Number of datapoints skipped by each generator as they were overdue.",
+    ["generator"],
+)
+SCHEDULE_LAG = Histogram(
+    "uuv_schedule_lag_seconds",
+    "Time between the planned and actual emission of a datapoint.",
+    buckets=LAG_BUCKETS,
+)
+DELIVERY_LATENCY = Histogram(
+    "uuv_delivery_latency_seconds",
+    "Duration of the requests delivering datapoints to each destination.",
+    ["destination"],
+    buckets=LATENCY_BUCKETS,
+)
+DELIVERY_ERRORS = Counter(
+    "uuv_delivery_errors",
+    "Number of failed deliveries of datapoints to each destination.",
+    ["destination", "reason"],
+)
+PATH_STAGE_DURATION = Histogram(
+    "uuv_path_stage_duration_seconds",
+    "Duration of each stage of constructing and sampling a path.",
+    ["stage"],
+    buckets=STAGE_BUCKETS,
+)
+
+# Metrics of Redis, updated by both the API and the Celery workers
+REDIS_COMMAND_LATENCY = Histogram(
+    "uuv_redis_command_duration_seconds",
+    "Duration of Redis commands (or pipelines) by operation.",
+    ["operation"],
+    buckets=LATENCY_BUCKETS,
+)
+
+
+def get_destination(url: str) -> str:
+    # Label deliveries by the host of the destination rather than the full
+    # URL, to keep the number of label values bounded. Credentials are left
+    # out, and destinations without a host (files) are labelled by the scheme
+    parts = urlsplit(url)
+    return parts.netloc.rpartition("@")[2] or parts.scheme
+
+
+def observe_path_stage(stage: str, duration: float) -> None:
+    # Observer of a 'profiling.StageProfiler'
+    PATH_STAGE_DURATION.labels(stage).observe(duration)
+
+
+@contextmanager
+def observe_redis(operation: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        REDIS_COMMAND_LATENCY.labels(operation).observe(time.perf_counter() - start)
+
+
+def clear_multiprocess_dir() -> None:
+    # Remove the metrics of previous runs of the worker processes
+    path = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if path:
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path, exist_ok=True)
+
+
+def mark_process_dead(pid: int) -> None:
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(pid)
+
+
+def start_exporter(port: int) -> None:
+    # Serve the metrics of all worker processes if they share a
+    # 'PROMETHEUS_MULTIPROC_DIR', otherwise those of this process
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        start_http_server(port, registry=registry)
+    else:
+        start_http_server(port)
@@ -0,0 +1,136 @@
+import io
+import json
+import os
+import numpy as np
+import yaml
+from settings import MAX_YAML_MISSION_PLAN_SIZE
+
+# Use the C-accelerated YAML loader if PyYAML was built with it
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+# Accepted CSV column names of the waypoint coordinates
+CSV_COLUMNS = {
+    "latitude": ["latitude", "lat"],
+    "longitude": ["longitude", "lon", "lng"],
+    "elevation": ["elevation", "ele", "alt", "altitude"],
+}
+
+
+def read_geojson_waypoints(data: bytes) -> np.ndarray:
+    # Accept a 'LineString' geometry, or a 'Feature' or 'FeatureCollection'
+    # with a single 'LineString' geometry
+    geojson = json.loads(data)
+    if not isinstance(geojson, dict):
+        raise ValueError("The GeoJSON mission plan must be a JSON object.")
+    if geojson.get("type") == "FeatureCollection":
+        geometries = [feature.get("geometry") for feature in geojson["features"]]
+        geometries = [g for g in geometries if g and g["type"] == "LineString"]
+        if len(geometries) != 1:
+            raise ValueError(
+                "The GeoJSON 'FeatureCollection' must contain exactly one 'LineString'."
+            )
+        geojson = geometries[0]
+    elif geojson.get("type") == "Feature":
+        geojson = geojson.get("geometry") or {}
+    if geojson.get("type") != "LineString":
+        raise ValueError("The GeoJSON mission plan must be a 'LineString'.")
+
+    # GeoJSON positions are given as (longitude, latitude[, elevation])
+    coordinates = geojson["coordinates"]
+    if len(coordinates) and any(len(c) != len(coordinates[0]) for c in coordinates):
+        raise ValueError("All GeoJSON positions must have the same dimension.")
+    coordinates = np.asarray(coordinates, dtype=float).reshape(len(coordinates), -1)
+    if coordinates.shape[1] not in [2, 3]:
+        raise ValueError("GeoJSON positions must have 2 or 3 coordinates.")
+    waypoints = np.zeros((len(coordinates), 3))
+    waypoints[:, 0] = coordinates[:, 1]
+    waypoints[:, 1] = coordinates[:, 0]
+    if coordinates.shape[1] == 3:
+        waypoints[:, 2] = coordinates[:, 2]
+    return waypoints
+
+
+def read_csv_waypoints(data: bytes) -> np.ndarray:
+    # The first line is a header naming the columns, the elevation column is
+    # optional
+    text = data.decode("utf-8-sig")
+    header, _, body = text.partition("\n")
+    names = [name.strip().lower() for name in header.split(",")]
+    usecols = []
+    for column, aliases in CSV_COLUMNS.items():
+        matches = [i for i, name in enumerate(names) if name in aliases]
+        if len(matches) == 0 and column != "elevation":
+            raise ValueError(f"The CSV mission plan has no '{column}' column.")
+        usecols += matches[:1]
+
+    values = np.loadtxt(
+        io.StringIO(body), delimiter=",", usecols=usecols, ndmin=2, dtype=float
+    )
+    waypoints = np.zeros((len(values), 3))
+    waypoints[:, : len(usecols)] = values
+    return waypoints
+
+
+def read_yaml_waypoints(data: bytes) -> np.ndarray:
+    # Accept a list of waypoints, or a mapping with a 'waypoints' list, with
+    # each waypoint given by its 'latitude', 'longitude' and 'elevation'. The
+    # size is checked before parsing, since large YAML files are slow to read
+    if len(data) > MAX_YAML_MISSION_PLAN_SIZE:
+        raise ValueError(
+            f"YAML mission plans are limited to {MAX_YAML_MISSION_PLAN_SIZE} bytes, "
+            "upload larger mission plans as CSV or GeoJSON files."
+        )
+    waypoints = yaml.load(data, Loader=YAML_LOADER)
+    if isinstance(waypoints, dict):
+        waypoints = waypoints.get("waypoints")
+    if not isinstance(waypoints, list):
+        raise ValueError("The YAML mission plan must contain a list of waypoints.")
+    return np.array(
+        [
+            (wp["latitude"], wp["longitude"], wp.get("elevation", 0.0))
+            for wp in waypoints
+        ],
+        dtype=float,
+    ).reshape(-1, 3)
+
+
+MISSION_PLAN_READERS = {
+    ".geojson": read_geojson_waypoints,
+    ".json": read_geojson_waypoints,
+    ".csv": read_csv_waypoints,
+    ".yaml": read_yaml_waypoints,
+    ".yml": read_yaml_waypoints,
+}
+
+
+def read_mission_plan(filename: str, data: bytes) -> np.ndarray:
+    # Parse a mission plan file into an (N, 3) array of latitude, longitude and
+    # elevation values, choosing the format from the file extension
+    extension = os.path.splitext(filename)[1].lower()
+    if extension not in MISSION_PLAN_READERS:
+        raise ValueError(
+            f"Unsupported mission plan format '{extension}'. Supported formats: "
+            + ", ".join(MISSION_PLAN_READERS)
+        )
+    try:
+        waypoints = MISSION_PLAN_READERS[extension](data)
+    except (
+        AttributeError,
+        KeyError,
+        TypeError,
+        UnicodeDecodeError,
+        yaml.YAMLError,
+    ) as e:
+        raise ValueError(f"Invalid mission plan: {e}")
+    if not np.all(np.isfinite(waypoints)):
+        raise ValueError("The mission plan contains non-numeric coordinates.")
+    return waypoints
+
+
+def mission_plan_to_waypoints(waypoints: np.ndarray) -> list[dict[str, float]]:
+    # Convert an array of latitude, longitude and elevation values into the
+    # waypoint format of a 'TrajectoryGeneratorSpecification'
+    return [
+        {"latitude": latitude, "longitude": longitude, "elevation": elevation}
+        for latitude, longitude, elevation in waypoints.tolist()
+    ]
@@ -1,6 +1,8 @@
-from pydantic import BaseModel, field_validator, HttpUrl, Field
+from pydantic import AnyUrl, BaseModel, field_validator, model_validator, Field
 import datetime
-from typing import Optional
+from typing import Literal, Optional
+from settings import MIN_PATH_TOLERANCE
+from sinks import SINKS, get_file_path
 
 
 class Waypoint(BaseModel):
@@ -14,9 +16,9 @@ class TrajectoryGeneratorSpecification(BaseModel):
         ...,
         description="A unique identifier for the trajectory generator that should not contain spaces.",
     )
-    url: HttpUrl = Field(
+    url: AnyUrl = Field(
         ...,
-        description="The URL to which the generated data will be sent as POST requests.",
+        description="The URL to which the generated data will be sent. The scheme selects the sink: 'http(s)://' sends POST requests, 'file://' appends to an NDJSON file (or writes a Parquet file if it ends in '.parquet', the path may contain '{identifier}'), 'redis://host:port/db?stream=name' adds to a Redis Stream, 'mqtt://host:port/topic' publishes MQTT messages, 'kafka://host:port/topic' produces Kafka messages and 'udp://host:port' sends UDP datagrams.",
     )
     waypoints: list[Waypoint] = Field(
         ...,
@@ -58,6 +60,60 @@ class TrajectoryGeneratorSpecification(BaseModel):
         default=25,
         description="Turning radius of the UUV in meters, affecting the navigational capabilities around waypoints.",
     )
+    # The maximum deviation (m) between the interpolated path and its polyline
+    # approximation
+    # -> If not given, DEFAULT_PATH_TOLERANCE is used
+    path_tolerance: Optional[float] = Field(
+        default=None,
+        description="Maximum deviation in meters between the interpolated path and the points used to represent it. Must be at least 0.001 m. If not given, a tolerance of 0.05 m is used.",
+    )
+
+    # The tolerance (m) used to simplify the waypoints before interpolation
+    # -> If not given, all waypoints are used
+    simplify_tolerance: Optional[float] = Field(
+        default=None,
+        description="Tolerance in meters used to remove near-duplicate waypoints and waypoints that do not change the shape of the mission plan, e.g. in dense GPS tracks. If not given, all waypoints are used.",
+    )
+    simplify_method: Optional[Literal["douglas_peucker", "visvalingam"]] = Field(
+        default="douglas_peucker",
+        description="Algorithm used to simplify the waypoints if 'simplify_tolerance' is given.",
+    )
+
+    # The maximum lag (s) of the emission of a datapoint behind its schedule
+    # -> If exceeded, the overdue datapoints are handled by 'lag_policy'
+    max_schedule_lag: Optional[float] = Field(
+        default=None,
+        description="Maximum time in seconds the emission of a datapoint may fall behind its schedule, e.g. when the consumer responds slowly. If exceeded, the overdue datapoints are handled according to 'lag_policy'. If not given, all datapoints are sent one by one, however late.",
+    )
+    lag_policy: Optional[Literal["skip", "coalesce"]] = Field(
+        default="skip",
+        description="How overdue datapoints are handled if 'max_schedule_lag' is exceeded: 'skip' drops them and continues with the latest overdue datapoint, 'coalesce' delivers them together with the latest overdue datapoint as one batch to the sink.",
+    )
+    # The number of datapoints delivered together to the sink
+    # -> Larger batches give higher throughput at the cost of latency
+    batch_size: Optional[int] = Field(
+        default=1,
+        description="Number of datapoints delivered together to the sink, e.g. as a JSON list in a single POST request.",
+    )
+    # The maximum time (s) a datapoint waits for its batch to fill up
+    batch_interval: Optional[float] = Field(
+        default=None,
+        description="Maximum time in seconds a datapoint waits for its batch to fill up before the batch is delivered. If not given, batches are only delivered once full (and at the end of the trajectory).",
+    )
+    # The encoding of the datapoints delivered to the sink
+    encoding: Optional[Literal["json", "nmea", "binary"]] = Field(
+        default="json",
+        description="Encoding of the datapoints delivered to the sink: 'json' as JSON objects, 'nmea' as NMEA 0183 sentences, or 'binary' as fixed-width 64 byte records (with the identifier truncated to 32 bytes). Parquet files require the 'json' encoding.",
+    )
+    nmea_sentences: Optional[list[Literal["GGA", "RMC", "VTG"]]] = Field(
+        default=None,
+        description="NMEA 0183 sentences emitted for each datapoint with the 'nmea' encoding. If not given, all of 'GGA', 'RMC' and 'VTG' are emitted.",
+    )
+    # Profile the construction of the path, in addition to timing its stages
+    profile: Optional[Literal["cprofile", "pyinstrument"]] = Field(
+        default=None,
+        description="Profiler used to profile the construction of the path, with the results written to the profile directory of the worker. If not given, only the duration of each stage is measured.",
+    )
 
     @field_validator("identifier")
     def validate_identifier(cls, value) -> str:
@@ -66,6 +122,32 @@ class TrajectoryGeneratorSpecification(BaseModel):
             raise ValueError("The 'identifier' cannot contain whitespaces.")
         return value
 
+    @field_validator("url")
+    def validate_url(cls, value) -> AnyUrl:
+        # Check that there is a sink for the URL
+        if value.scheme not in SINKS:
+            raise ValueError(
+                f"The 'url' scheme must be one of {', '.join(SINKS)}, not '{value.scheme}'."
+            )
+        return value
+
+    @field_validator("batch_size")
+    def validate_batch_size(cls, value) -> int:
+        # Check that each batch contains at least one datapoint
+        if value is not None and value < 1:
+            raise ValueError("The field 'batch_size' must be at least 1.")
+        return value
+
+    @field_validator("path_tolerance")
+    def validate_path_tolerance(cls, value) -> float:
+        # A tolerance of zero cannot be met by a polyline, and tiny tolerances
+        # represent the path by an excessive number of points
+        if value is not None and value < MIN_PATH_TOLERANCE:
+            raise ValueError(
+                f"The field 'path_tolerance' must be at least {MIN_PATH_TOLERANCE} m."
+            )
+        return value
+
     @field_validator("waypoints")
     def validate_waypoints(cls, value) -> list[Waypoint]:
         # Check if the identifier contains any whitespaces
@@ -81,9 +163,39 @@ class TrajectoryGeneratorSpecification(BaseModel):
         "std_speed",
         "std_spatial",
         "turning_radius",
+        "simplify_tolerance",
+        "max_schedule_lag",
+        "batch_interval",
     )
     def check_positive(cls, value, field) -> float:
         # Ensure that the provided values are positive
-        if value < 0:
+        if value is not None and value < 0:
             raise ValueError(f"The field '{field.field_name}' must be positive.")
         return value
+
+    @model_validator(mode="after")
+    def validate_encoding(self) -> "TrajectoryGeneratorSpecification":
+        # Parquet files are written from the fields of JSON encoded datapoints
+        if (
+            self.url.scheme == "file"
+            and get_file_path(str(self.url), self.identifier).endswith(".parquet")
+            and self.encoding not in (None, "json")
+        ):
+            raise ValueError("Parquet files require the 'json' encoding.")
+        return self
+
+
+class TrajectoryWaypointsUpdate(BaseModel):
+    waypoints: list[Waypoint] = Field(
+        ...,
+        description="A list of geographical waypoints replacing the remaining waypoints of a running generator. The new path starts at the last emitted position of the UUV; requires at least one waypoint.",
+    )
+
+    @field_validator("waypoints")
+    def validate_waypoints(cls, value) -> list[Waypoint]:
+        # Check that there is a waypoint to navigate to
+        if len(value) < 1:
+            raise ValueError(
+                "The list 'waypoints' need to contain at least 1 waypoint."
+            )
+        return value
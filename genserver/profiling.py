@@ -0,0 +1,168 @@
+import cProfile
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Callable, Optional
+
+# Profilers that can be requested in a 'TrajectoryGeneratorSpecification'
+PROFILERS = ["cprofile", "pyinstrument"]
+
+# Only one cProfile profiler can be active in a process (Python 3.12 raises
+# otherwise, and profiles all threads with it), so a generator requesting one
+# while another generator is profiled is only timed
+_cprofile_lock = threading.Lock()
+
+# The stage profiler of the generator running in the current thread (or task)
+_current_profiler = ContextVar("stage_profiler", default=None)
+
+# Returned by 'span' if no stage profiler is active, so that disabled spans
+# cost a single context variable lookup
+_NULL_SPAN = nullcontext()
+
+
+def span(stage: str):
+    # Time a stage of the generator running in the current thread, e.g.
+    #
+    #   with span("generate_path"):
+    #       ...
+    #
+    # Nested spans are named by their path, e.g. 'generate_path/init_interpolator'
+    profiler = _current_profiler.get()
+    if profiler is None:
+        return _NULL_SPAN
+    return profiler.span(stage)
+
+
+class StageProfiler:
+    """Measure the duration of the stages of a generator, which are marked
+    by `span` in the code run while the profiler is active. The durations
+    are passed on to the `observers`, e.g. to update metrics, and summarized
+    by `summary`. Optionally, the whole run is profiled by `cProfile` or
+    `pyinstrument` and the results are written to `profile_dir`. Only one
+    generator at a time is profiled by `cProfile`, other generators
+    requesting it are only timed.
+
+    > *Input arguments*
+
+    * `name` (*type:* `str`): Name of the profiled generator, used in the summary and the profile filenames
+    * `observers` (*type:* list of `callable`, *default:* `None`): Functions called as `observer(stage, duration)` at the end of each stage
+    * `profiler` (*type:* `str`, *default:* `None`): Profiler to run, options are `cprofile` and `pyinstrument`
+    * `profile_dir` (*type:* `str`, *default:* `None`): Directory of the profile dumps
+    """
+
+    def __init__(
+        self,
+        name: str,
+        observers: Optional[list[Callable[[str, float], None]]] = None,
+        profiler: Optional[str] = None,
+        profile_dir: Optional[str] = None,
+    ):
+        assert profiler is None or profiler in PROFILERS, "Invalid profiler"
+        self._name = name
+        self._observers = observers or list()
+        self._profiler_name = profiler
+        self._profile_dir = profile_dir or "."
+        self._profiler = None
+        self._token = None
+        self._stack = list()
+        # Total duration of each stage in seconds, in the order in which the
+        # stages started
+        self._durations = dict()
+
+    @property
+    def durations(self) -> dict[str, float]:
+        """`dict`: Total duration in seconds of each stage"""
+        return self._durations
+
+    def __enter__(self):
+        self._token = _current_profiler.set(self)
+        self._start_profiler()
+        return self
+
+    def __exit__(self, *args):
+        self._stop_profiler()
+        _current_profiler.reset(self._token)
+        return False
+
+    @contextmanager
+    def span(self, stage: str):
+        self._stack.append(stage)
+        name = "/".join(self._stack)
+        self._durations.setdefault(name, 0.0)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            self._stack.pop()
+            self._durations[name] += duration
+            for observer in self._observers:
+                observer(name, duration)
+
+    def summary(self) -> str:
+        """Return a one line summary of the durations of all stages."""
+        return "Generator '{}' stages: {}".format(
+            self._name,
+            ", ".join(
+                "{} {:.1f} ms".format(name, 1000 * duration)
+                for name, duration in self._durations.items()
+            ),
+        )
+
+    def _get_profile_filename(self, extension: str) -> str:
+        os.makedirs(self._profile_dir, exist_ok=True)
+        return os.path.join(
+            self._profile_dir,
+            "{}-{}.{}".format(
+                self._name, datetime.now().strftime("%Y%m%dT%H%M%S%f"), extension
+            ),
+        )
+
+    def _start_profiler(self):
+        if self._profiler_name == "cprofile":
+            if not _cprofile_lock.acquire(blocking=False):
+                print("Cannot profile with cProfile, another generator is profiled")
+                return
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError as e:
+                # Another profiling tool, e.g. a debugger, is active
+                _cprofile_lock.release()
+                print("Cannot profile with cProfile, message={}".format(e))
+                return
+            self._profiler = profiler
+        elif self._profiler_name == "pyinstrument":
+            try:
+                from pyinstrument import Profiler
+            except ImportError:
+                print("Cannot profile with pyinstrument, it is not installed")
+                return
+            self._profiler = Profiler()
+            self._profiler.start()
+
+    def _stop_profiler(self):
+        if self._profiler is None:
+            return
+        try:
+            if self._profiler_name == "cprofile":
+                self._profiler.disable()
+                filename = self._get_profile_filename("prof")
+                self._profiler.dump_stats(filename)
+            else:
+                self._profiler.stop()
+                filename = self._get_profile_filename("html")
+                with open(filename, "w") as profile_file:
+                    profile_file.write(self._profiler.output_html())
+            print(
+                "Profile of generator '{}' written to {}".format(self._name, filename)
+            )
+        except Exception as e:
+            print("Error occured while writing profile, message={}".format(e))
+        finally:
+            if self._profiler_name == "cprofile":
+                _cprofile_lock.release()
+            self._profiler = None
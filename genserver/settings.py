@@ -1,14 +1,66 @@
+import os
+
 # Coordinate transformation settings
 UTM_ZONE = 35
 
+# Default maximum deviation in meters between the interpolated path of a
+# generator and the points used to represent it
+DEFAULT_PATH_TOLERANCE = 0.05
+# Smallest such deviation accepted in a generator specification
+MIN_PATH_TOLERANCE = 0.001
+
 # Redis settings
 REDIS_TTL = 8600
-REDIS_HOST = "redis"
-REDIS_PORT = 6379
-REDIS_DB= "1"
+# The Redis connection can be overridden by environment variables, e.g. to
+# run the services against a local Redis server
+REDIS_HOST = os.environ.get("REDIS_HOST", "redis")
+REDIS_PORT = int(os.environ.get("REDIS_PORT", 6379))
+REDIS_DB = os.environ.get("REDIS_DB", "1")
 REDIS_URL = f"redis://{REDIS_HOST}:{REDIS_PORT}/{REDIS_DB}"
 
+# Port of the metrics exporter of the Celery workers
+METRICS_PORT = int(os.environ.get("METRICS_PORT", 9100))
+
+# Largest YAML mission plan in bytes that is accepted for upload, about 15000
+# waypoints. PyYAML builds every value as a Python object, so large plans are
+# read much faster from CSV or GeoJSON files, which have no such limit
+MAX_YAML_MISSION_PLAN_SIZE = int(
+    os.environ.get("MAX_YAML_MISSION_PLAN_SIZE", 1024 * 1024)
+)
+
+# Directory of the profiles of generators that request profiling
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "/tmp/profiles")
+
+# Emitter cluster settings. In cluster mode the generators are run by emitter
+# nodes ('emitter.py') instead of Celery workers, each generator by the node
+# it is hashed to
+EMITTER_CLUSTER = os.environ.get("EMITTER_CLUSTER", "false").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+# Number of seconds between the heartbeats of an emitter node
+EMITTER_HEARTBEAT_INTERVAL = float(os.environ.get("EMITTER_HEARTBEAT_INTERVAL", 1.0))
+# Number of seconds without a heartbeat after which a node is considered gone
+EMITTER_NODE_TIMEOUT = float(os.environ.get("EMITTER_NODE_TIMEOUT", 5.0))
+# Number of seconds a node owns a generator without renewing its lease
+EMITTER_LEASE_TTL = float(os.environ.get("EMITTER_LEASE_TTL", 5.0))
+# Maximum number of seconds a node waits before restarting a generator whose
+# sink failed, the wait doubles with every consecutive failure
+EMITTER_RETRY_MAX_DELAY = float(os.environ.get("EMITTER_RETRY_MAX_DELAY", 60.0))
+# Number of points of each node on the consistent hash ring
+EMITTER_VIRTUAL_NODES = 64
+
 
 REDIS_KV_STORE_PREFIX_GENERATOR = "kvstore"
+# The keys of the generators are '<prefix>-<identifier>'. Identifiers are
+# free-form, so the other keys of a generator use a ':' after 'kvstore' to
+# never collide with the key of another generator
+REDIS_KV_STORE_PREFIX_WAYPOINTS = "kvstore:waypoints"
+REDIS_KV_STORE_PREFIX_SPECIFICATION = "kvstore:specification"
+REDIS_KV_STORE_PREFIX_LEASE = "kvstore:lease"
 REDIS_SORTED_SET_PREFIX_GENERATOR = "sortedset"
-REDIS_SORTED_SET_GENERATORS = "sortedset-generators"
\ No newline at end of file
+REDIS_SORTED_SET_GENERATORS = "sortedset-generators"
+# Like the other keys of the generators, the log of a generator is
+# '<prefix>-<identifier>', so the set of emitter nodes uses a ':' as well
+REDIS_SORTED_SET_EMITTERS = "sortedset:emitters"
\ No newline at end of file
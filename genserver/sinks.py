@@ -0,0 +1,434 @@
+import json
+import os
+import socket
+import time
+from datetime import datetime
+from typing import TYPE_CHECKING, Optional
+from urllib.parse import parse_qs, unquote, urlsplit, urlunsplit
+from metrics import DELIVERY_ERRORS, DELIVERY_LATENCY, get_destination
+
+if TYPE_CHECKING:
+    from encoders import Encoder
+
+# Maximum payload (bytes) of a UDP datagram that is not fragmented on an
+# Ethernet link (1500 bytes MTU minus the IP and UDP headers)
+MAX_DATAGRAM_SIZE = 1472
+# Default Redis Stream and MQTT topic of the datapoints
+DEFAULT_STREAM = "uuv-trajectory"
+DEFAULT_TOPIC = "uuv/trajectory"
+
+
+class SinkError(Exception):
+    """Raised if a batch of datapoints cannot be delivered to a sink.
+
+    > *Input arguments*
+
+    * `reason` (*type:* `str`): Short reason of the failure, used as metrics label
+    * `message` (*type:* `str`): Description of the failure
+    """
+
+    def __init__(self, reason: str, message: str):
+        super().__init__(message)
+        self.reason = reason
+
+
+class Sink:
+    """Destination of the datapoints of a generator. Datapoints passed to
+    `send` are collected into batches, which are written to the destination
+    once they contain `batch_size` datapoints, or once the oldest datapoint
+    has waited `batch_interval` seconds. A batch is only written by `send`,
+    `flush` or `close`, so a datapoint may wait up to one time increment of
+    the generator longer than `batch_interval`.
+
+    Subclasses implement `_write`, and `_close` if they hold resources.
+
+    > *Input arguments*
+
+    * `url` (*type:* `str`): URL of the destination
+    * `identifier` (*type:* `str`): Identifier of the generator
+    * `batch_size` (*type:* `int`, *default:* `1`): Number of datapoints written together
+    * `batch_interval` (*type:* `float`, *default:* `None`): Maximum time (s) a datapoint waits for its batch to fill up
+    * `encoder` (*type:* `Encoder`, *default:* `None`): Encoding of the datapoints, defaults to JSON
+    """
+
+    def __init__(
+        self,
+        url: str,
+        identifier: str,
+        batch_size: int = 1,
+        batch_interval: Optional[float] = None,
+        encoder: Optional["Encoder"] = None,
+    ):
+        if encoder is None:
+            # Imported here, as the API only needs the sink URL schemes
+            from encoders import JsonEncoder
+
+            encoder = JsonEncoder(identifier)
+        self.url = url
+        self.identifier = identifier
+        self.encoder = encoder
+        self.destination = get_destination(url)
+        self._batch_size = batch_size
+        self._batch_interval = batch_interval
+        self._batch = list()
+        self._batch_start = None
+
+    def send(self, datapoints: list[bytes]) -> int:
+        """Add encoded datapoints to the current batch, and write the batch
+        if it is full or its oldest datapoint has waited `batch_interval`
+        seconds.
+
+        > *Input arguments*
+
+        * `datapoints` (*type:* list of `bytes`): Datapoints encoded by the `encoder` of the sink
+
+        > *Returns*
+
+        `int`: Number of datapoints written, which are the oldest datapoints passed to the sink
+        """
+        if not self._batch:
+            self._batch_start = time.monotonic()
+        self._batch.extend(datapoints)
+        if len(self._batch) >= self._batch_size or (
+            self._batch_interval is not None
+            and time.monotonic() - self._batch_start >= self._batch_interval
+        ):
+            return self.flush()
+        return 0
+
+    def flush(self) -> int:
+        """Write the current batch, if any, and return the number of
+        datapoints written."""
+        if not self._batch:
+            return 0
+        batch, self._batch = self._batch, list()
+        start = time.monotonic()
+        try:
+            self._write(batch)
+        except SinkError as e:
+            self._count_error(e.reason)
+            raise
+        DELIVERY_LATENCY.labels(self.destination).observe(time.monotonic() - start)
+        return len(batch)
+
+    def close(self, flush: bool = True) -> int:
+        """Write the current batch (unless `flush` is `False`) and release the
+        resources of the sink, and return the number of datapoints written."""
+        try:
+            return self.flush() if flush else 0
+        finally:
+            self._close()
+
+    def _count_error(self, reason: str) -> None:
+        DELIVERY_ERRORS.labels(self.destination, reason).inc()
+
+    def _write(self, batch: list[bytes]) -> None:
+        raise NotImplementedError
+
+    def _close(self) -> None:
+        pass
+
+
+class HttpSink(Sink):
+    """Sink sending each batch as a `POST` request, with the body given by
+    the encoder. With the JSON encoding, a single datapoint is sent as a JSON
+    object and several datapoints as a JSON list."""
+
+    def __init__(self, *args, **kwargs):
+        import httpx
+
+        super().__init__(*args, **kwargs)
+        self._httpx = httpx
+        self._client = httpx.Client(
+            timeout=2.5, headers={"Content-Type": self.encoder.content_type}
+        )
+
+    def _write(self, batch: list[bytes]) -> None:
+        try:
+            response = self._client.request(
+                method="POST", url=self.url, content=self.encoder.payload(batch)
+            )
+        except self._httpx.HTTPError as e:
+            raise SinkError(type(e).__name__, str(e)) from e
+        if response.is_error:
+            # The consumer received the datapoints, so the generator continues
+            self._count_error(str(response.status_code))
+
+    def _close(self) -> None:
+        self._client.close()
+
+
+class FileSink(Sink):
+    """Sink appending the datapoints to a file, e.g. a newline-delimited JSON
+    file with the JSON encoding, or an NMEA log. The path of the file may
+    contain `{identifier}`, replaced by the identifier of the generator, e.g.
+    `file:///data/{identifier}.ndjson`."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        path = get_file_path(self.url, self.identifier)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._file = open(path, "ab")
+
+    def _write(self, batch: list[bytes]) -> None:
+        try:
+            self._file.write(self.encoder.frame(batch))
+            self._file.flush()
+        except OSError as e:
+            raise SinkError(type(e).__name__, str(e)) from e
+
+    def _close(self) -> None:
+        self._file.close()
+
+
+class ParquetSink(Sink):
+    """Sink writing the datapoints to a Parquet file (requires `pyarrow`),
+    each batch as a row group. Larger batches give smaller, faster files. A
+    Parquet file cannot be appended to, so each generator should write its
+    own file, e.g. `file:///data/{identifier}.parquet`. If the file exists,
+    e.g. as a generator is continued on another emitter node, a numbered
+    file is written next to it, e.g. `{identifier}-1.parquet`. The columns
+    are read from the datapoints, which must therefore be JSON encoded."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.encoder.name != "json":
+            raise ValueError("Parquet sinks require JSON encoding")
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError as e:
+            raise ImportError("Parquet sinks require pyarrow") from e
+        self._pyarrow = pyarrow
+        self._schema = pyarrow.schema(
+            [
+                ("latitude", pyarrow.float64()),
+                ("longitude", pyarrow.float64()),
+                ("elevation", pyarrow.float64()),
+                ("timestamp", pyarrow.timestamp("us")),
+                ("identifier", pyarrow.string()),
+            ]
+        )
+        path = get_file_path(self.url, self.identifier)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        root, extension = os.path.splitext(path)
+        number = 0
+        while os.path.exists(path):
+            number += 1
+            path = f"{root}-{number}{extension}"
+        self._writer = pyarrow.parquet.ParquetWriter(path, self._schema)
+
+    def _write(self, batch: list[bytes]) -> None:
+        records = [json.loads(datapoint) for datapoint in batch]
+        for record in records:
+            record["timestamp"] = datetime.fromisoformat(record["timestamp"])
+        try:
+            self._writer.write_table(
+                self._pyarrow.Table.from_pylist(records, schema=self._schema)
+            )
+        except (OSError, self._pyarrow.ArrowException) as e:
+            raise SinkError(type(e).__name__, str(e)) from e
+
+    def _close(self) -> None:
+        self._writer.close()
+
+
+class RedisStreamSink(Sink):
+    """Sink adding the datapoints to a Redis Stream, as the field `datapoint`
+    of one entry per datapoint. The stream is given by the `stream` query
+    parameter (default `uuv-trajectory`) and is capped at about `maxlen`
+    entries if given, e.g. `redis://redis:6379/0?stream=uuv&maxlen=100000`."""
+
+    def __init__(self, *args, **kwargs):
+        import redis
+
+        super().__init__(*args, **kwargs)
+        parts = urlsplit(self.url)
+        query = parse_qs(parts.query)
+        self._redis = redis
+        self._stream = query.get("stream", [DEFAULT_STREAM])[0]
+        self._maxlen = int(query["maxlen"][0]) if "maxlen" in query else None
+        self._client = redis.Redis.from_url(
+            urlunsplit((parts.scheme, parts.netloc, parts.path, "", ""))
+        )
+
+    def _write(self, batch: list[bytes]) -> None:
+        pipe = self._client.pipeline(transaction=False)
+        for datapoint in batch:
+            pipe.xadd(
+                self._stream,
+                {"datapoint": datapoint},
+                maxlen=self._maxlen,
+                approximate=True,
+            )
+        try:
+            pipe.execute()
+        except self._redis.RedisError as e:
+            raise SinkError(type(e).__name__, str(e)) from e
+
+    def _close(self) -> None:
+        self._client.close()
+
+
+class MqttSink(Sink):
+    """Sink publishing each datapoint as an MQTT message (requires
+    `paho-mqtt`). The topic is given by the path of the URL (default
+    `uuv/trajectory`) and the quality of service by the `qos` query parameter
+    (default 0), e.g. `mqtt://broker:1883/uuv/trajectory?qos=1`. The messages
+    of a batch are published together, and with a `qos` above 0 the batch is
+    written once the broker has acknowledged them."""
+
+    def __init__(self, *args, **kwargs):
+        try:
+            import paho.mqtt.client as mqtt
+        except ImportError as e:
+            raise ImportError("MQTT sinks require paho-mqtt") from e
+        super().__init__(*args, **kwargs)
+        parts = urlsplit(self.url)
+        query = parse_qs(parts.query)
+        self._mqtt = mqtt
+        self._topic = unquote(parts.path.lstrip("/")) or DEFAULT_TOPIC
+        self._qos = int(query.get("qos", [0])[0])
+        self._client = mqtt.Client(
+            callback_api_version=mqtt.CallbackAPIVersion.VERSION2,
+            client_id=self.identifier,
+        )
+        if parts.username:
+            self._client.username_pw_set(parts.username, parts.password)
+        try:
+            self._client.connect(parts.hostname, parts.port or 1883)
+        except OSError as e:
+            raise SinkError(type(e).__name__, str(e)) from e
+        self._client.loop_start()
+
+    def _write(self, batch: list[bytes]) -> None:
+        for datapoint in batch:
+            message = self._client.publish(self._topic, datapoint, qos=self._qos)
+            if message.rc != self._mqtt.MQTT_ERR_SUCCESS:
+                raise SinkError("MQTTError", self._mqtt.error_string(message.rc))
+        if self._qos > 0:
+            # Messages are acknowledged in order, so waiting for the last one
+            # waits for the whole batch
+            try:
+                message.wait_for_publish(timeout=2.5)
+            except RuntimeError as e:
+                raise SinkError("MQTTError", str(e)) from e
+            if not message.is_published():
+                raise SinkError("Timeout", "The MQTT broker did not acknowledge")
+
+    def _close(self) -> None:
+        self._client.loop_stop()
+        self._client.disconnect()
+
+
+class KafkaSink(Sink):
+    """Sink producing each datapoint as a message to a Kafka topic, or a topic
+    of any broker speaking the Kafka protocol, e.g. Redpanda (requires
+    `kafka-python`). The topic is given by the path of the URL, e.g.
+    `kafka://broker:9092/uuv-trajectory`. Messages are keyed by the
+    identifier of the generator, so that the datapoints of a generator stay
+    in order, and the producer is flushed after each batch."""
+
+    def __init__(self, *args, **kwargs):
+        try:
+            import kafka
+            import kafka.errors
+        except ImportError as e:
+            raise ImportError("Kafka sinks require kafka-python") from e
+        super().__init__(*args, **kwargs)
+        parts = urlsplit(self.url)
+        self._kafka = kafka
+        self._topic = unquote(parts.path.lstrip("/")) or DEFAULT_STREAM
+        try:
+            self._producer = kafka.KafkaProducer(
+                bootstrap_servers=parts.netloc.split(","),
+                linger_ms=5,
+            )
+        except kafka.errors.KafkaError as e:
+            raise SinkError(type(e).__name__, str(e)) from e
+        self._key = self.identifier.encode()
+
+    def _write(self, batch: list[bytes]) -> None:
+        try:
+            for datapoint in batch:
+                self._producer.send(self._topic, value=datapoint, key=self._key)
+            self._producer.flush(timeout=2.5)
+        except self._kafka.errors.KafkaError as e:
+            raise SinkError(type(e).__name__, str(e)) from e
+
+    def _close(self) -> None:
+        self._producer.close(timeout=2.5)
+
+
+class UdpSink(Sink):
+    """Sink sending the datapoints as UDP datagrams, e.g.
+    `udp://127.0.0.1:10110`. The datapoints of a batch are packed into as
+    few datagrams as possible, each followed by the separator of the encoder,
+    without exceeding `MAX_DATAGRAM_SIZE` bytes unless a single datapoint
+    does."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        parts = urlsplit(self.url)
+        self._address = (parts.hostname, parts.port)
+        self._socket = socket.socket(
+            socket.AF_INET6 if ":" in parts.hostname else socket.AF_INET,
+            socket.SOCK_DGRAM,
+        )
+
+    def _write(self, batch: list[bytes]) -> None:
+        datagram = b""
+        separator = self.encoder.separator
+        try:
+            for datapoint in batch:
+                line = datapoint + separator
+                if datagram and len(datagram) + len(line) > MAX_DATAGRAM_SIZE:
+                    self._socket.sendto(datagram, self._address)
+                    datagram = b""
+                datagram += line
+            self._socket.sendto(datagram, self._address)
+        except OSError as e:
+            raise SinkError(type(e).__name__, str(e)) from e
+
+    def _close(self) -> None:
+        self._socket.close()
+
+
+# Sinks by the scheme of their URLs. 'file' URLs are written as Parquet if the
+# file has the extension '.parquet'
+SINKS = {
+    "http": HttpSink,
+    "https": HttpSink,
+    "file": FileSink,
+    "redis": RedisStreamSink,
+    "rediss": RedisStreamSink,
+    "mqtt": MqttSink,
+    "kafka": KafkaSink,
+    "udp": UdpSink,
+}
+
+
+def get_file_path(url: str, identifier: str) -> str:
+    return unquote(urlsplit(url).path).replace("{identifier}", identifier)
+
+
+def get_sink(url: str, identifier: str, **kwargs) -> Sink:
+    """Create the sink of the given URL, selected by the scheme of the URL.
+
+    > *Input arguments*
+
+    * `url` (*type:* `str`): URL of the destination
+    * `identifier` (*type:* `str`): Identifier of the generator
+    * `kwargs`: Batching options and encoder of the sink, see `Sink`
+
+    > *Returns*
+
+    `Sink`
+    """
+    scheme = urlsplit(url).scheme
+    if scheme not in SINKS:
+        raise ValueError(f"Unsupported sink URL scheme '{scheme}'")
+    sink = SINKS[scheme]
+    if sink is FileSink and get_file_path(url, identifier).endswith(".parquet"):
+        sink = ParquetSink
+    return sink(url, identifier, **kwargs)
@@ -0,0 +1,17 @@
+from celery import Celery
+from settings import REDIS_URL
+
+# Connect Celery to Redis. The tasks are implemented in 'celery_worker.py',
+# this module only holds their signatures, so that the API can start them
+# without importing the trajectory generator
+celery_app = Celery("celery-tasks", broker=REDIS_URL, backend=REDIS_URL)
+celery_app.conf.broker_connection_retry_on_startup = True
+
+# Names of the tasks registered by the Celery worker
+UUV_TRAJECTORY_PRODUCER = "celery_worker._uuv_trajectory_producer"
+
+
+def start_uuv_trajectory_producer(specification: str) -> None:
+    # Start a generator from a 'TrajectoryGeneratorSpecification' serialized
+    # as JSON
+    celery_app.send_task(UUV_TRAJECTORY_PRODUCER, args=(specification,))
@@ -1,3 +1,3 @@
-from .trajectory_point import TrajectoryPoint
+from .trajectory_point import TrajectoryPoint, TrajectoryPointArray
 # from .trajectory_generator import TrajectoryGenerator
 from .path_generator import *
\ No newline at end of file
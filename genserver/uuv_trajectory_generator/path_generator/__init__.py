@@ -1,3 +1,4 @@
-all__ = ['PathGenerator', 'DubinsInterpolator']
+all__ = ["PathGenerator", "DubinsInterpolator", "PiecewiseBezierPath"]
 
 from .dubins_interpolator import DubinsInterpolator
+from .piecewise_bezier_path import PiecewiseBezierPath
@@ -1,10 +1,135 @@
+import math
 import numpy as np
 
-try:
-    from scipy.misc import factorial
-except ImportError as error:
-    # factorial has been removed from scipy.misc in version 1.3.0.
-    from scipy.special import factorial
+# Highest order of the Bezier curves with precomputed binomial coefficients
+MAX_BINOMIAL_ORDER = 10
+# Binomial coefficients $\binom{n}{i}$ indexed by '[n][i]'
+BINOMIALS = [
+    [math.comb(n, i) for i in range(n + 1)] for n in range(MAX_BINOMIAL_ORDER + 1)
+]
+# Number of intervals of the arc length lookup table of each curve
+ARC_LENGTH_TABLE_SIZE = 32
+# Number of Gauss-Legendre nodes used to integrate each interval
+GAUSS_LEGENDRE_ORDER = 5
+GL_NODES, GL_WEIGHTS = np.polynomial.legendre.leggauss(GAUSS_LEGENDRE_ORDER)
+
+
+def get_binomial(n, i):
+    """Compute binomial function $\binom{n}{i}$
+
+    > *Input arguments*
+
+    * `n` (*type:* `int`)
+    * `i` (*type:* `int`)
+    """
+    if n <= MAX_BINOMIAL_ORDER:
+        return BINOMIALS[n][i]
+    return math.comb(n, i)
+
+
+def get_bernstein_basis(n, u):
+    """Evaluate the Bernstein basis polynomials of degree `n`.
+
+    > *Input arguments*
+
+    * `n` (*type:* `int`): Degree of the polynomials
+    * `u` (*type:* `float` or `numpy.array`): Parametric input(s)
+
+    > *Returns*
+
+    `numpy.array` of shape `u.shape + (n + 1,)`
+    """
+    u = np.asarray(u, dtype=float)
+    # The powers of u and (1 - u) are computed by repeated multiplication,
+    # which is faster than raising to the powers
+    u_pows = np.empty(u.shape + (n + 1,))
+    v_pows = np.empty(u.shape + (n + 1,))
+    u_pows[..., 0] = 1.0
+    v_pows[..., n] = 1.0
+    v = 1 - u
+    for k in range(1, n + 1):
+        u_pows[..., k] = u_pows[..., k - 1] * u
+        v_pows[..., n - k] = v_pows[..., n - k + 1] * v
+    if n <= MAX_BINOMIAL_ORDER:
+        binomials = np.array(BINOMIALS[n], dtype=float)
+    else:
+        binomials = np.array([math.comb(n, k) for k in range(n + 1)], dtype=float)
+    return binomials * u_pows * v_pows
+
+
+def evaluate_bezier(pnts, u):
+    """Evaluate Bezier curves with the control points `pnts`.
+
+    > *Input arguments*
+
+    * `pnts` (*type:* `numpy.array`): `(..., n + 1, 3)` array of control
+    points, broadcastable against `u`
+    * `u` (*type:* `float` or `numpy.array`): Parametric input(s)
+
+    > *Returns*
+
+    `numpy.array` of shape `u.shape + (3,)`
+    """
+    basis = get_bernstein_basis(pnts.shape[-2] - 1, u)
+    if pnts.ndim == 2:
+        # A single curve is evaluated at all inputs by one matrix product
+        return basis @ pnts
+    return (basis[..., np.newaxis, :] @ pnts)[..., 0, :]
+
+
+def integrate_speed(diff_pnts, u_0, u_1):
+    """Integrate the norm of the first derivative of Bezier curves over the
+    interval(s) `[u_0, u_1]` with Gauss-Legendre quadrature.
+
+    > *Input arguments*
+
+    * `diff_pnts` (*type:* `numpy.array`): Control points of the first
+    derivative of the curves, of shape `(..., order, 3)`
+    * `u_0` (*type:* `float` or `numpy.array`): Start(s) of the interval(s)
+    * `u_1` (*type:* `float` or `numpy.array`): End(s) of the interval(s)
+
+    > *Returns*
+
+    Arc length(s) of the interval(s) in meters
+    """
+    u_0 = np.asarray(u_0, dtype=float)
+    u_1 = np.asarray(u_1, dtype=float)
+    half = 0.5 * (u_1 - u_0)
+    mid = 0.5 * (u_1 + u_0)
+    nodes = mid[..., np.newaxis] + half[..., np.newaxis] * GL_NODES
+    speed = np.linalg.norm(
+        evaluate_bezier(diff_pnts[..., np.newaxis, :, :], nodes), axis=-1
+    )
+    return half * np.sum(GL_WEIGHTS * speed, axis=-1)
+
+
+def compute_arc_length_tables(control_pnts):
+    """Compute the cumulative arc length of Bezier curves at equally spaced
+    values of their parametric input, with Gauss-Legendre quadrature.
+
+    > *Input arguments*
+
+    * `control_pnts` (*type:* `numpy.array`): `(M, order + 1, 3)` array of
+    control points
+
+    > *Returns*
+
+    `(M, ARC_LENGTH_TABLE_SIZE + 1)` array of arc lengths in meters
+    """
+    u_table = np.linspace(0, 1, ARC_LENGTH_TABLE_SIZE + 1)
+    diff_pnts = (control_pnts.shape[1] - 1) * np.diff(control_pnts, axis=1)
+    # The quadrature nodes are the same for all curves, so the speed at all
+    # of them is computed with a single matrix product
+    half = 0.5 * np.diff(u_table)
+    nodes = (0.5 * (u_table[:-1] + u_table[1:]))[:, np.newaxis] + half[
+        :, np.newaxis
+    ] * GL_NODES
+    basis = get_bernstein_basis(diff_pnts.shape[1] - 1, nodes.flatten())
+    speed = np.linalg.norm(basis @ diff_pnts, axis=-1).reshape(
+        (len(control_pnts),) + nodes.shape
+    )
+    lengths = half * np.sum(GL_WEIGHTS * speed, axis=-1)
+    return np.hstack((np.zeros((len(control_pnts), 1)), np.cumsum(lengths, axis=1)))
 
 
 class BezierCurve:
@@ -215,52 +340,199 @@ class BezierCurve:
         assert p1.size == 3 and p2.size == 3, "Both input points must be three elements"
         return np.sqrt(np.sum((p2 - p1) ** 2))
 
+    @classmethod
+    def from_control_pnts(cls, control_pnts):
+        """Create a Bezier curve directly from its control points.
+
+        > *Input arguments*
+
+        * `control_pnts` (*type:* `numpy.array`): `(order + 1, 3)` array of
+        control points, for orders 3, 4 or 5
+
+        > *Returns*
+
+        `BezierCurve` object
+        """
+        control_pnts = np.asarray(control_pnts, dtype=float)
+        assert control_pnts.shape in [
+            (4, 3),
+            (5, 3),
+            (6, 3),
+        ], "Invalid number of control points"
+
+        curve = cls.__new__(cls)
+        curve._order = control_pnts.shape[0] - 1
+        curve._pnts = [control_pnts[0], control_pnts[-1]]
+        curve._control_pnts = list(control_pnts)
+        return curve
+
     @staticmethod
-    def generate_cubic_curve(pnts):
-        """Generate cubic Bezier curve segments from a list of points.
+    def _get_spline_tangents(pnts):
+        """Compute the unit tangent vectors at each point of a spline
+        interpolating the input points, with the parametric variable of
+        each point proportional to the cumulative chord length.
 
         > *Input arguments*
 
-        * `pnts` (*type:* list of `float` or of `numpy.array`): List of points
+        * `pnts` (*type:* `numpy.array`): `(N, 3)` array of points
 
         > *Returns*
 
-        List of `BezierCurve` segments
+        `(N, 3)` array of unit tangent vectors, and the `(N - 2, 3)` array of
+        the (unnormalized) finite difference slopes `lamb_k` and the `(N - 1,)`
+        increments of the parametric variable `delta_u`.
+        """
+        delta_q = np.diff(pnts, axis=0)
+        lengths = np.linalg.norm(delta_q, axis=1)
+        # Increments of the parametric variable for the curve
+        delta_u = lengths / np.sum(lengths)
+        lamb = delta_q / delta_u[:, np.newaxis]
+
+        tangents = np.empty_like(pnts)
+        if len(pnts) == 2:
+            # The spline through two points is a straight line
+            tangents[:] = lamb[0]
+        else:
+            alpha = (delta_u[:-1] / (delta_u[:-1] + delta_u[1:]))[:, np.newaxis]
+            tangents[1:-1] = (1 - alpha) * lamb[:-1] + alpha * lamb[1:]
+            tangents[0] = 2 * lamb[0] - tangents[1]
+            tangents[-1] = 2 * lamb[-1] - tangents[-2]
+
+        tangents /= np.linalg.norm(tangents, axis=1)[:, np.newaxis]
+        return tangents, lamb, delta_u
+
+    @staticmethod
+    def fit_cubic_control_pnts(pnts):
+        """Compute the control points of the cubic Bezier curve segments
+        interpolating a sequence of points, for all segments at once.
+
+        > *Input arguments*
+
+        * `pnts` (*type:* `numpy.array`): `(N, 3)` array of points
+
+        > *Returns*
+
+        `(N - 1, 4, 3)` array of control points and the `(N, 3)` array of unit
+        tangent vectors at the input points
         """
-        assert isinstance(pnts, list), "List of points is invalid"
-        tangents = [np.zeros(3) for _ in range(len(pnts))]
+        pnts = np.asarray(pnts, dtype=float)
+        assert (
+            pnts.ndim == 2 and pnts.shape[1] == 3 and len(pnts) >= 2
+        ), "At least two 3D points are needed to calculate the curve"
+
+        tangents, _, _ = BezierCurve._get_spline_tangents(pnts)
+        t_0, t_1 = tangents[:-1], tangents[1:]
+        chord = np.diff(pnts, axis=0)
+
+        # Compute alpha as the largest root of a * alpha**2 + b * alpha + c,
+        # since a > 0 and c <= 0 the roots are always real
+        t_sum = t_0 + t_1
+        a = 16 - np.sum(t_sum**2, axis=1)
+        b = 12 * np.sum(chord * t_sum, axis=1)
+        c = -36 * np.sum(chord**2, axis=1)
+        alpha = ((-b + np.sqrt(b**2 - 4 * a * c)) / (2 * a))[:, np.newaxis]
+
+        control_pnts = np.empty((len(pnts) - 1, 4, 3))
+        control_pnts[:, 0] = pnts[:-1]
+        control_pnts[:, 1] = pnts[:-1] + (1.0 / 3) * alpha * t_0
+        control_pnts[:, 2] = pnts[1:] - (1.0 / 3) * alpha * t_1
+        control_pnts[:, 3] = pnts[1:]
+        return control_pnts, tangents
+
+    @staticmethod
+    def fit_quintic_control_pnts(pnts):
+        """Compute the control points of the quintic Bezier curve segments
+        interpolating a sequence of points, for all segments at once.
+
+        > *Input arguments*
+
+        * `pnts` (*type:* `numpy.array`): `(N, 3)` array of points, `N >= 3`
+
+        > *Returns*
+
+        `(N - 1, 6, 3)` array of control points
+        """
+        pnts = np.asarray(pnts, dtype=float)
+        assert (
+            pnts.ndim == 2 and pnts.shape[1] == 3 and len(pnts) >= 3
+        ), "At least three 3D points are needed to calculate the curve"
+
+        tangents, lamb, delta_u = BezierCurve._get_spline_tangents(pnts)
 
-        lengths = [
-            BezierCurve.distance(pnts[i + 1], pnts[i]) for i in range(len(pnts) - 1)
+        normals = np.empty_like(pnts)
+        normals[1:-1] = (lamb[1:] - lamb[:-1]) / (delta_u[:-1] + delta_u[1:])[
+            :, np.newaxis
         ]
-        lengths = [0] + lengths
-
-        # Initial vector of parametric variables for the curve
-        u = [l / np.sum(lengths) for l in np.cumsum(lengths)]
-        delta_u = lambda k: u[k] - u[k - 1]
-        delta_q = lambda k: pnts[k] - pnts[k - 1]
-        lamb_k = lambda k: delta_q(k) / delta_u(k)
-        alpha_k = lambda k: delta_u(k) / (delta_u(k) + delta_u(k + 1))
-
-        for i in range(1, len(u) - 1):
-            tangents[i] = (1 - alpha_k(i)) * lamb_k(i) + alpha_k(i) * lamb_k(i + 1)
-            if i == 1:
-                tangents[0] = 2 * lamb_k(i) - tangents[1]
-
-        tangents[-1] = 2 * lamb_k(len(u) - 1) - tangents[-2]
-
-        # Normalize tangent vectors
-        for i in range(len(tangents)):
-            tangents[i] = tangents[i] / np.linalg.norm(tangents[i])
-
-        segments = list()
-        # Generate the cubic Bezier curve segments
-        for i in range(len(tangents) - 1):
-            segments.append(
-                BezierCurve([pnts[i], pnts[i + 1]], 3, [tangents[i], tangents[i + 1]])
+        normals[0] = normals[1]
+        normals[-1] = normals[-2]
+        normals /= np.linalg.norm(normals, axis=1)[:, np.newaxis]
+
+        t_0, t_1 = tangents[:-1], tangents[1:]
+        n_0, n_1 = normals[:-1], normals[1:]
+        chord = np.diff(pnts, axis=0)
+        t_sum = t_0 + t_1
+        n_diff = n_1 - n_0
+
+        beta_hat = 0.51
+
+        # Coefficients of the quartic polynomial in alpha of each segment
+        coefs = np.vstack(
+            (
+                beta_hat**2 * np.sum(n_diff**2, axis=1),
+                -28 * beta_hat * np.sum(t_sum * n_diff, axis=1),
+                196 * np.sum(t_sum**2, axis=1)
+                + 120 * beta_hat * np.sum(chord * n_diff, axis=1)
+                - 1024,
+                -1680 * np.sum(chord * t_sum, axis=1),
+                3600 * np.sum(chord**2, axis=1),
             )
+        ).T
+
+        # Compute the roots as the eigenvalues of the companion matrices,
+        # falling back to numpy.roots for the polynomials of lower degree
+        alpha = np.empty(len(coefs))
+        quartic = coefs[:, 0] != 0
+        companion = np.zeros((np.sum(quartic), 4, 4))
+        companion[:, 0, :] = -coefs[quartic, 1:] / coefs[quartic, :1]
+        companion[:, np.arange(1, 4), np.arange(3)] = 1
+        alpha[quartic] = np.real(np.linalg.eigvals(companion)).max(axis=1)
+        for i in np.flatnonzero(~quartic):
+            alpha[i] = np.real(np.roots(coefs[i])).max()
+        alpha = alpha[:, np.newaxis]
+
+        control_pnts = np.empty((len(pnts) - 1, 6, 3))
+        control_pnts[:, 0] = pnts[:-1]
+        control_pnts[:, 5] = pnts[1:]
+        control_pnts[:, 1] = control_pnts[:, 0] + alpha / 5.0 * t_0
+        control_pnts[:, 2] = (
+            2.0 * control_pnts[:, 1]
+            - control_pnts[:, 0]
+            + beta_hat * alpha**2 / 20.0 * n_0
+        )
+        control_pnts[:, 4] = control_pnts[:, 5] - alpha / 5.0 * t_1
+        control_pnts[:, 3] = (
+            2.0 * control_pnts[:, 4]
+            - control_pnts[:, 5]
+            + beta_hat * alpha**2 / 20.0 * n_1
+        )
+        return control_pnts
+
+    @staticmethod
+    def generate_cubic_curve(pnts):
+        """Generate cubic Bezier curve segments from a list of points.
 
-        return segments, tangents
+        > *Input arguments*
+
+        * `pnts` (*type:* list of `float` or of `numpy.array`): List of points
+
+        > *Returns*
+
+        List of `BezierCurve` segments
+        """
+        assert isinstance(pnts, (list, np.ndarray)), "List of points is invalid"
+        control_pnts, tangents = BezierCurve.fit_cubic_control_pnts(pnts)
+        segments = [BezierCurve.from_control_pnts(cp) for cp in control_pnts]
+        return segments, list(tangents)
 
     @staticmethod
     def generate_quintic_curve(pnts):
@@ -274,54 +546,9 @@ class BezierCurve:
 
         List of `BezierCurve` segments
         """
-        assert isinstance(pnts, list), "List of points is invalid"
-        tangents = [np.zeros(3) for _ in range(len(pnts))]
-        normals = [np.zeros(3) for _ in range(len(pnts))]
-
-        lengths = [
-            BezierCurve.distance(pnts[i + 1], pnts[i]) for i in range(len(pnts) - 1)
-        ]
-        lengths = [0] + lengths
-        # Initial vector of parametric variables for the curve
-        u = np.cumsum(lengths) / np.sum(lengths)
-
-        delta_u = lambda k: u[k] - u[k - 1]
-        delta_q = lambda k: pnts[k] - pnts[k - 1]
-        lamb_k = lambda k: delta_q(k) / delta_u(k)
-        alpha_k = lambda k: delta_u(k) / (delta_u(k) + delta_u(k + 1))
-        normal_k = lambda k: (
-            ((pnts[k + 1] - pnts[k]) / (u[k + 1] - u[k]))
-            - ((pnts[k] - pnts[k - 1]) / (u[k] - u[k - 1]))
-        ) / (u[k + 1] - u[k - 1])
-
-        for i in range(1, len(u) - 1):
-            tangents[i] = (1 - alpha_k(i)) * lamb_k(i) + alpha_k(i) * lamb_k(i + 1)
-            normals[i] = normal_k(i)
-            if i == 1:
-                tangents[0] = 2 * lamb_k(i) - tangents[1]
-                normals[0] = normal_k(i)
-
-        tangents[-1] = 2 * lamb_k(len(u) - 1) - tangents[-2]
-        normals[-1] = normal_k(len(u) - 3)
-
-        # Normalize tangent vectors
-        for i in range(len(tangents)):
-            tangents[i] /= np.linalg.norm(tangents[i])
-            normals[i] /= np.linalg.norm(normals[i])
-
-        segments = list()
-        # Generate the cubic Bezier curve segments
-        for i in range(len(tangents) - 1):
-            segments.append(
-                BezierCurve(
-                    [pnts[i], pnts[i + 1]],
-                    5,
-                    [tangents[i], tangents[i + 1]],
-                    [normals[i], normals[i + 1]],
-                )
-            )
-
-        return segments
+        assert isinstance(pnts, (list, np.ndarray)), "List of points is invalid"
+        control_pnts = BezierCurve.fit_quintic_control_pnts(pnts)
+        return [BezierCurve.from_control_pnts(cp) for cp in control_pnts]
 
     def control_pnts(self):
         """Return the list of control points of the Bezier curve.
@@ -337,19 +564,16 @@ class BezierCurve:
 
         > *Input arguments*
 
-        * `u` (*type:* `float`): Curve parametric input in the interval `[0, 1]`
+        * `u` (*type:* `float` or `numpy.array`): Curve parametric input(s) in
+        the interval `[0, 1]`
 
         > *Returns*
 
-        3D point from the Bezier curve as `numpy.array`
+        3D point from the Bezier curve as `numpy.array`, or an `(N, 3)`
+        `numpy.array` of points if `u` is an array
         """
-        u = max(u, 0)
-        u = min(u, 1)
-
-        b = np.zeros(3)
-        for i in range(len(self._control_pnts)):
-            b += self.compute_polynomial(self._order, i, u) * self._control_pnts[i]
-        return b
+        u = np.clip(u, 0, 1)
+        return evaluate_bezier(np.array(self._control_pnts), u)
 
     def get_derivative(self, u, order=1):
         """Compute the derivative of the Bezier curve using the input parametric
@@ -357,33 +581,34 @@ class BezierCurve:
 
         > *Input arguments*
 
-        * `u` (*type:* `float`): Curve parametric input in the interval `[0, 1]`
+        * `u` (*type:* `float` or `numpy.array`): Curve parametric input(s) in
+        the interval `[0, 1]`
         * `order` (*type:* `int`, *default:* `1`): Order of the derivative
 
         > *Returns*
 
-        `numpy.array`: 3D derivative value from the Bezier curve
+        `numpy.array`: 3D derivative value from the Bezier curve, or an
+        `(N, 3)` array of derivatives if `u` is an array
         """
-        u = max(u, 0)
-        u = min(u, 1)
-
-        b = np.zeros(3)
-        for i in range(len(self._control_pnts) - order):
-            b = b + self._order * self.compute_polynomial(self._order - order, i, u) * (
-                self._control_pnts[i + 1] - self._control_pnts[i]
-            )
-        return b
+        u = np.clip(u, 0, 1)
+        if order > self._order:
+            return np.zeros(np.shape(u) + (3,))
+        # The derivative of a Bezier curve is a Bezier curve of lower degree
+        # with the finite differences of the control points
+        scale = math.perm(self._order, order)
+        diff_pnts = scale * np.diff(np.array(self._control_pnts), n=order, axis=0)
+        return evaluate_bezier(diff_pnts, u)
 
     def get_length(self):
-        """Get length of the Bezier curve segment.
+        """Get length of the Bezier curve segment, integrated with
+        Gauss-Legendre quadrature.
 
         > *Returns*
 
         `float`: Length of the curve
         """
-        return self._order * np.linalg.norm(
-            self._control_pnts[1] - self._control_pnts[0]
-        )
+        control_pnts = np.array(self._control_pnts)[np.newaxis]
+        return compute_arc_length_tables(control_pnts)[0, -1]
 
     def compute_polynomial(self, n, i, u):
         """Compute the Bernstein polynomial
@@ -409,4 +634,4 @@ class BezierCurve:
         * `n` (*type:* `int`)
         * `i` (*type:* `int`)
         """
-        return factorial(n) / (factorial(i) * factorial(n - i))
+        return get_binomial(n, i)
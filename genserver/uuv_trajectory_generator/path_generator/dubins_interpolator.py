@@ -1,10 +1,15 @@
 import numpy as np
-from copy import deepcopy
 
 from uuv_trajectory_generator.path_generator.helical_segment import HelicalSegment
 from uuv_trajectory_generator.path_generator.path_generator import PathGenerator
 from uuv_trajectory_generator.path_generator.bezier_curve import BezierCurve
-from uuv_trajectory_generator.trajectory_point import TrajectoryPoint
+from uuv_trajectory_generator.path_generator.piecewise_bezier_path import (
+    PiecewiseBezierPath,
+)
+from uuv_trajectory_generator.trajectory_point import (
+    TrajectoryPoint,
+    TrajectoryPointArray,
+)
 
 
 class DubinsInterpolator(PathGenerator):
@@ -33,6 +38,8 @@ class DubinsInterpolator(PathGenerator):
 
     LABEL = "dubins"
 
+    DUBINS_WORDS = ["LSL", "RSR", "LSR", "RSL", "RLR", "LRL"]
+
     def __init__(self, radius: float) -> None:
         super(DubinsInterpolator, self).__init__(self)
 
@@ -40,7 +47,10 @@ class DubinsInterpolator(PathGenerator):
         self._radius = radius
         # TODO: Add as an input parameter
         self._max_pitch_angle = 5 * np.pi / 180
-        self._interp_fcns = list()
+        self._path = None
+        self._leg_headings = list()
+        self._leg_start_idx = list()
+        self._inter_pnts = list()
         # self._logger = get_logger()
 
     def init_interpolator(self) -> bool:
@@ -62,96 +72,174 @@ class DubinsInterpolator(PathGenerator):
             print("At least 2 waypoints are necessary")
             return False
 
-        self._interp_fcns = list()
-        path = list()
-        last_heading = self._waypoints.get_waypoint(0).heading_offset
+        self._path = None
+        # Cached state of each leg (path between two consecutive waypoints),
+        # used to extend the path without recomputing all of it
+        self._leg_headings = list()
+        self._leg_start_idx = list()
+        self._inter_pnts = list()
 
-        dist = lambda x, y: np.sqrt(np.sum((x - y) ** 2))
+        return self._update_interpolator(first_leg=1)
 
-        for i in range(1, self._waypoints.num_waypoints):
-            heading_init = 0.0
-            heading_final = 0.0
+    def add_waypoint(self, waypoint, add_to_beginning=False):
+        """Add waypoint to the existing waypoint set. If the waypoint is
+        appended to an already interpolated path, only the last leg of the
+        path is recomputed together with the new leg, instead of the whole
+        path.
 
-            if i - 1 == 0:
-                heading_init = self._waypoints.get_waypoint(i - 1).heading_offset
-            else:
-                if not np.isclose(
-                    dist(
-                        self._waypoints.get_waypoint(i - 1).pos[0:2],
-                        self._waypoints.get_waypoint(i).pos[0:2],
-                    ),
-                    0,
-                ):
-                    heading_init = self._waypoints.get_waypoint(
-                        i - 1
-                    ).calculate_heading(self._waypoints.get_waypoint(i))
-                else:
-                    heading_init = last_heading
+        > *Input arguments*
 
-            if i == self._waypoints.num_waypoints - 1:
-                if not np.isclose(
-                    dist(
-                        self._waypoints.get_waypoint(i - 1).pos[0:2],
-                        self._waypoints.get_waypoint(i).pos[0:2],
-                    ),
-                    0,
-                ):
-                    heading_final = self._waypoints.get_waypoint(
-                        i - 1
-                    ).calculate_heading(self._waypoints.get_waypoint(i))
-                else:
-                    heading_final = last_heading
-            else:
-                if not np.isclose(
-                    dist(
-                        self._waypoints.get_waypoint(i + 1).pos[0:2],
-                        self._waypoints.get_waypoint(i).pos[0:2],
-                    ),
-                    0,
-                ):
-                    heading_final = self._waypoints.get_waypoint(i).calculate_heading(
-                        self._waypoints.get_waypoint(i + 1)
-                    )
-                else:
-                    heading_final = last_heading
+        * `waypoint` (*type:* `uuv_waypoints.Waypoint`): Waypoint object
+        * `add_to_beginning` (*type:* `bool`, *default:* `False`): If `True`,
+        add the waypoint to the beginning of the set
 
-            last_heading = heading_final
+        > *Returns*
 
-            path += self._generate_path(
-                self._waypoints.get_waypoint(i - 1),
-                heading_init,
-                self._waypoints.get_waypoint(i),
-                heading_final,
+        `bool`: `True` if the path segments were successfully generated.
+        """
+        if add_to_beginning or self._path is None:
+            return super(DubinsInterpolator, self).add_waypoint(
+                waypoint, add_to_beginning
             )
+        if not self._waypoints.add_waypoint(waypoint):
+            return True
+        # The final heading of the previous last leg depends on the new
+        # waypoint, so that leg has to be recomputed as well
+        return self._update_interpolator(first_leg=self._waypoints.num_waypoints - 2)
 
-        inter_pnts = list()
-        for i in range(len(path) - 1):
-            if not np.isclose(np.sqrt(np.sum((path[i + 1] - path[i]) ** 2)), 0):
-                inter_pnts += [path[i]]
+    def _update_interpolator(self, first_leg):
+        """Compute the legs of the path starting from the leg ending at the
+        waypoint with index `first_leg` and update the suffix of the path
+        segments affected by them. The legs before `first_leg` are kept.
 
-        if not np.isclose(np.sqrt(np.sum((path[-1] - path[-2]) ** 2)), 0):
-            inter_pnts += [path[-1]]
+        > *Input arguments*
 
-        self._interp_fcns, _ = BezierCurve.generate_cubic_curve(inter_pnts)
+        * `first_leg` (*type:* `int`): Index of the target waypoint of the
+        first leg to be computed
 
-        # Reparametrizing the curves
-        lengths = [seg.get_length() for seg in self._interp_fcns]
-        lengths = [0] + lengths
-        self._s = np.cumsum(lengths) / np.sum(lengths)
-        mean_vel = np.mean(
-            [
-                self._waypoints.get_waypoint(k).max_forward_speed
-                for k in range(self._waypoints.num_waypoints)
+        > *Returns*
+
+        `bool`: `True` if the path segments were successfully generated.
+        """
+        # Discard the legs that are recomputed
+        if first_leg - 1 < len(self._leg_start_idx):
+            del self._inter_pnts[self._leg_start_idx[first_leg - 1] :]
+            del self._leg_start_idx[first_leg - 1 :]
+            del self._leg_headings[first_leg - 1 :]
+        # Index of the first interpolation point changed by the new legs
+        first_pnt = len(self._inter_pnts)
+
+        if len(self._leg_headings):
+            last_heading = self._leg_headings[-1][1]
+        else:
+            last_heading = self._waypoints.get_waypoint(0).heading_offset
+
+        # Headings between consecutive waypoints, computed for all legs at once
+        d_xy = np.diff(self._waypoints.pos[:, 0:2], axis=0)
+        bearings = np.arctan2(d_xy[:, 1], d_xy[:, 0])
+        moves = ~np.isclose(np.hypot(d_xy[:, 0], d_xy[:, 1]), 0)
+
+        for i in range(first_leg, self._waypoints.num_waypoints):
+            heading_init, heading_final = self._get_leg_headings(
+                i, last_heading, bearings, moves
+            )
+            last_heading = heading_final
+
+            self._leg_headings.append((heading_init, heading_final))
+            self._leg_start_idx.append(len(self._inter_pnts))
+            pnts = np.reshape(
+                self._generate_path(
+                    self._waypoints.get_waypoint(i - 1),
+                    heading_init,
+                    self._waypoints.get_waypoint(i),
+                    heading_final,
+                ),
+                (-1, 3),
+            )
+            # Skip repeated points, comparing each point to the one before it
+            prev = np.vstack(
+                (
+                    (
+                        self._inter_pnts[-1]
+                        if len(self._inter_pnts)
+                        else np.full(3, np.nan)
+                    ),
+                    pnts[:-1],
+                )
+            )
+            repeated = np.sqrt(np.sum((pnts - prev) ** 2, axis=1)) <= 1e-8
+            self._inter_pnts += list(pnts[~repeated])
+
+        # The tangent at an interpolation point depends on its neighbours,
+        # so the segments starting two points before the first changed
+        # point are refitted. One more point is passed to the curve fitting
+        # to compute the first refitted tangent, and its segment is dropped.
+        first_seg = max(first_pnt - 2, 0)
+        first_fit = max(first_seg - 1, 0)
+        control_pnts, _ = BezierCurve.fit_cubic_control_pnts(
+            np.array(self._inter_pnts[first_fit:])
+        )
+        control_pnts = control_pnts[first_seg - first_fit :]
+
+        if self._path is None or first_seg == 0:
+            self._path = PiecewiseBezierPath(control_pnts)
+        else:
+            self._path = self._path.splice(first_seg, control_pnts)
+        # The path is parametrized by its arc length
+        self._s = self._path.breakpoints
+        # Each waypoint is the last interpolation point of the leg ending at
+        # it, i.e. the point before the start of the next leg
+        self._init_waypoint_index(
+            self._s[
+                [0]
+                + [k - 1 for k in self._leg_start_idx[1:]]
+                + [len(self._inter_pnts) - 1]
             ]
         )
+        mean_vel = np.mean(self._waypoints.max_forward_speed)
 
         if self._duration is None:
-            self._duration = np.sum(lengths) / mean_vel
+            self._duration = self._path.length() / mean_vel
         if self._start_time is None:
             self._start_time = 0.0
 
         return True
 
+    def _get_leg_headings(self, i, last_heading, bearings, moves):
+        """Compute the initial and final headings of the leg between the
+        waypoints `i - 1` and `i`.
+
+        > *Input arguments*
+
+        * `i` (*type:* `int`): Index of the target waypoint of the leg
+        * `last_heading` (*type:* `float`): Final heading of the previous leg
+        in radians
+        * `bearings` (*type:* `numpy.array`): Headings from each waypoint to
+        the next one in radians
+        * `moves` (*type:* `numpy.array`): `True` for each pair of consecutive
+        waypoints with different horizontal positions
+
+        > *Returns*
+
+        Initial and final headings of the leg in radians
+        """
+        heading_init = 0.0
+        heading_final = 0.0
+
+        if i - 1 == 0:
+            heading_init = self._waypoints.get_waypoint(i - 1).heading_offset
+        elif moves[i - 1]:
+            heading_init = bearings[i - 1]
+        else:
+            heading_init = last_heading
+
+        if i == self._waypoints.num_waypoints - 1:
+            heading_final = bearings[i - 1] if moves[i - 1] else last_heading
+        else:
+            heading_final = bearings[i] if moves[i] else last_heading
+
+        return heading_init, heading_final
+
     def _get_frame(self, heading):
         """Return the 2D rotation matrix for a desired heading.
 
@@ -214,397 +302,201 @@ class DubinsInterpolator(PathGenerator):
 
         return circles
 
-    def _get_phi(self, u, delta, heading):
-        return 2 * np.pi * u * delta + heading - delta * np.pi / 2
-
-    def _compute_u(self, angle, delta, heading):
-        """Compute the parametric input for the circle path.
+    @staticmethod
+    def _mod_2pi(angle):
+        """Wrap an angle (or an array of angles) to the interval [0, 2*pi).
 
         > *Input arguments*
 
-        * `angle` (*type:* `float`): Angle in the circle's path
-        in radians
-        * `delta` (*type:* `int`): Generate the points in counter-clockwise
-        direction if `delta` is -1 and clockwise if `delta` is 1
-        * `heading` (*type:* `float`): Heading offset angle in radians
+        * `angle` (*type:* `float` or `numpy.array`): Angle in radians
 
         > *Returns*
 
-        `float`: Circle's parametric variable
+        Wrapped angle in radians
         """
-        u = (angle - heading + delta * np.pi / 2) / (delta * 2 * np.pi)
-        if u < 0:
-            u += 1
-        return u
+        return np.mod(angle, 2 * np.pi)
 
-    def _get_tangent(self, u, delta, radius, heading):
-        """Function description
+    def _get_dubins_words(self, pnt_1, heading_1, pnt_2, heading_2, radius):
+        """Solve all six Dubins words (`LSL`, `RSR`, `LSR`, `RSL`, `RLR` and
+        `LRL`) between two 2D poses at once. The closed form solutions are
+        evaluated as arrays over the words, so no per-word Python code is run.
 
         > *Input arguments*
 
-        * `param` (*type:* `data_type`, *default:* `data`): Parameter description
+        * `pnt_1` (*type:* `numpy.array`): 2D origin point
+        * `heading_1` (*type:* `float`): Heading at the origin point in radians
+        * `pnt_2` (*type:* `numpy.array`): 2D target point
+        * `heading_2` (*type:* `float`): Heading at the target point in radians
+        * `radius` (*type:* `float`): Turning radius in meters
 
         > *Returns*
 
-        Description of return values
+        `numpy.array` with the `(t, p, q)` segment parameters of each word in
+        the order of `DUBINS_WORDS` (normalized by the radius) and a
+        `numpy.array` with the total length of each word in meters. Infeasible
+        words have a length of `numpy.inf`.
         """
-        return np.cross(
-            np.array([0, 0, 1]),
+        d_vec = pnt_2 - pnt_1
+        d = np.sqrt(np.sum(d_vec**2)) / radius
+        theta = np.arctan2(d_vec[1], d_vec[0])
+        alpha = self._mod_2pi(heading_1 - theta)
+        beta = self._mod_2pi(heading_2 - theta)
+
+        sa, sb = np.sin(alpha), np.sin(beta)
+        ca, cb = np.cos(alpha), np.cos(beta)
+        c_ab = np.cos(alpha - beta)
+
+        # Squared length of the middle segment for the CSC words and cosine
+        # of the middle arc for the CCC words, in the order of DUBINS_WORDS
+        p_sq = np.array(
+            [
+                2 + d**2 - 2 * c_ab + 2 * d * (sa - sb),
+                2 + d**2 - 2 * c_ab + 2 * d * (sb - sa),
+                -2 + d**2 + 2 * c_ab + 2 * d * (sa + sb),
+                -2 + d**2 + 2 * c_ab - 2 * d * (sa + sb),
+            ]
+        )
+        cos_p = (
             np.array(
                 [
-                    delta * radius * np.cos(self._get_phi(u, delta, heading)),
-                    delta * radius * np.sin(self._get_phi(u, delta, heading)),
-                    0,
+                    6 - d**2 + 2 * c_ab + 2 * d * (sa - sb),
+                    6 - d**2 + 2 * c_ab + 2 * d * (sb - sa),
                 ]
-            ),
-        )[0:2]
+            )
+            / 8.0
+        )
+        feasible = np.hstack((p_sq >= 0, np.abs(cos_p) <= 1))
 
-    def _get_circle(self, u, center, radius, delta, heading):
-        """Compute the 2D coordinates for a circle.
+        with np.errstate(invalid="ignore"):
+            p_csc = np.sqrt(p_sq)
+            p_ccc = self._mod_2pi(2 * np.pi - np.arccos(cos_p))
+
+        # Angles of the connecting segments
+        tmp_csc = np.array(
+            [
+                np.arctan2(cb - ca, d + sa - sb),
+                np.arctan2(ca - cb, d - sa + sb),
+                np.arctan2(-ca - cb, d + sa + sb) - np.arctan2(-2.0, p_csc[2]),
+                np.arctan2(ca + cb, d - sa - sb) - np.arctan2(2.0, p_csc[3]),
+            ]
+        )
+        phi_ccc = np.array(
+            [
+                np.arctan2(ca - cb, d - sa + sb),
+                np.arctan2(ca - cb, d + sa - sb),
+            ]
+        )
+
+        p = np.hstack((p_csc, p_ccc))
+        t = self._mod_2pi(
+            np.hstack(
+                (
+                    tmp_csc[0] - alpha,
+                    alpha - tmp_csc[1],
+                    tmp_csc[2] - alpha,
+                    alpha - tmp_csc[3],
+                    alpha - phi_ccc[0] + p_ccc[0] / 2,
+                    -alpha - phi_ccc[1] + p_ccc[1] / 2,
+                )
+            )
+        )
+        q = self._mod_2pi(
+            np.hstack(
+                (
+                    beta - tmp_csc[0],
+                    tmp_csc[1] - beta,
+                    tmp_csc[2] - beta,
+                    beta - tmp_csc[3],
+                    alpha - beta - t[4] + p_ccc[0],
+                    beta - alpha - t[5] + p_ccc[1],
+                )
+            )
+        )
+
+        params = np.vstack((t, p, q)).T
+        lengths = np.where(feasible, np.sum(params, axis=1) * radius, np.inf)
+        return params, lengths
+
+    def _sample_dubins_word(self, pnt, heading, mode, params, radius, n_arc=10):
+        """Compute the 2D points describing a Dubins word.
 
         > *Input arguments*
 
-        * `u` (*type:* `float`): Parametric variable in interval [0, 1]
-        * `center` (*type:* `numpy.array`): Center of the circle in meters
-        * `radius` (*type:* `float`): Radius of the circle in meters
-        * `delta` (*type:* `int`): Generate the points in counter-clockwise
-        direction if `delta` is -1 and clockwise if `delta` is 1
-        * `heading` (*type:* `float`): Heading associated to the waypoint
+        * `pnt` (*type:* `numpy.array`): 2D origin point
+        * `heading` (*type:* `float`): Heading at the origin point in radians
+        * `mode` (*type:* `str`): Dubins word, e.g. `RSL` or `LRL`
+        * `params` (*type:* `numpy.array`): `(t, p, q)` segment parameters
+        normalized by the radius
+        * `radius` (*type:* `float`): Turning radius in meters
+        * `n_arc` (*type:* `int`, *default:* `10`): Number of points sampled
+        on each arc
 
         > *Returns*
 
-        Circle coordinates as `numpy.array`.
+        List of 2D points as `numpy.array`, the last one being the end point
+        of the word.
         """
-        return center + radius * np.array(
-            [
-                np.cos(self._get_phi(u, delta, heading)),
-                np.sin(self._get_phi(u, delta, heading)),
-            ]
-        )
-
-    def _get_2d_dubins_path(
-        self,
-        center_1,
-        radius_1,
-        heading_1,
-        delta_1,
-        center_2,
-        radius_2,
-        heading_2,
-        delta_2,
-    ):
+        output = list()
+        pnt = np.array(pnt, dtype=float)
+        for segment, length in zip(mode, params):
+            if segment == "S":
+                output.append(pnt)
+                pnt = pnt + radius * length * np.array(
+                    [np.cos(heading), np.sin(heading)]
+                )
+                continue
+            # Turning direction: 1 for a left (counter-clockwise) and -1 for a
+            # right (clockwise) turn
+            k = 1 if segment == "L" else -1
+            if np.isclose(length, 0):
+                output.append(pnt)
+                continue
+            angles = heading + k * np.linspace(0, length, n_arc + 1)
+            arc = np.vstack(
+                (
+                    pnt[0] + k * radius * (np.sin(angles) - np.sin(heading)),
+                    pnt[1] - k * radius * (np.cos(angles) - np.cos(heading)),
+                )
+            ).T
+            output += list(arc[:-1])
+            pnt = arc[-1]
+            heading = angles[-1]
+        output.append(pnt)
+        return output
+
+    def _get_2d_dubins_path(self, pnt_1, heading_1, pnt_2, heading_2, radius=None):
         """Compute the 2D Dubins path algorithm. It computes the shortest curve
-        that connects two points. Given two circles which are tangent to the
-        origin and target waypoints, with a chosen heading to depart the first
-        and reach the second, find the path that will be first tangent
-        on circle tangent to the first waypoint, travel to towards the
-        second in a straight line and reach the closest tangent on the
-        circle around the second waypoint.
+        that connects two points with the given headings, considering both the
+        curve-straight-curve (`CSC`) words and, for waypoints closer than four
+        times the turning radius, the curve-curve-curve (`CCC`) words.
 
         > *Input arguments*
 
-        * `center_1` (*type:* `numpy.array`): 2D center of the circle tangent to
-        the origin waypoint.
-        * `radius_1` (*type:* `float`): Radius of the circle related to the origin
-        waypoint in meters
+        * `pnt_1` (*type:* `numpy.array`): 2D origin point
         * `heading_1` (*type:* `float`): Desired heading associated to the origin
         waypoint
-        * `delta_1` (*type:* `int`): Direction to travel around the circle, -1 for
-        counter-clockwise and 1 for clockwise
-        * `center_2` (*type:* `numpy.array`): 2D center of the circle tangent to
-        the target waypoint.
-        * `radius_2` (*type:* `float`): Radius of the circle related to the target
-        waypoint in meters
+        * `pnt_2` (*type:* `numpy.array`): 2D target point
         * `heading_2` (*type:* `float`): Desired heading associated to the target
         waypoint
-        * `delta_2` (*type:* `int`): Direction to travel around the circle, -1 for
-        counter-clockwise and 1 for clockwise
+        * `radius` (*type:* `float`, *default:* `None`): Turning radius. If `None`
+        is provided, then the internal radius will be used.
 
         > *Returns*
 
-        Description of return values
+        List of 2D points of the shortest path, its length in meters and the
+        Dubins word as `str`. The list of points is empty if no word is feasible.
         """
-        output = list()
+        r = self._radius if radius is None else radius
+        params, lengths = self._get_dubins_words(pnt_1, heading_1, pnt_2, heading_2, r)
+        idx = np.argmin(lengths)
+        if not np.isfinite(lengths[idx]):
+            return list(), 0, None
 
-        u1_func = lambda angle: self._compute_u(angle, delta_1, heading_1)
-        u2_func = lambda angle: self._compute_u(angle, delta_2, heading_2)
-
-        tan_func_1 = lambda u: self._get_tangent(u, delta_1, radius_1, heading_1)
-        tan_func_2 = lambda u: self._get_tangent(u, delta_2, radius_2, heading_2)
-
-        circle_1 = lambda u: self._get_circle(u, center_1, radius_1, delta_1, heading_1)
-        circle_2 = lambda u: self._get_circle(u, center_2, radius_2, delta_2, heading_2)
-
-        # Computing outer tangents
-        # Compute vector connecting the centers of the two circles
-        d = center_2 - center_1
-        ## Compute the normal vector to the vector connecting the two circle centers
-        n = np.dot(self._get_frame(np.pi / 2), d / np.linalg.norm(d))
-        ## Compute the angle of the normal vector
-        n_angle = np.arctan2(n[1], n[0])
-        ## First tangent
-        ### Compute the points on the circles belonging to the first tangent and the normal vector
-        u1 = u1_func(n_angle)
-        u2 = u2_func(n_angle)
-
-        ### Compute the points on the circles belonging to the tangent
-        c1 = circle_1(u1)
-        c2 = circle_2(u2)
-
-        ### Compute the tangent vector on points c1 and c2 according to the direction of rotation
-        ### provided by delta_1 and delta_2
-        t1 = tan_func_1(u1)
-        t1 /= np.linalg.norm(t1)
-        t2 = tan_func_2(u2)
-        t2 /= np.linalg.norm(t2)
-
-        tangent_1 = c2 - c1
-        tangent_1 /= np.linalg.norm(tangent_1)
-
-        ### Find out if the tangents on the circles and the tangents connecting the two circles
-        ### are equal
-        diff = np.linalg.norm(tangent_1 - t1) + np.linalg.norm(tangent_1 - t2)
-
-        if np.isclose(diff, 0):
-            # First tangent is the feasible path between the two circles
-            dist = 0.0
-            output = list()
-            if not np.isclose(u1, 0):
-                u = np.arange(0, u1, u1 / 10.0)
-                # Compute the points for the path on circle 1
-                output = [circle_1(ui) for ui in u]
-                dist = 2 * radius_1 * np.pi * u1
-            output += [circle_1(u1)]
-            # Compute the line segment between both circles
-            dist += np.linalg.norm(circle_2(u2) - circle_1(u1))
-            # Compute the points for the path on circle 2
-            if not np.isclose(u2, 1):
-                u = np.arange(u2, 1, (1 - u2) / 10.0)
-                output += [circle_2(ui) for ui in u]
-                dist += 2 * radius_2 * np.pi * (1 - u2)
-
-            output += [circle_2(1)]
-
-            return output, dist
-
-        ## Second tangent
-        ### Compute the angle of the normal vector
-        n_angle = np.arctan2(-n[1], -n[0])
-        ### Compute the points on the circles belonging to the first tangent and the normal vector
-        u1 = u1_func(n_angle)
-        u2 = u2_func(n_angle)
-
-        ### Compute the points on the circles belonging to the tangent
-        c1 = circle_1(u1)
-        c2 = circle_2(u2)
-
-        ### Compute the tangent vector on points c1 and c2 according to the direction of rotation
-        ### provided by delta_1 and delta_2
-        t1 = tan_func_1(u1)
-        t1 /= np.linalg.norm(t1)
-        t2 = tan_func_2(u2)
-        t2 /= np.linalg.norm(t2)
-
-        # Compute the vector from circle 1 to circle 2
-        tangent_2 = c2 - c1
-        tangent_2 /= np.linalg.norm(tangent_2)
-
-        ### Find out if the tangents on the circles and the tangents connecting the two circles
-        ### are equal
-        diff = np.linalg.norm(tangent_2 - t1) + np.linalg.norm(tangent_2 - t2)
-
-        if np.isclose(diff, 0):
-            # Second tangent is the feasible path between the two circles
-            dist = 0.0
-            output = list()
-            if not np.isclose(u1, 0):
-                u = np.arange(0, u1, u1 / 10.0)
-                # Compute the points for the path on circle 1
-                output = [circle_1(ui) for ui in u]
-                dist = 2 * radius_1 * np.pi * u1
-            output += [circle_1(u1)]
-            # Compute the line segment between both circles
-            dist += np.linalg.norm(circle_2(u2) - circle_1(u1))
-            # Compute the points for the path on circle 2
-            if not np.isclose(u2, 1):
-                u = np.arange(u2, 1, (1 - u2) / 10.0)
-                output += [circle_2(ui) for ui in u]
-                dist += 2 * radius_2 * np.pi * (1 - u2)
-
-            output += [circle_2(1)]
-
-            return output, dist
-
-        # Computing paths with inner tangents if dist(center_1, center_2) > radius_1 + radius_2
-        if self._get_distance(center_1, center_2) > (radius_1 + radius_2):
-            # Calculate the intersection point of the two tangent lines
-            xp = (center_1[0] * radius_1 + center_2[0] * radius_2) / (
-                radius_1 + radius_2
-            )
-            yp = (center_1[1] * radius_1 + center_2[1] * radius_2) / (
-                radius_1 + radius_2
-            )
-
-            # Compute the points beloging to the inner tangents and the circles
-            xt1 = (
-                radius_1**2 * (xp - center_1[0])
-                + radius_1
-                * (yp - center_1[1])
-                * np.sqrt(
-                    (xp - center_1[0]) ** 2 + (yp - center_1[1]) ** 2 - radius_1**2
-                )
-            ) / ((xp - center_1[0]) ** 2 + (yp - center_1[1]) ** 2) + center_1[0]
-            xt2 = (
-                radius_1**2 * (xp - center_1[0])
-                - radius_1
-                * (yp - center_1[1])
-                * np.sqrt(
-                    (xp - center_1[0]) ** 2 + (yp - center_1[1]) ** 2 - radius_1**2
-                )
-            ) / ((xp - center_1[0]) ** 2 + (yp - center_1[1]) ** 2) + center_1[0]
-
-            yt1 = (
-                (radius_1**2 * (yp - center_1[1]))
-                - radius_1
-                * (xp - center_1[0])
-                * np.sqrt(
-                    (xp - center_1[0]) ** 2 + (yp - center_1[1]) ** 2 - radius_1**2
-                )
-            ) / ((xp - center_1[0]) ** 2 + (yp - center_1[1]) ** 2) + center_1[1]
-            yt2 = (
-                (radius_1**2 * (yp - center_1[1]))
-                + radius_1
-                * (xp - center_1[0])
-                * np.sqrt(
-                    (xp - center_1[0]) ** 2 + (yp - center_1[1]) ** 2 - radius_1**2
-                )
-            ) / ((xp - center_1[0]) ** 2 + (yp - center_1[1]) ** 2) + center_1[1]
-
-            xt3 = (
-                radius_2**2 * (xp - center_2[0])
-                + radius_2
-                * (yp - center_2[1])
-                * np.sqrt(
-                    (xp - center_2[0]) ** 2 + (yp - center_2[1]) ** 2 - radius_2**2
-                )
-            ) / ((xp - center_2[0]) ** 2 + (yp - center_2[1]) ** 2) + center_2[0]
-            xt4 = (
-                radius_2**2 * (xp - center_2[0])
-                - radius_2
-                * (yp - center_2[1])
-                * np.sqrt(
-                    (xp - center_2[0]) ** 2 + (yp - center_2[1]) ** 2 - radius_2**2
-                )
-            ) / ((xp - center_2[0]) ** 2 + (yp - center_2[1]) ** 2) + center_2[0]
-
-            yt3 = (
-                (radius_2**2 * (yp - center_2[1]))
-                - radius_2
-                * (xp - center_2[0])
-                * np.sqrt(
-                    (xp - center_2[0]) ** 2 + (yp - center_2[1]) ** 2 - radius_2**2
-                )
-            ) / ((xp - center_2[0]) ** 2 + (yp - center_2[1]) ** 2) + center_2[1]
-            yt4 = (
-                (radius_2**2 * (yp - center_2[1]))
-                + radius_2
-                * (xp - center_2[0])
-                * np.sqrt(
-                    (xp - center_2[0]) ** 2 + (yp - center_2[1]) ** 2 - radius_2**2
-                )
-            ) / ((xp - center_2[0]) ** 2 + (yp - center_2[1]) ** 2) + center_2[1]
-
-            # Third tangent
-            ## Compute the points on the circles belonging to the first tangent and the normal vector
-            u1 = u1_func(np.arctan2(yt1 - center_1[1], xt1 - center_1[0]))
-            u2 = u2_func(np.arctan2(yt3 - center_2[1], xt3 - center_2[0]))
-
-            ## Compute the points on the circles belonging to the tangent
-            c1 = circle_1(u1)
-            c2 = circle_2(u2)
-
-            ### Compute the tangent vector on points c1 and c2 according to the direction of rotation
-            ### provided by delta_1 and delta_2
-            t1 = tan_func_1(u1)
-            t1 /= np.linalg.norm(t1)
-            t2 = tan_func_2(u2)
-            t2 /= np.linalg.norm(t2)
-
-            tangent_3 = np.array([xt3 - xt1, yt3 - yt1])
-            tangent_3 /= np.linalg.norm(tangent_3)
-
-            ### Find out if the tangents on the circles and the tangents connecting the two circles
-            ### are equal
-            diff = np.linalg.norm(tangent_3 - t1) + np.linalg.norm(tangent_3 - t2)
-
-            if np.isclose(diff, 0):
-                # Third tangent is the feasible path between the two circles
-                dist = 0.0
-                output = list()
-                if not np.isclose(u1, 0):
-                    u = np.arange(0, u1, u1 / 10.0)
-                    # Compute the points for the path on circle 1
-                    output = [circle_1(ui) for ui in u]
-                    dist = 2 * radius_1 * np.pi * u1
-                output += [circle_1(u1)]
-                # Compute the line segment between both circles
-                dist += np.linalg.norm(circle_2(u2) - circle_1(u1))
-                # Compute the points for the path on circle 2
-                if not np.isclose(u2, 1):
-                    u = np.arange(u2, 1, (1 - u2) / 10.0)
-                    output += [circle_2(ui) for ui in u]
-                    dist += 2 * radius_2 * np.pi * (1 - u2)
-
-                output += [circle_2(1)]
-
-                return output, dist
-
-            # Fourth tangent
-            ## Compute the points on the circles belonging to the first tangent and the normal vector
-            u1 = u1_func(np.arctan2(yt2 - center_1[1], xt2 - center_1[0]))
-            u2 = u2_func(np.arctan2(yt4 - center_2[1], xt4 - center_2[0]))
-
-            ## Compute the points on the circles belonging to the tangent
-            c1 = circle_1(u1)
-            c2 = circle_2(u2)
-
-            ### Compute the tangent vector on points c1 and c2 according to the direction of rotation
-            ### provided by delta_1 and delta_2
-            t1 = tan_func_1(u1)
-            t1 /= np.linalg.norm(t1)
-            t2 = tan_func_2(u2)
-            t2 /= np.linalg.norm(t2)
-
-            tangent_4 = np.array([xt4 - xt2, yt4 - yt2])
-            tangent_4 /= np.linalg.norm(tangent_4)
-
-            ### Find out if the tangents on the circles and the tangents connecting the two circles
-            ### are equal
-            diff = np.linalg.norm(tangent_4 - t1) + np.linalg.norm(tangent_4 - t2)
-
-            if np.isclose(diff, 0):
-                # Fourth tangent is the feasible path between the two circles
-                dist = 0.0
-                output = list()
-                if not np.isclose(u1, 0):
-                    u = np.arange(0, u1, u1 / 10.0)
-                    # Compute the points for the path on circle 1
-                    output = [circle_1(ui) for ui in u]
-                    dist = 2 * radius_1 * np.pi * u1
-                output += [circle_1(u1)]
-                # Compute the line segment between both circles
-                dist += np.linalg.norm(circle_2(u2) - circle_1(u1))
-                # Compute the points for the path on circle 2
-                if not np.isclose(u2, 1):
-                    u = np.arange(u2, 1, (1 - u2) / 10.0)
-                    output += [circle_2(ui) for ui in u]
-                    dist += 2 * radius_2 * np.pi * (1 - u2)
-
-                output += [circle_2(1)]
-
-                return output, dist
-
-        return output, 0
+        mode = self.DUBINS_WORDS[idx]
+        output = self._sample_dubins_word(pnt_1, heading_1, mode, params[idx], r)
+        # Snap the end of the path onto the target to remove round-off errors
+        output[-1] = np.array(pnt_2, dtype=float)
+        return output, lengths[idx], mode
 
     def _get_center(self, side, y_vec, wp):
         if side == "R":
@@ -666,45 +558,13 @@ class DubinsInterpolator(PathGenerator):
                     False,
                 )
 
-                for i in np.linspace(0, 1, n * 10):
-                    pnts.append(helix.interpolate(i))
+                pnts += list(helix.interpolate(np.linspace(0, 1, n * 10)))
 
             return pnts
 
-        modes = ["RSR", "RSL", "LSR", "LSL"]
-
-        path = None
-        min_dist = None
-        mode = None
-
-        for c in modes:
-            center_1 = self._get_center(c[0], frame_init[:, 1].flatten(), wp_init)
-            center_2 = self._get_center(c[-1], frame_final[:, 1].flatten(), wp_final)
-
-            delta_1 = -1 if c[0] == "R" else 1
-            delta_2 = -1 if c[-1] == "R" else 1
-
-            output, dist = self._get_2d_dubins_path(
-                center_1[0:2],
-                self._radius,
-                heading_init,
-                delta_1,
-                center_2[0:2],
-                self._radius,
-                heading_final,
-                delta_2,
-            )
-
-            if len(output) > 0:
-                if min_dist is None:
-                    path = output
-                    min_dist = dist
-                    mode = c
-                else:
-                    if dist < min_dist:
-                        min_dist = dist
-                        path = output
-                        mode = c
+        path, _, mode = self._get_2d_dubins_path(
+            wp_init.pos[0:2], heading_init, wp_final.pos[0:2], heading_final
+        )
 
         pnts = list()
 
@@ -751,8 +611,7 @@ class DubinsInterpolator(PathGenerator):
                 False if mode[-1] == "R" else True,
             )
 
-            for i in np.linspace(0, 1, (n - 1) * 10):
-                pnts.append(helix.interpolate(i))
+            pnts += list(helix.interpolate(np.linspace(0, 1, (n - 1) * 10)))
 
         return pnts
 
@@ -768,44 +627,151 @@ class DubinsInterpolator(PathGenerator):
 
         List of `uuv_trajectory_generator.TrajectoryPoint`.
         """
+        pnts = self.get_sample_array(step)
+        if pnts is None:
+            return None
+        return list(pnts)
+
+    def get_sample_array(self, step=0.001):
+        """Sample the full path for position and quaternion vectors into a
+        single array. `step` is represented in the path's parametric space.
+        The orientation, velocity and acceleration of all samples are
+        computed at once from the derivatives of the path.
+
+        > *Input arguments*
+
+        * `step` (*type:* `float`, *default:* `0.001`): Step of the path's
+        parametric input between samples
+
+        > *Returns*
+
+        `uuv_trajectory_generator.TrajectoryPointArray`
+        """
         if self._waypoints is None:
             return None
-        if len(self._interp_fcns) == 0:
+        if self._path is None:
             return None
         s = np.arange(0, 1 + step, step)
-
-        pnts = list()
-        for i in s:
-            pnt = TrajectoryPoint()
-            pnt.pos = self.generate_pos(i).tolist()
-            pnt.t = 0.0
-            pnts.append(pnt)
+        s = s[s <= 1]
+
+        kinematics = self.generate_kinematics(s)
+        pnts = TrajectoryPointArray(len(s))
+        pnts.t = self._start_time + s * self._duration
+        pnts.pos = self.generate_pos(s)
+        pnts.rotq = self._compute_rot_quat(kinematics["heading"], kinematics["pitch"])
+        pnts.vel = kinematics["vel"]
+        pnts.acc = kinematics["acc"]
         return pnts
 
+    def get_adaptive_samples(self, tolerance):
+        """Sample the full path with as few positions as needed for the
+        polyline through them to stay within `tolerance` of the path. Each
+        path segment is subdivided independently, so the number of samples
+        scales with the complexity of the path instead of being fixed.
+
+        > *Input arguments*
+
+        * `tolerance` (*type:* `float`): Maximum deviation in meters between
+        the path and the polyline through the samples
+
+        > *Returns*
+
+        `numpy.array` of shape `(N, 3)` with the sampled positions.
+        """
+        if self._waypoints is None:
+            return None
+        if self._path is None:
+            return None
+        return self._path.get_adaptive_samples(tolerance)
+
     def generate_pos(self, s):
         """Generate a position vector for the path sampled point
         interpolated on the position related to `s`, `s` being
-        represented in the curve's parametric space.
+        represented in the curve's parametric space. The path is
+        parametrized by its arc length, so equally spaced values of
+        `s` result in equally spaced points along the path.
 
         > *Input arguments*
 
-        * `s` (*type:* `float`): Curve's parametric input expressed in the
-        interval of [0, 1]
+        * `s` (*type:* `float` or `numpy.array`): Curve's parametric input(s)
+        expressed in the interval of [0, 1]
 
         > *Returns*
 
-        3D position vector as a `numpy.array`.
+        3D position vector as a `numpy.array`, or an `(N, 3)` `numpy.array`
+        of position vectors if `s` is an array.
         """
-        if len(self._interp_fcns) == 0:
+        if self._path is None:
             return None
-        idx = self.get_segment_idx(s)
-        if idx == 0:
-            u_k = 0
-            pos = self._interp_fcns[idx].interpolate(u_k)
-        else:
-            u_k = (s - self._s[idx - 1]) / (self._s[idx] - self._s[idx - 1])
-            pos = self._interp_fcns[idx - 1].interpolate(u_k)
-        return pos
+        return self._path.evaluate(s)
+
+    def generate_kinematics(self, s, speed=None):
+        """Compute the heading, pitch, their rates and the velocity and
+        acceleration vectors for the path sampled at `s`, assuming the path
+        is followed at a constant speed. All quantities are computed at once
+        from the first and second derivatives of the path with respect to its
+        arc length.
+
+        > *Input arguments*
+
+        * `s` (*type:* `float` or `numpy.array`): Curve's parametric input(s)
+        expressed in the interval of [0, 1]
+        * `speed` (*type:* `float`, *default:* `None`): Speed along the path
+        in m/s. If `None` is provided, the speed is computed from the path's
+        length and duration.
+
+        > *Returns*
+
+        `dict` of `numpy.array` with the `heading` and `pitch` angles in
+        radians, the `yaw_rate` and `pitch_rate` in rad/s and the `vel` and
+        `acc` vectors. `vel` holds the linear velocity in m/s and the angular
+        velocity as `(0, pitch_rate, yaw_rate)` in rad/s. `acc` holds the
+        linear acceleration in m/s$^2$, the angular acceleration is set to
+        zero.
+        """
+        if self._path is None:
+            return None
+        if speed is None:
+            speed = self._path.length() / self._duration
+        tangent, curvature = self._path.derivatives(s)
+        tx, ty, tz = tangent.T
+        kx, ky, kz = curvature.T
+
+        heading = np.arctan2(ty, tx)
+        # Pitch is positive for a descending path, as for a rotation about
+        # the y-axis of a frame with the z-axis pointing up
+        pitch = -np.arctan2(tz, np.hypot(tx, ty))
+
+        # Rates of the angles from their derivatives with respect to the arc
+        # length. Vertical tangents have no defined heading, so their rates
+        # are set to zero.
+        h_sq = tx**2 + ty**2
+        h = np.sqrt(h_sq)
+        vertical = np.isclose(h, 0)
+        yaw_rate = speed * np.divide(
+            tx * ky - ty * kx, h_sq, out=np.zeros_like(h), where=~vertical
+        )
+        pitch_rate = -speed * (
+            h * kz
+            - tz
+            * np.divide(tx * kx + ty * ky, h, out=np.zeros_like(h), where=~vertical)
+        )
+        if not self._is_full_dof:
+            pitch_rate = np.zeros_like(pitch_rate)
+
+        zeros = np.zeros((len(h), 3))
+        vel = np.hstack(
+            (speed * tangent, np.stack((zeros[:, 0], pitch_rate, yaw_rate), axis=-1))
+        )
+        acc = np.hstack((speed**2 * curvature, zeros))
+        return dict(
+            heading=heading,
+            pitch=pitch,
+            yaw_rate=yaw_rate,
+            pitch_rate=pitch_rate,
+            vel=vel,
+            acc=acc,
+        )
 
     def generate_pnt(self, s, t, *args):
         """Compute a point that belongs to the path on the
@@ -820,16 +786,20 @@ class DubinsInterpolator(PathGenerator):
 
         > *Returns*
 
-        `uuv_trajectory_generator.TrajectoryPoint` including position
-        and quaternion vectors.
+        `uuv_trajectory_generator.TrajectoryPoint` including position,
+        quaternion, velocity and acceleration vectors.
         """
+        kinematics = self.generate_kinematics(s)
         pnt = TrajectoryPoint()
         # Trajectory time stamp
         pnt.t = t
         # Set position vector
         pnt.pos = self.generate_pos(s).tolist()
         # Set rotation quaternion
-        pnt.rotq = self.generate_quat(s)
+        pnt.rotq = self._compute_rot_quat(kinematics["heading"], kinematics["pitch"])[0]
+        # Set velocity and acceleration vectors
+        pnt.vel = kinematics["vel"][0]
+        pnt.acc = kinematics["acc"][0]
         return pnt
 
     def generate_quat(self, s):
@@ -837,34 +807,24 @@ class DubinsInterpolator(PathGenerator):
         point related to `s`, `s` being represented in the curve's parametric
         space.
         The quaternion is computed assuming the heading follows the direction
-        of the path towards the target. Roll and pitch can also be computed
-        in case the `full_dof` is set to `True`.
+        of the path's tangent. Pitch can also be computed in case the
+        `full_dof` is set to `True`.
 
         > *Input arguments*
 
-        * `s` (*type:* `float`): Curve's parametric input expressed in the
-        interval of [0, 1]
+        * `s` (*type:* `float` or `numpy.array`): Curve's parametric input(s)
+        expressed in the interval of [0, 1]
 
         > *Returns*
 
-        Rotation quaternion as a `numpy.array` as `(x, y, z, w)`
+        Rotation quaternion as a `numpy.array` as `(x, y, z, w)`, or an
+        `(N, 4)` `numpy.array` of quaternions if `s` is an array.
         """
-        s = max(0, s)
-        s = min(s, 1)
-
-        if s == 0:
-            self._last_rot = deepcopy(self._init_rot)
-            return self._init_rot
-
-        last_s = max(0, s - self._s_step)
-
-        this_pos = self.generate_pos(s)
-        last_pos = self.generate_pos(last_s)
-
-        dx = this_pos[0] - last_pos[0]
-        dy = this_pos[1] - last_pos[1]
-        dz = this_pos[2] - last_pos[2]
-
-        rotq = self._compute_rot_quat(dx, dy, dz)
-        self._last_rot = rotq
-        return rotq
+        if self._path is None:
+            return None
+        tangent = np.atleast_2d(self._path.derivative(s))
+        rotq = self._compute_rot_quat(
+            np.arctan2(tangent[:, 1], tangent[:, 0]),
+            -np.arctan2(tangent[:, 2], np.hypot(tangent[:, 0], tangent[:, 1])),
+        )
+        return rotq[0] if np.ndim(s) == 0 else rotq
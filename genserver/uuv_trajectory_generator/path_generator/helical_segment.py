@@ -26,8 +26,15 @@ class HelicalSegment:
     helix = HelicalSegment(center, radius, n_turns, delta_z, angle_offset, is_clockwise)
 
     u = numpy.linspace(0, 1, 100)
-    pnts = numpy.array([helix.interpolate(i) for i in u])
+    pnts = helix.interpolate(u)
     ```
+
+    !!! note
+
+        The helix has a constant radius and a constant step in the Z direction,
+        so its parametric variable `u` is proportional to the arc length and
+        samples that are uniformly spaced in `u` are also uniformly spaced
+        along the path.
     """
 
     def __init__(
@@ -60,25 +67,27 @@ class HelicalSegment:
         )
 
     def interpolate(self, u):
-        """Compute the 3D point on the helical path
+        """Compute the 3D points on the helical path
 
         > *Input arguments*
 
-        * `param` (*type:* `data_type`, *default:* `data`): Parameter description
+        * `u` (*type:* `float` or `numpy.array`): Parametric input(s) of the
+        helix in the interval `[0, 1]`
 
         > *Returns*
 
-        Description of return values
+        3D point as a `numpy.array` of shape `(3,)` for a scalar input, or the
+        3D points as a `numpy.array` of shape `(N, 3)` for an array input
         """
-        u = max(u, 0)
-        u = min(u, 1)
+        u = np.clip(u, 0, 1)
         delta = 1 if self._is_clockwise else -1
-        x = self._radius * np.cos(
-            self._n_turns * 2 * np.pi * u * delta + self._angle_offset
+        angle = self._n_turns * 2 * np.pi * delta * u + self._angle_offset
+        pnts = np.stack(
+            (
+                self._radius * np.cos(angle),
+                self._radius * np.sin(angle),
+                self._n_turns * self._step_z * u,
+            ),
+            axis=-1,
         )
-        y = self._radius * np.sin(
-            self._n_turns * 2 * np.pi * u * delta + self._angle_offset
-        )
-        z = self._n_turns * u * self._step_z
-
-        return self._center + np.array([x, y, z])
+        return self._center + pnts
@@ -32,6 +32,9 @@ class PathGenerator:
 
         # The parametric variable to use as input for the interpolator
         self._s = list()
+        # Values of the parametric variable at each waypoint and index of the
+        # next waypoint along the path for each value in `self._s`
+        self._wp_s = list()
         self._segment_to_wp_map = list()
         self._cur_s = 0
         self._s_step = 0.0001
@@ -43,8 +46,8 @@ class PathGenerator:
 
         self._final_pos_tolerance = 0.1
 
-        # self._init_rot = quaternion_about_axis(0.0, [0, 0, 1])
-        # self._last_rot = quaternion_about_axis(0.0, [0, 0, 1])
+        self._init_rot = np.array([0, 0, 0, 1.0])
+        self._last_rot = np.array([0, 0, 0, 1.0])
 
         # self._markers_msg = MarkerArray()
         self._marker_id = 0
@@ -128,14 +131,7 @@ class PathGenerator:
         """Return the index of the closest waypoint to the current
         position on the path.
         """
-
-        if self._cur_s == 0:
-            return 0
-        if self._cur_s == 1:
-            return len(self._s) - 1
-        v = np.array(self._s - self._cur_s)
-        idx = np.argmin(v)
-        return idx
+        return self.get_closest_waypoint_idx(self._cur_s)
 
     @property
     def s_step(self):
@@ -156,6 +152,7 @@ class PathGenerator:
 
     def reset(self):
         self._s = list()
+        self._wp_s = list()
         self._segment_to_wp_map = list()
         self._cur_s = 0
         self._s_step = 0.0001
@@ -164,27 +161,85 @@ class PathGenerator:
         self._duration = None
 
     def get_segment_idx(self, s):
+        """Return the index of the first value in `self._s` that is greater
+        than or equal to `s`, i.e. the end of the segment `s` belongs to.
+
+        > *Input arguments*
+
+        * `s` (*type:* `float` or `numpy.array`): Curve's parametric input(s)
+        expressed in the interval of [0, 1]
+
+        > *Returns*
+
+        Index (or `numpy.array` of indices) into `self._s`
+        """
         if len(self._s) == 0:
             return 0
         # Ensure the parameter s is 0 <= s <= 1
-        s = max(0, s)
-        s = min(s, 1)
+        idx = np.searchsorted(self._s, np.clip(s, 0, 1), side="left")
+        return np.minimum(idx, len(self._s) - 1)
 
-        if s == 1:
-            idx = self._s.size - 1
-        else:
-            idx = (self._s - s >= 0).nonzero()[0][0]
-        return idx
+    def get_closest_waypoint_idx(self, s):
+        """Return the index of the closest waypoint along the path to the
+        position related to `s`.
+
+        > *Input arguments*
+
+        * `s` (*type:* `float` or `numpy.array`): Curve's parametric input(s)
+        expressed in the interval of [0, 1]
+
+        > *Returns*
+
+        Waypoint index (or `numpy.array` of indices)
+        """
+        if len(self._wp_s) < 2:
+            return 0 if np.ndim(s) == 0 else np.zeros(np.shape(s), dtype=int)
+        s = np.clip(s, 0, 1)
+        # Compare the waypoints right before and after s
+        idx = np.clip(np.searchsorted(self._wp_s, s), 1, len(self._wp_s) - 1)
+        return np.where(self._wp_s[idx] - s <= s - self._wp_s[idx - 1], idx, idx - 1)[
+            ()
+        ]
+
+    def get_next_waypoint_idx(self, s):
+        """Return the index of the next waypoint along the path from the
+        position related to `s`, using the precomputed segment to waypoint
+        index.
+
+        > *Input arguments*
+
+        * `s` (*type:* `float` or `numpy.array`): Curve's parametric input(s)
+        expressed in the interval of [0, 1]
+
+        > *Returns*
+
+        Waypoint index (or `numpy.array` of indices)
+        """
+        return self._segment_to_wp_map[self.get_segment_idx(s)]
 
     def get_remaining_waypoints_idx(self, s):
-        idx = self.get_segment_idx(s)
-        try:
-            wps = self._segment_to_wp_map[idx::]
-            return np.unique(wps)
-        except:
+        if len(self._segment_to_wp_map) == 0:
             # self._logger.error('Invalid segment index')
             print("Invalid segment index")
             return None
+        # The waypoints are visited in order, so the remaining waypoints are
+        # all waypoints from the next one onwards
+        return np.arange(self.get_next_waypoint_idx(s), len(self._wp_s))
+
+    def _init_waypoint_index(self, wp_s):
+        """Store the values of the parametric variable at each waypoint and
+        precompute the index of the next waypoint for each value in
+        `self._s`, to be called once `self._s` is set.
+
+        > *Input arguments*
+
+        * `wp_s` (*type:* `numpy.array`): Non-decreasing values of the
+        parametric variable at each waypoint
+        """
+        self._wp_s = np.asarray(wp_s, dtype=float)
+        self._segment_to_wp_map = np.minimum(
+            np.searchsorted(self._wp_s, self._s, side="left"), len(self._wp_s) - 1
+        )
 
     def is_full_dof(self):
         return self._is_full_dof
@@ -213,9 +268,27 @@ class PathGenerator:
         self._waypoints.add_waypoint(waypoint, add_to_beginning)
         return self.init_interpolator()
 
-    def init_waypoints(self, waypoints=None, init_rot=np.array([0, 0, 0, 1])):
+    def init_waypoints(
+        self, waypoints=None, init_rot=np.array([0, 0, 0, 1]), copy=True
+    ):
+        """Set the waypoints to be interpolated.
+
+        > *Input arguments*
+
+        * `waypoints` (*type:* `uuv_waypoints.WaypointSet`, *default:* `None`):
+        Set of waypoints. If `None`, the current waypoint set is kept.
+        * `init_rot` (*type:* `numpy.array`, *default:* `[0, 0, 0, 1]`): Initial
+        rotation quaternion
+        * `copy` (*type:* `bool`, *default:* `True`): If `True`, store a deep
+        copy of `waypoints`. If `False`, store a reference to it, which avoids
+        copying large waypoint sets that are not modified by the caller.
+
+        > *Returns*
+
+        `True` if a waypoint set is available, `False` otherwise.
+        """
         if waypoints is not None:
-            self._waypoints = deepcopy(waypoints)
+            self._waypoints = deepcopy(waypoints) if copy else waypoints
 
         if self._waypoints is None:
             # self._logger.error('Waypoint list has not been initialized')
@@ -223,6 +296,7 @@ class PathGenerator:
             return False
 
         self._init_rot = init_rot
+        self._last_rot = np.array(init_rot, dtype=float)
         # self._logger.info('Setting initial rotation as={}'.format(init_rot))
         print("Setting initial rotation as={}".format(init_rot))
         return True
@@ -254,22 +328,34 @@ class PathGenerator:
     def set_parameters(self, params):
         raise NotImplementedError()
 
-    # def _compute_rot_quat(self, dx, dy, dz):
-    #     if np.isclose(dx, 0) and np.isclose(dy, 0):
-    #         rotq = self._last_rot
-    #     else:
-    #         heading = np.arctan2(dy, dx)
-    #         rotq = quaternion_about_axis(heading, [0, 0, 1])
-
-    #     if self._is_full_dof:
-    #         rote = quaternion_about_axis(
-    #             -1 * np.arctan2(dz, np.sqrt(dx**2 + dy**2)),
-    #             [0, 1, 0])
-    #         rotq = quaternion_multiply(rotq, rote)
-
-    #     # Certify that the next quaternion remains in the same half hemisphere
-    #     d_prod = np.dot(self._last_rot, rotq)
-    #     if d_prod < 0:
-    #         rotq *= -1
-
-    #     return rotq
+    def _compute_rot_quat(self, heading, pitch=None):
+        """Compute the rotation quaternions for sequences of heading and
+        pitch angles. Consecutive quaternions, starting from the last computed
+        one, are kept in the same hemisphere to avoid sign flips.
+
+        > *Input arguments*
+
+        * `heading` (*type:* `numpy.array`): Heading angles in radians
+        * `pitch` (*type:* `numpy.array`, *default:* `None`): Pitch angles in
+        radians, only used if the path is generated for all degrees of freedom
+
+        > *Returns*
+
+        `(N, 4)` `numpy.array` of rotation quaternions as `(x, y, z, w)`
+        """
+        heading = np.atleast_1d(heading)
+        if pitch is None or not self._is_full_dof:
+            pitch = np.zeros_like(heading)
+        # Rotation about the z-axis by the heading, followed by a rotation
+        # about the y-axis by the pitch
+        sz, cz = np.sin(heading / 2), np.cos(heading / 2)
+        sp, cp = np.sin(pitch / 2), np.cos(pitch / 2)
+        rotq = np.stack((-sz * sp, cz * sp, sz * cp, cz * cp), axis=-1)
+
+        # Certify that the next quaternion remains in the same half hemisphere
+        prev = np.vstack((self._last_rot, rotq[:-1]))
+        rotq *= np.cumprod(np.where(np.sum(prev * rotq, axis=1) < 0, -1, 1))[
+            :, np.newaxis
+        ]
+        self._last_rot = rotq[-1].copy()
+        return rotq
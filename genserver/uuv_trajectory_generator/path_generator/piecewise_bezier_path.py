@@ -0,0 +1,332 @@
+import numpy as np
+
+from uuv_trajectory_generator.path_generator.bezier_curve import (
+    ARC_LENGTH_TABLE_SIZE,
+    compute_arc_length_tables,
+    evaluate_bezier,
+    integrate_speed,
+)
+
+
+class PiecewiseBezierPath:
+    """Path made of consecutive Bezier curve segments of the same order.
+    The control points of all segments and their arc length lookup tables
+    are stored in one contiguous array, so the path is evaluated with
+    vectorized operations over all segments and pickled as a single buffer.
+
+    The path is parametrized by its normalized arc length `s` in the
+    interval `[0, 1]`, so equally spaced values of `s` result in equally
+    spaced points along the path.
+
+    > *Input arguments*
+
+    * `control_pnts` (*type:* `numpy.array`): `(M, order + 1, 3)` array with
+    the control points of the `M` segments, for orders 3, 4 or 5
+
+    > *Example*
+
+    ```python
+    control_pnts, _ = BezierCurve.fit_cubic_control_pnts(pnts)
+    path = PiecewiseBezierPath(control_pnts)
+
+    s = numpy.linspace(0, 1, 100)
+    pnts = path.evaluate(s)
+    ```
+    """
+
+    def __init__(self, control_pnts):
+        control_pnts = np.asarray(control_pnts, dtype=float)
+        assert (
+            control_pnts.ndim == 3
+            and control_pnts.shape[1] in [4, 5, 6]
+            and control_pnts.shape[2] == 3
+        ), "Control points must be an array of shape (M, order + 1, 3)"
+        assert len(control_pnts) > 0, "At least one segment is needed"
+
+        self._init_buffer(len(control_pnts), control_pnts.shape[1])
+        self._control_pnts[:] = control_pnts
+        self._s_table[:] = compute_arc_length_tables(control_pnts)
+        self._init_breakpoints()
+
+    def __getstate__(self):
+        return dict(n_control_pnts=self._control_pnts.shape[1], buffer=self._buffer)
+
+    def __setstate__(self, state):
+        self._buffer = state["buffer"]
+        n_seg = self._buffer.size // (
+            3 * state["n_control_pnts"] + ARC_LENGTH_TABLE_SIZE + 1
+        )
+        self._set_views(n_seg, state["n_control_pnts"])
+        self._init_breakpoints()
+
+    @property
+    def order(self):
+        """`int`: Order of the Bezier curve segments"""
+        return self._control_pnts.shape[1] - 1
+
+    @property
+    def num_segments(self):
+        """`int`: Number of segments"""
+        return self._control_pnts.shape[0]
+
+    @property
+    def control_pnts(self):
+        """`numpy.array`: `(M, order + 1, 3)` array of control points"""
+        return self._control_pnts
+
+    @property
+    def breakpoints(self):
+        """`numpy.array`: `(M + 1,)` array with the values of `s` at the start
+        of each segment and at the end of the path"""
+        return self._breakpoints
+
+    @property
+    def segment_lengths(self):
+        """`numpy.array`: `(M,)` array with the length of each segment in
+        meters"""
+        return self._s_table[:, -1]
+
+    def length(self):
+        """Return the length of the path in meters"""
+        return self._length
+
+    def splice(self, first_seg, control_pnts):
+        """Create a new path keeping the segments before `first_seg` and
+        replacing the rest with new segments. The arc length tables of the
+        kept segments are reused.
+
+        > *Input arguments*
+
+        * `first_seg` (*type:* `int`): Index of the first replaced segment
+        * `control_pnts` (*type:* `numpy.array`): `(K, order + 1, 3)` array
+        with the control points of the new segments
+
+        > *Returns*
+
+        `PiecewiseBezierPath` object
+        """
+        control_pnts = np.asarray(control_pnts, dtype=float)
+        assert (
+            control_pnts.shape[1:] == self._control_pnts.shape[1:]
+        ), "The new segments must be of the same order"
+
+        path = PiecewiseBezierPath.__new__(PiecewiseBezierPath)
+        path._init_buffer(first_seg + len(control_pnts), control_pnts.shape[1])
+        path._control_pnts[:first_seg] = self._control_pnts[:first_seg]
+        path._control_pnts[first_seg:] = control_pnts
+        path._s_table[:first_seg] = self._s_table[:first_seg]
+        path._s_table[first_seg:] = compute_arc_length_tables(control_pnts)
+        path._init_breakpoints()
+        return path
+
+    def get_segment_idx(self, s):
+        """Return the index of the segment each input belongs to.
+
+        > *Input arguments*
+
+        * `s` (*type:* `float` or `numpy.array`): Path's parametric input(s)
+        in the interval `[0, 1]`
+
+        > *Returns*
+
+        Segment index (or array of indices)
+        """
+        idx = np.searchsorted(self._breakpoints, s, side="right") - 1
+        return np.clip(idx, 0, self.num_segments - 1)
+
+    def get_param(self, s):
+        """Map the path's parametric input onto the segments' parametric
+        inputs, inverting the arc length lookup tables.
+
+        > *Input arguments*
+
+        * `s` (*type:* `float` or `numpy.array`): Path's parametric input(s)
+        in the interval `[0, 1]`
+
+        > *Returns*
+
+        Segment indices and the parametric inputs `u` in the interval `[0, 1]`
+        on these segments, as `numpy.array` of shape `(N,)`
+        """
+        s = np.atleast_1d(np.clip(s, 0, 1)).astype(float)
+        idx = self.get_segment_idx(s)
+        # Arc length along each segment
+        target = np.clip(
+            (s - self._breakpoints[idx]) * self._length, 0, self.segment_lengths[idx]
+        )
+
+        # Initial guess from the lookup table, refined with Newton iterations
+        n_table = ARC_LENGTH_TABLE_SIZE
+        rows = self._s_table[idx]
+        k = np.clip(np.sum(rows <= target[:, np.newaxis], axis=1) - 1, 0, n_table - 1)
+        s_0 = rows[np.arange(len(k)), k]
+        s_1 = rows[np.arange(len(k)), k + 1]
+        frac = np.divide(
+            target - s_0, s_1 - s_0, out=np.zeros_like(target), where=s_1 > s_0
+        )
+        u = (k + frac) / n_table
+
+        diff_pnts = self.order * np.diff(self._control_pnts[idx], axis=1)
+        for _ in range(2):
+            k = np.clip(np.floor(u * n_table).astype(int), 0, n_table - 1)
+            arc = rows[np.arange(len(k)), k] + integrate_speed(
+                diff_pnts, k / n_table, u
+            )
+            speed = np.linalg.norm(evaluate_bezier(diff_pnts, u), axis=-1)
+            step = np.divide(arc - target, speed, out=np.zeros_like(u), where=speed > 0)
+            u = np.clip(u - step, 0, 1)
+        return idx, u
+
+    def evaluate(self, s):
+        """Compute the position on the path for the input(s) `s`.
+
+        > *Input arguments*
+
+        * `s` (*type:* `float` or `numpy.array`): Path's parametric input(s)
+        in the interval `[0, 1]`
+
+        > *Returns*
+
+        3D position vector as a `numpy.array`, or an `(N, 3)` `numpy.array`
+        of position vectors if `s` is an array.
+        """
+        idx, u = self.get_param(s)
+        pos = evaluate_bezier(self._control_pnts[idx], u)
+        return pos[0] if np.ndim(s) == 0 else pos
+
+    def derivative(self, s, order=1):
+        """Compute the derivative of the position on the path with respect
+        to the arc length. The first derivative is the unit tangent vector
+        and the second derivative is the curvature vector of the path.
+
+        > *Input arguments*
+
+        * `s` (*type:* `float` or `numpy.array`): Path's parametric input(s)
+        in the interval `[0, 1]`
+        * `order` (*type:* `int`, *default:* `1`): Order of the derivative,
+        options are 1 or 2
+
+        > *Returns*
+
+        3D derivative vector as a `numpy.array`, or an `(N, 3)` `numpy.array`
+        of derivative vectors if `s` is an array.
+        """
+        assert order in [1, 2], "Invalid derivative order"
+        output = self.derivatives(s)[order - 1]
+        return output[0] if np.ndim(s) == 0 else output
+
+    def derivatives(self, s):
+        """Compute the first and second derivatives of the position on the
+        path with respect to the arc length, mapping the inputs onto the
+        segments only once.
+
+        > *Input arguments*
+
+        * `s` (*type:* `float` or `numpy.array`): Path's parametric input(s)
+        in the interval `[0, 1]`
+
+        > *Returns*
+
+        `(N, 3)` `numpy.array` of unit tangent vectors and `(N, 3)`
+        `numpy.array` of curvature vectors
+        """
+        idx, u = self.get_param(s)
+        cps = self._control_pnts[idx]
+        n = self.order
+
+        d_1 = evaluate_bezier(n * np.diff(cps, axis=1), u)
+        d_2 = evaluate_bezier(n * (n - 1) * np.diff(cps, n=2, axis=1), u)
+        speed = np.linalg.norm(d_1, axis=-1, keepdims=True)
+        tangent = np.divide(d_1, speed, out=np.zeros_like(d_1), where=speed > 0)
+        # Remove the component along the tangent, which only changes the
+        # speed of the curve's parametrization
+        normal = d_2 - np.sum(d_2 * tangent, axis=-1, keepdims=True) * tangent
+        curvature = np.divide(
+            normal, speed**2, out=np.zeros_like(normal), where=speed > 0
+        )
+        return tangent, curvature
+
+    def get_adaptive_samples(self, tolerance, max_depth=16):
+        """Sample the path with as few positions as needed for the polyline
+        through them to stay within `tolerance` of the path. All segments
+        are bisected at once until the chords of their intervals deviate
+        from the path by at most `tolerance`, probed at the quarter points
+        of each interval.
+
+        > *Input arguments*
+
+        * `tolerance` (*type:* `float`): Maximum deviation in meters between
+        the path and the polyline through the samples
+        * `max_depth` (*type:* `int`, *default:* `16`): Maximum number of
+        times an interval can be bisected
+
+        > *Returns*
+
+        `numpy.array` of shape `(N, 3)` with the sampled positions.
+        """
+        assert tolerance > 0, "Tolerance must be greater than zero"
+        # Intervals [u_0, u_1] of each segment, starting from whole segments
+        seg = np.arange(self.num_segments)
+        u_0 = np.zeros(self.num_segments)
+        u_1 = np.ones(self.num_segments)
+        done = np.zeros(self.num_segments, dtype=bool)
+        for _ in range(max_depth):
+            active = np.flatnonzero(~done)
+            if len(active) == 0:
+                break
+            cps = self._control_pnts[seg[active]]
+            a = evaluate_bezier(cps, u_0[active])[:, np.newaxis]
+            b = evaluate_bezier(cps, u_1[active])[:, np.newaxis]
+            probes = evaluate_bezier(
+                cps[:, np.newaxis],
+                u_0[active, np.newaxis]
+                + (u_1 - u_0)[active, np.newaxis] * np.array([0.25, 0.5, 0.75]),
+            )
+            # Distance of the probes to the chord of their interval
+            chord = b - a
+            chord_sq = np.sum(chord**2, axis=-1)
+            t = np.divide(
+                np.sum((probes - a) * chord, axis=-1),
+                chord_sq,
+                out=np.zeros(probes.shape[:-1]),
+                where=chord_sq > 0,
+            )
+            dev = np.linalg.norm(
+                probes - (a + np.clip(t, 0, 1)[..., np.newaxis] * chord), axis=-1
+            )
+            split = active[dev.max(axis=1) > tolerance]
+            done[active] = True
+            done[split] = False
+            # Bisect the intervals exceeding the tolerance
+            u_mid = 0.5 * (u_0[split] + u_1[split])
+            seg = np.concatenate((seg, seg[split]))
+            u_0 = np.concatenate((u_0, u_mid))
+            u_1 = np.concatenate((u_1, u_1[split]))
+            u_1[split] = u_mid
+            done = np.concatenate((done, np.zeros(len(split), dtype=bool)))
+
+        order = np.lexsort((u_0, seg))
+        pnts = evaluate_bezier(self._control_pnts[seg[order]], u_0[order])
+        return np.vstack((pnts, self._control_pnts[-1, -1]))
+
+    def _init_buffer(self, n_seg, n_control_pnts):
+        """Allocate the buffer holding the control points and the arc length
+        lookup tables of `n_seg` segments."""
+        self._buffer = np.empty(
+            n_seg * (3 * n_control_pnts + ARC_LENGTH_TABLE_SIZE + 1)
+        )
+        self._set_views(n_seg, n_control_pnts)
+
+    def _set_views(self, n_seg, n_control_pnts):
+        """Create the views of the control points and the arc length lookup
+        tables into the buffer."""
+        n_pnts = n_seg * n_control_pnts * 3
+        self._control_pnts = self._buffer[:n_pnts].reshape(n_seg, n_control_pnts, 3)
+        self._s_table = self._buffer[n_pnts:].reshape(n_seg, -1)
+
+    def _init_breakpoints(self):
+        """Compute the values of the path's parametric input at the start of
+        each segment from the segment lengths."""
+        cum_lengths = np.concatenate(([0.0], np.cumsum(self.segment_lengths)))
+        self._length = cum_lengths[-1]
+        self._breakpoints = cum_lengths / self._length
@@ -1,94 +1,154 @@
-from typing import Any
+from functools import lru_cache
+from typing import Any, Optional
 from pyproj import Proj
 import numpy as np
 import shapely
-from uuv_waypoints.waypoint import Waypoint
+import shapely.ops
 from uuv_waypoints.waypoint_set import WaypointSet
 from uuv_trajectory_generator.path_generator import DubinsInterpolator
 from datetime import datetime, timedelta
+from profiling import span
 
 from settings import (
+    DEFAULT_PATH_TOLERANCE,
     UTM_ZONE,
 )
 
 
+@lru_cache(maxsize=None)
+def get_utm_proj() -> Proj:
+    # Define the UTM projection for the region. Creating a projection is
+    # expensive, so it is created once and reused
+    return Proj(proj="utm", zone=UTM_ZONE, ellps="WGS84")
+
+
 def latlon_to_cartesian(lat: float, lon: float) -> tuple[float, float]:
-    # Define the UTM projection for the region
-    utm_proj = Proj(proj="utm", zone=UTM_ZONE, ellps="WGS84")
     # Convert latitude and longitude to northing and easting coordinates in meters
-    easting, northing = utm_proj(lon, lat)
+    easting, northing = get_utm_proj()(lon, lat)
     return northing, easting
 
 
 def all_latlon_to_cartesian(
     datapoints: list[dict[str, Any]]
 ) -> tuple[float, float, float]:
-    # Convert the latitude/longitude points to cartesian (in a local UTM coordinate system)
-    coordinates = [
-        (
-            *latlon_to_cartesian(dict["latitude"], dict["longitude"]),
-            dict["elevation"],
+    # Convert the latitude/longitude points to cartesian (in a local UTM coordinate
+    # system), transforming all points at once
+    latitude = np.array([dict["latitude"] for dict in datapoints], dtype=float)
+    longitude = np.array([dict["longitude"] for dict in datapoints], dtype=float)
+    northing, easting = latlon_to_cartesian(latitude, longitude)
+    coordinates = list(
+        zip(
+            northing.tolist(),
+            easting.tolist(),
+            [dict["elevation"] for dict in datapoints],
         )
-        for dict in datapoints
-    ]
+    )
     return coordinates
 
 
 def cartesian_to_latlon(northing: float, easting: float) -> tuple[float, float]:
-    # Define the UTM projection based on the zone and hemisphere
-    utm_proj = Proj(proj="utm", zone=UTM_ZONE, ellps="WGS84")
     # Convert easting and northing back to latitude and longitude
-    lon, lat = utm_proj(easting, northing, inverse=True)
+    lon, lat = get_utm_proj()(easting, northing, inverse=True)
     return lat, lon
 
 
 def all_cartesian_to_latlon(
     datapoints: list[dict[str, Any]]
 ) -> tuple[float, float, float]:
-    # Convert the points in a local UTM coordinate system to latitude/longitude points
-    coordinates = [
-        (
-            *cartesian_to_latlon(dict["northing"], dict["easting"]),
-            dict["elevation"],
+    # Convert the points in a local UTM coordinate system to latitude/longitude
+    # points, transforming all points at once
+    northing = np.array([dict["northing"] for dict in datapoints], dtype=float)
+    easting = np.array([dict["easting"] for dict in datapoints], dtype=float)
+    latitude, longitude = cartesian_to_latlon(northing, easting)
+    coordinates = list(
+        zip(
+            latitude.tolist(),
+            longitude.tolist(),
+            [dict["elevation"] for dict in datapoints],
         )
-        for dict in datapoints
-    ]
+    )
     return coordinates
 
 
 def generate_path(
-    coordinates: dict[str, Any], turning_radius: float
+    coordinates: dict[str, Any],
+    turning_radius: float,
+    tolerance: Optional[float] = None,
+    initial_heading: Optional[float] = None,
+    simplify_tolerance: Optional[float] = None,
+    simplify_method: str = "douglas_peucker",
 ) -> shapely.LineString:
     # NOTE: It is important here that the coordinates are cartesian coordinates!!!
     waypoints = WaypointSet()
-    for i in range(len(coordinates)):
-        waypoints.add_waypoint(
-            Waypoint(
-                coordinates[i][0],
-                coordinates[i][1],
-                coordinates[i][2],
-                max_forward_speed=0.5,
-            )
-        )
+    heading_offset = np.zeros(len(coordinates))
+    if initial_heading is not None and len(coordinates):
+        # Depart from the first waypoint with the given heading, e.g. the
+        # current heading of a running UUV
+        heading_offset[0] = initial_heading
+    waypoints.add_waypoints(
+        np.reshape(np.asarray(coordinates, dtype=float), (-1, 3)),
+        max_forward_speed=0.5,
+        heading_offset=heading_offset,
+    )
+    if simplify_tolerance is not None:
+        # Remove waypoints that do not change the shape of the mission plan by
+        # more than 'simplify_tolerance' meters, e.g. GPS noise in dense tracks
+        num_waypoints = waypoints.num_waypoints
+        with span("simplify"):
+            num_removed = waypoints.simplify(simplify_tolerance, method=simplify_method)
+        print(f"Simplified waypoints: Removed {num_removed} of {num_waypoints}")
 
     # Generate a (detailed) path through a set of given waypoints
     interpolator = DubinsInterpolator(radius=turning_radius)
-    interpolator.init_waypoints(waypoints)
-    valid_input = interpolator.init_interpolator()
+    interpolator.init_waypoints(waypoints, copy=False)
+    with span("init_interpolator"):
+        valid_input = interpolator.init_interpolator()
 
     if valid_input:
-        path = [
-            (point.x, point.y, point.z)
-            for point in interpolator.get_samples(max_time=None)
-        ]
-
-        return shapely.LineString(path)
+        with span("sample_interpolator"):
+            # Only use as many points as needed to stay within 'tolerance'
+            # meters of the interpolated path
+            return shapely.LineString(
+                interpolator.get_adaptive_samples(
+                    DEFAULT_PATH_TOLERANCE if tolerance is None else tolerance
+                )
+            )
     else:
         raise ValueError(
             "The 'waypoints' list is not valid. At least 2 waypoints needs to be provided."
         )
 
 
+def get_path_pose(
+    path: shapely.LineString, point: tuple[float, float, float]
+) -> tuple[tuple[float, float, float], float]:
+    # Find the position on the path closest to the given (possibly noisy) point
+    distance = path.project(shapely.Point(point))
+    position = path.interpolate(distance)
+    # Determine the heading of the path at that position from a point slightly
+    # ahead of it (or behind it at the end of the path)
+    step = min(1.0, path.length / 2)
+    if distance + step <= path.length:
+        p1, p2 = position, path.interpolate(distance + step)
+    else:
+        p1, p2 = path.interpolate(distance - step), position
+    heading = np.arctan2(p2.y - p1.y, p2.x - p1.x)
+    return (position.x, position.y, position.z), heading
+
+
+def get_remaining_path(
+    path: shapely.LineString, point: tuple[float, float, float]
+) -> Optional[shapely.LineString]:
+    # Cut the path at the position closest to the given (possibly noisy) point
+    # and continue it from the point itself. If the point is at the end of the
+    # path nothing remains of it
+    distance = path.project(shapely.Point(point))
+    if distance >= path.length:
+        return None
+    remainder = shapely.ops.substring(path, distance, path.length)
+    return shapely.LineString([point] + list(remainder.coords)[1:])
+
+
 def add_spatial_noise(sample_points: list, std_spatial: float) -> list:
     rand_arr = np.random.normal(0, std_spatial, size=(len(sample_points), 3))
     for i in range(rand_arr.shape[0]):
@@ -121,39 +181,43 @@ def sample_path(
     counter = 0
     path_length = path.length
     if path_length > 0:
-        while True:
-            # Sample a location along the path by:
-            # - Determining a random time increment 'dt'
-            # - Moving along the path based on:
-            #   -> A sampled speed (m/s)
-            #   -> A time increment (s)
-            dt = mean_time_delta + np.abs(np.random.normal(0.0, std_time_delta))
-            dx = (mean_speed + np.random.normal(0.0, std_speed)) * dt
-            dx_next = dxs[counter] + dx
-            if dx_next > path_length:
-                break
-            else:
-                dts.append(dt)
-                dxs.append(dx_next)
-                counter += 1
-        _dts = np.cumsum(dts)
-        _dxs = [v / path_length for v in dxs]
+        with span("sample_increments"):
+            while True:
+                # Sample a location along the path by:
+                # - Determining a random time increment 'dt'
+                # - Moving along the path based on:
+                #   -> A sampled speed (m/s)
+                #   -> A time increment (s)
+                dt = mean_time_delta + np.abs(np.random.normal(0.0, std_time_delta))
+                dx = (mean_speed + np.random.normal(0.0, std_speed)) * dt
+                dx_next = dxs[counter] + dx
+                if dx_next > path_length:
+                    break
+                else:
+                    dts.append(dt)
+                    dxs.append(dx_next)
+                    counter += 1
+            _dts = np.cumsum(dts)
+            _dxs = [v / path_length for v in dxs]
 
         # Generate the timestamps based on:
         # - Random temporal increments '_dts'
-        timestamps = [
-            start_datetime + timedelta(seconds=_dts[i]) for i in range(len(_dts))
-        ]
+        with span("timestamps"):
+            timestamps = [
+                start_datetime + timedelta(seconds=_dts[i]) for i in range(len(_dts))
+            ]
 
         # Generate the corresponding spatial sample points based on:
         # - Random spatial increments '_dxs' along the linestring 'path'
-        sample_points = [
-            path.interpolate(_dxs[i], normalized=True) for i in range(len(_dxs))
-        ]
+        with span("interpolate"):
+            sample_points = [
+                path.interpolate(_dxs[i], normalized=True) for i in range(len(_dxs))
+            ]
         # Add noise to the sample points
-        noisy_sample_points = add_spatial_noise(
-            sample_points=sample_points, std_spatial=std_spatial
-        )
+        with span("add_spatial_noise"):
+            noisy_sample_points = add_spatial_noise(
+                sample_points=sample_points, std_spatial=std_spatial
+            )
 
         return noisy_sample_points, timestamps, dts
     else:
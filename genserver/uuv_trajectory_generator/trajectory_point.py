@@ -2,121 +2,163 @@ import numpy as np
 
 
 class TrajectoryPoint:
-    """Trajectory point data structure.
+    """Trajectory point data structure. The vectors are only allocated when
+    they are first accessed or set, so points that only hold a position
+    (or that are views into a `TrajectoryPointArray`) are cheap to create.
 
     > *Input arguments*
 
     * `t` (*type:* `float`, *value:* `0`): Timestamp
-    * `pos` (*type:* list of `float` or `numpy.array`, *default:* `[0, 0, 0]`):
-    3D position vector in meters
-    * `quat` (*type:* list of `float` or `numpy.array`, *default:* `[0, 0, 0, 1]`):
-    Quaternion in the form of `(x, y, z, w)`.
-    * `lin_vel` (*type:* list of `float` or `numpy.array`, *default:* `[0, 0, 0]`):
-    3D linear velocity vector in m/s
-    * `ang_vel` (*type:* list of `float` or `numpy.array`, *default:* `[0, 0, 0]`):
-    3D angular velocity vector as rad/s
-    * `lin_acc` (*type:* list of `float` or `numpy.array`, *default:* `[0, 0, 0]`):
-    3D linear acceleration vector as m/s$^2$
-    * `ang_acc` (*type:* list of `float` or `numpy.array`, *default:* `[0, 0, 0]`):
-    3D angular acceleration vector as rad/s$^2$
+    * `pos` (*type:* list of `float` or `numpy.array`, *default:* `None`):
+    3D position vector in meters, `[0, 0, 0]` if `None`
+    * `quat` (*type:* list of `float` or `numpy.array`, *default:* `None`):
+    Quaternion in the form of `(x, y, z, w)`, `[0, 0, 0, 1]` if `None`
+    * `lin_vel` (*type:* list of `float` or `numpy.array`, *default:* `None`):
+    3D linear velocity vector in m/s, `[0, 0, 0]` if `None`
+    * `ang_vel` (*type:* list of `float` or `numpy.array`, *default:* `None`):
+    3D angular velocity vector as rad/s, `[0, 0, 0]` if `None`
+    * `lin_acc` (*type:* list of `float` or `numpy.array`, *default:* `None`):
+    3D linear acceleration vector as m/s$^2$, `[0, 0, 0]` if `None`
+    * `ang_acc` (*type:* list of `float` or `numpy.array`, *default:* `None`):
+    3D angular acceleration vector as rad/s$^2$, `[0, 0, 0]` if `None`
     """
 
+    __slots__ = ("_t", "_pos", "_rot", "_vel", "_acc")
+
     def __init__(
         self,
         t=0.0,
-        pos=[0, 0, 0],
-        quat=[0, 0, 0, 1],
-        lin_vel=[0, 0, 0],
-        ang_vel=[0, 0, 0],
-        lin_acc=[0, 0, 0],
-        ang_acc=[0, 0, 0],
+        pos=None,
+        quat=None,
+        lin_vel=None,
+        ang_vel=None,
+        lin_acc=None,
+        ang_acc=None,
     ):
-        self._pos = np.array(pos)
-        # self._rot = np.array(quat)
-        self._vel = np.hstack((lin_vel, ang_vel))
-        self._acc = np.hstack((lin_acc, ang_acc))
         self._t = t
+        self._pos = None if pos is None else np.array(pos, dtype=float)
+        self._rot = None if quat is None else np.array(quat, dtype=float)
+        self._vel = self._stack_vectors(lin_vel, ang_vel)
+        self._acc = self._stack_vectors(lin_acc, ang_acc)
+
+    @staticmethod
+    def _stack_vectors(lin, ang):
+        """Stack a linear and an angular vector, or return `None` if none of
+        them is given so that the allocation is deferred."""
+        if lin is None and ang is None:
+            return None
+        return np.hstack(
+            (
+                np.zeros(3) if lin is None else lin,
+                np.zeros(3) if ang is None else ang,
+            )
+        ).astype(float)
+
+    @classmethod
+    def from_views(cls, t, pos, rotq, vel, acc):
+        """Create a trajectory point referencing the given arrays, without
+        copying them.
+
+        > *Input arguments*
+
+        * `t` (*type:* `float`): Timestamp
+        * `pos` (*type:* `numpy.array`): 3D position vector
+        * `rotq` (*type:* `numpy.array`): Quaternion as `(x, y, z, w)`
+        * `vel` (*type:* `numpy.array`): Linear and angular velocity vector
+        * `acc` (*type:* `numpy.array`): Linear and angular acceleration vector
+
+        > *Returns*
+
+        `TrajectoryPoint` object
+        """
+        pnt = cls.__new__(cls)
+        pnt._t = t
+        pnt._pos = pos
+        pnt._rot = rotq
+        pnt._vel = vel
+        pnt._acc = acc
+        return pnt
 
     def __str__(self):
         msg = "Time [s] = {}\n".format(self._t)
         msg += "Position [m] = ({}, {}, {})\n".format(
-            self._pos[0], self._pos[1], self._pos[2]
+            self.pos[0], self.pos[1], self.pos[2]
         )
         # eu = [a * 180 / np.pi for a in self.rot]
         # msg += 'Rotation [degrees] = ({}, {}, {})\n'.format(eu[0], eu[1], eu[2])
         msg += "Lin. velocity [m/s] = ({}, {}, {})\n".format(
-            self._vel[0], self._vel[1], self._vel[2]
+            self.vel[0], self.vel[1], self.vel[2]
         )
         msg += "Ang. velocity [m/s] = ({}, {}, {})\n".format(
-            self._vel[3], self._vel[4], self._vel[5]
+            self.vel[3], self.vel[4], self.vel[5]
         )
         return msg
 
     def __eq__(self, pnt):
         return (
             self._t == pnt._t
-            and np.array_equal(self._pos, pnt._pos)
-            and np.array_equal(self._vel, pnt._vel)
-            and np.array_equal(self._acc, pnt._acc)
+            and np.array_equal(self.pos, pnt.pos)
+            and np.array_equal(self.vel, pnt.vel)
+            and np.array_equal(self.acc, pnt.acc)
         )
         # np.array_equal(self._rot, pnt._rot) and \
 
     @property
     def p(self):
         """`numpy.array`: Position vector"""
-        return self._pos
+        return self.pos
 
     @property
     def q(self):
         """`numpy.array`: Quaternion vector as `(x, y, z, w)`"""
-        return self._rot
+        return self.rotq
 
     @property
     def v(self):
         """`numpy.array`: Linear velocity vector"""
-        return self._vel[0:3]
+        return self.vel[0:3]
 
     @property
     def w(self):
         """`numpy.array`: Angular velocity vector"""
-        return self._vel[3::]
+        return self.vel[3::]
 
     @property
     def a(self):
         """`numpy.array`: Linear acceleration vector"""
-        return self._acc[0:3]
+        return self.acc[0:3]
 
     @property
     def alpha(self):
         """`numpy.array`: Angular acceleartion vector"""
-        return self._acc[3::]
+        return self.acc[3::]
 
     @property
     def x(self):
         """`float`: X coordinate of position vector"""
-        return self._pos[0]
+        return self.pos[0]
 
     @x.setter
     def x(self, x):
-        self._pos[0] = x
+        self.pos[0] = x
 
     @property
     def y(self):
         """`float`: Y coordinate of position vector"""
-        return self._pos[1]
+        return self.pos[1]
 
     @y.setter
     def y(self, y):
-        self._pos[1] = y
+        self.pos[1] = y
 
     @property
     def z(self):
         """`float`: Z coordinate of position vector"""
-        return self._pos[2]
+        return self.pos[2]
 
     @z.setter
     def z(self, z):
-        self._pos[2] = z
+        self.pos[2] = z
 
     @property
     def t(self):
@@ -130,6 +172,8 @@ class TrajectoryPoint:
     @property
     def pos(self):
         """`numpy.array`: Position vector"""
+        if self._pos is None:
+            self._pos = np.zeros(3)
         return self._pos
 
     @pos.setter
@@ -154,6 +198,8 @@ class TrajectoryPoint:
     @property
     def rotq(self):
         """`numpy.array`: Quaternion vector as `(x, y, z, w)`"""
+        if self._rot is None:
+            self._rot = np.array([0, 0, 0, 1.0])
         return self._rot
 
     @rotq.setter
@@ -162,7 +208,9 @@ class TrajectoryPoint:
 
     @property
     def vel(self):
-        """`numpy.array`: Linear velocity vector"""
+        """`numpy.array`: Linear and angular velocity vector"""
+        if self._vel is None:
+            self._vel = np.zeros(6)
         return self._vel
 
     @vel.setter
@@ -171,7 +219,9 @@ class TrajectoryPoint:
 
     @property
     def acc(self):
-        """`numpy.array`: Linear acceleration vector"""
+        """`numpy.array`: Linear and angular acceleration vector"""
+        if self._acc is None:
+            self._acc = np.zeros(6)
         return self._acc
 
     @acc.setter
@@ -203,9 +253,179 @@ class TrajectoryPoint:
         """
         data = dict(
             time=self._t,
-            pos=self._pos,
+            pos=self.pos,
             # rot=self._rot,
-            vel=self._vel,
-            acc=self._acc,
+            vel=self.vel,
+            acc=self.acc,
         )
         return data
+
+
+class TrajectoryPointArray:
+    """Sequence of trajectory points stored in a single structured
+    `numpy.array`, with one record per point holding its timestamp and its
+    position, quaternion, velocity and acceleration vectors. The fields of
+    all points can be read and written at once as columns, and indexing a
+    single point returns a `TrajectoryPoint` whose vectors are views into
+    the array.
+
+    > *Input arguments*
+
+    * `size` (*type:* `int`, *default:* `0`): Number of trajectory points,
+    initialized at the origin with an identity quaternion
+    * `data` (*type:* `numpy.array`, *default:* `None`): Structured array of
+    type `TrajectoryPointArray.DTYPE` to be wrapped without copying it. If
+    provided, `size` is ignored.
+
+    > *Example*
+
+    ```python
+    pnts = TrajectoryPointArray(100)
+    pnts.t = numpy.linspace(0, 10, 100)
+    pnts.pos[:, 2] = -5.0
+    pnt = pnts[10]
+    ```
+    """
+
+    DTYPE = np.dtype(
+        [
+            ("t", float),
+            ("pos", float, (3,)),
+            ("rotq", float, (4,)),
+            ("vel", float, (6,)),
+            ("acc", float, (6,)),
+        ]
+    )
+
+    __slots__ = ("_data",)
+
+    def __init__(self, size=0, data=None):
+        if data is None:
+            data = np.zeros(size, dtype=self.DTYPE)
+            data["rotq"][:, 3] = 1
+        assert data.dtype == self.DTYPE, "Invalid data type"
+        self._data = data
+
+    @classmethod
+    def from_points(cls, pnts):
+        """Create a trajectory point array copying a sequence of trajectory
+        points.
+
+        > *Input arguments*
+
+        * `pnts` (*type:* list of `TrajectoryPoint`): Trajectory points
+
+        > *Returns*
+
+        `TrajectoryPointArray` object
+        """
+        output = cls(len(pnts))
+        for i, pnt in enumerate(pnts):
+            output._data[i] = (pnt.t, pnt.pos, pnt.rotq, pnt.vel, pnt.acc)
+        return output
+
+    def __len__(self):
+        return len(self._data)
+
+    def __iter__(self):
+        for i in range(len(self._data)):
+            yield self[i]
+
+    def __getitem__(self, idx):
+        if np.ndim(idx) == 0 and not isinstance(idx, slice):
+            # The timestamp is copied, while the vectors are views into the
+            # array, so changing them changes the array
+            return TrajectoryPoint.from_views(
+                float(self._data["t"][idx]),
+                self._data["pos"][idx],
+                self._data["rotq"][idx],
+                self._data["vel"][idx],
+                self._data["acc"][idx],
+            )
+        return TrajectoryPointArray(data=self._data[idx])
+
+    @property
+    def data(self):
+        """`numpy.array`: Structured array holding the trajectory points"""
+        return self._data
+
+    @property
+    def t(self):
+        """`numpy.array`: Time stamps"""
+        return self._data["t"]
+
+    @t.setter
+    def t(self, new_t):
+        self._data["t"] = new_t
+
+    @property
+    def pos(self):
+        """`numpy.array`: `(N, 3)` array of position vectors"""
+        return self._data["pos"]
+
+    @pos.setter
+    def pos(self, new_pos):
+        self._data["pos"] = new_pos
+
+    @property
+    def rotq(self):
+        """`numpy.array`: `(N, 4)` array of quaternions as `(x, y, z, w)`"""
+        return self._data["rotq"]
+
+    @rotq.setter
+    def rotq(self, quat):
+        self._data["rotq"] = quat
+
+    @property
+    def vel(self):
+        """`numpy.array`: `(N, 6)` array of linear and angular velocity
+        vectors"""
+        return self._data["vel"]
+
+    @vel.setter
+    def vel(self, new_vel):
+        self._data["vel"] = new_vel
+
+    @property
+    def acc(self):
+        """`numpy.array`: `(N, 6)` array of linear and angular acceleration
+        vectors"""
+        return self._data["acc"]
+
+    @acc.setter
+    def acc(self, new_acc):
+        self._data["acc"] = new_acc
+
+    @property
+    def x(self):
+        """`numpy.array`: X coordinates of the position vectors"""
+        return self._data["pos"][:, 0]
+
+    @property
+    def y(self):
+        """`numpy.array`: Y coordinates of the position vectors"""
+        return self._data["pos"][:, 1]
+
+    @property
+    def z(self):
+        """`numpy.array`: Z coordinates of the position vectors"""
+        return self._data["pos"][:, 2]
+
+    def to_points(self):
+        """Convert the array into a list of trajectory points that do not
+        share memory with the array.
+
+        > *Returns*
+
+        List of `TrajectoryPoint`
+        """
+        return [
+            TrajectoryPoint.from_views(
+                float(rec["t"]),
+                rec["pos"].copy(),
+                rec["rotq"].copy(),
+                rec["vel"].copy(),
+                rec["acc"].copy(),
+            )
+            for rec in self._data
+        ]
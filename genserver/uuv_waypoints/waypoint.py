@@ -21,8 +21,34 @@ class Waypoint:
     * `inertial_frame_id` (*type:* `str`, *default:* `'world'`): Name of the inertial reference frame, options are `world` or `world_ned`
     * `radius_acceptance` (*type:* `float`, *default:* `0`): Radius around the waypoint where the vehicle can be considered to have reached the waypoint
 
+    The attributes of a waypoint are stored in a single `numpy.array`, laid
+    out as in `FIELDS`. A `uuv_waypoints.WaypointSet` stores the waypoints as
+    rows of one array with the same layout, and the waypoints it returns are
+    lightweight views into these rows.
     """
 
+    # Layout of the attributes of a waypoint, flags are stored as 0 or 1
+    FIELDS = [
+        "x",
+        "y",
+        "z",
+        "max_forward_speed",
+        "heading_offset",
+        "radius_acceptance",
+        "use_fixed_heading",
+        "violates_constraint",
+    ]
+    (
+        X,
+        Y,
+        Z,
+        MAX_FORWARD_SPEED,
+        HEADING_OFFSET,
+        RADIUS_ACCEPTANCE,
+        USE_FIXED_HEADING,
+        VIOLATES_CONSTRAINT,
+    ) = range(len(FIELDS))
+
     def __init__(
         self,
         x=0,
@@ -38,41 +64,72 @@ class Waypoint:
             "Invalid inertial reference frame, options"
             " are world or world_ned, provided={}".format(inertial_frame_id)
         )
-        self._x = x
-        self._y = y
-        self._z = z
         # self._inertial_frame_id = inertial_frame_id
-        self._max_forward_speed = max_forward_speed
-        self._heading_offset = heading_offset
-        # self._violates_constraint = False
-        # self._use_fixed_heading = use_fixed_heading
-        # self._radius_acceptance = radius_acceptance
+        self._data = np.array(
+            [
+                x,
+                y,
+                z,
+                max_forward_speed,
+                np.nan if heading_offset is None else heading_offset,
+                radius_acceptance,
+                use_fixed_heading,
+                False,
+            ],
+            dtype=float,
+        )
+
+    @classmethod
+    def from_view(cls, data):
+        """Create a waypoint referencing an array of attributes laid out as
+        in `FIELDS`, without copying it. Changes to the waypoint change the
+        array.
+
+        > *Input arguments*
+
+        * `data` (*type:* `numpy.array`): Array of waypoint attributes
+
+        > *Returns*
+
+        `uuv_waypoints.Waypoint` object
+        """
+        wp = cls.__new__(cls)
+        wp._data = data
+        return wp
 
     def __eq__(self, other):
-        return self._x == other.x and self._y == other.y and self._z == other.z
+        return self.x == other.x and self.y == other.y and self.z == other.z
 
     def __ne__(self, other):
-        return self._x != other.x or self._y != other.y or self._z != other.z
+        return self.x != other.x or self.y != other.y or self.z != other.z
+
+    @property
+    def data(self):
+        """`numpy.ndarray`: Attributes of the waypoint laid out as in `FIELDS`"""
+        return self._data
 
     @property
     def x(self):
         """`float`: X coordinate of the waypoint in meters"""
-        return self._x
+        return self._data[self.X]
 
     @property
     def y(self):
         """`float`: Y coordinate of the waypoint in meters"""
-        return self._y
+        return self._data[self.Y]
 
     @property
     def z(self):
         """`float`: Z coordinate of the waypoint in meters"""
-        return self._z
+        return self._data[self.Z]
 
     @property
     def pos(self):
-        """`numpy.ndarray`: Position 3D vector"""
-        return np.array([self._x, self._y, self._z])
+        """`numpy.ndarray`: Position 3D vector, as a read-only view into the
+        waypoint's attributes"""
+        pos = self._data[0:3]
+        pos.flags.writeable = False
+        return pos
 
     @pos.setter
     def pos(self, new_pos):
@@ -82,32 +139,35 @@ class Waypoint:
             assert new_pos.shape == (3,), "New position must have three elements"
         else:
             raise Exception("Invalid position vector size")
-        self._x = new_pos[0]
-        self._y = new_pos[1]
-        self._z = new_pos[2]
+        self._data[0:3] = new_pos
 
     @property
     def violates_constraint(self):
         """`bool`: Flag on constraint violation for this waypoint"""
-        return self._violates_constraint
+        return bool(self._data[self.VIOLATES_CONSTRAINT])
 
     @violates_constraint.setter
     def violates_constraint(self, flag):
-        self._violates_constraint = flag
+        self._data[self.VIOLATES_CONSTRAINT] = flag
 
     @property
     def max_forward_speed(self):
         """`float`: Maximum reference forward speed"""
-        return self._max_forward_speed
+        return self._data[self.MAX_FORWARD_SPEED]
 
     @max_forward_speed.setter
     def max_forward_speed(self, vel):
-        self._max_forward_speed = vel
+        self._data[self.MAX_FORWARD_SPEED] = vel
 
     @property
     def heading_offset(self):
-        """`float`: Heading offset in radians"""
-        return self._heading_offset
+        """`float`: Heading offset in radians, `None` if not set"""
+        heading_offset = self._data[self.HEADING_OFFSET]
+        return None if np.isnan(heading_offset) else heading_offset
+
+    @heading_offset.setter
+    def heading_offset(self, angle):
+        self._data[self.HEADING_OFFSET] = np.nan if angle is None else angle
 
     @property
     def heading(self):
@@ -121,17 +181,17 @@ class Waypoint:
     @property
     def radius_of_acceptance(self):
         """`float`: Radius of acceptance in meters"""
-        return self._radius_acceptance
+        return self._data[self.RADIUS_ACCEPTANCE]
 
     @radius_of_acceptance.setter
     def radius_of_acceptance(self, radius):
         assert radius >= 0, "Radius must be greater or equal to zero"
-        self._radius_acceptance = radius
+        self._data[self.RADIUS_ACCEPTANCE] = radius
 
     @property
     def using_heading_offset(self):
         """`float`: Flag to use the heading offset"""
-        return self._use_fixed_heading
+        return bool(self._data[self.USE_FIXED_HEADING])
 
     def dist(self, pos):
         """Compute distance of waypoint to a point
@@ -145,7 +205,7 @@ class Waypoint:
         Distance to point in meters
         """
         return np.sqrt(
-            (self._x - pos[0]) ** 2 + (self._y - pos[1]) ** 2 + (self._z - pos[2]) ** 2
+            (self.x - pos[0]) ** 2 + (self.y - pos[1]) ** 2 + (self.z - pos[2]) ** 2
         )
 
     def calculate_heading(self, target):
@@ -1,11 +1,22 @@
+import heapq
+import math
 import numpy as np
 import os
 import yaml
 from uuv_waypoints.waypoint import Waypoint
 
+# Use the C-accelerated YAML loader and dumper if PyYAML was built with them
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+YAML_DUMPER = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
 
 class WaypointSet:
-    """Set of waypoints.
+    """Set of waypoints. The waypoints are stored as the rows of a single
+    `numpy.array`, with one column per attribute as laid out in
+    `uuv_waypoints.Waypoint.FIELDS`. The columns, e.g. the positions of all
+    waypoints, are available as views without copying them, and the
+    waypoints returned by the set are views into its rows. Views are only
+    valid until waypoints are added to or removed from the set.
 
     > *Input arguments*
 
@@ -16,7 +27,10 @@ class WaypointSet:
 
     def __init__(self, scale=0.1, inertial_frame_id="world", max_surge_speed=None):
         assert inertial_frame_id in ["world", "world_ned"]
-        self._waypoints = list()
+        # Rows of waypoint attributes, with extra rows allocated ahead of
+        # time so that appending waypoints is amortized
+        self._data = np.zeros((0, len(Waypoint.FIELDS)))
+        self._num_waypoints = 0
         self._violates_constraint = False
         self._scale = scale
         self._inertial_frame_id = inertial_frame_id
@@ -40,27 +54,47 @@ class WaypointSet:
     @property
     def num_waypoints(self):
         """`int`: Number of waypoints"""
-        return len(self._waypoints)
+        return self._num_waypoints
+
+    @property
+    def data(self):
+        """`numpy.array`: `(N, len(Waypoint.FIELDS))` array with the attributes of all waypoints"""
+        return self._data[: self._num_waypoints]
 
     @property
     def x(self):
-        """`list`: List of the X-coordinates of all waypoints"""
-        return [wp.x for wp in self._waypoints]
+        """`numpy.array`: X-coordinates of all waypoints"""
+        return self._data[: self._num_waypoints, Waypoint.X]
 
     @property
     def y(self):
-        """`list`: List of the Y-coordinates of all waypoints"""
-        return [wp.y for wp in self._waypoints]
+        """`numpy.array`: Y-coordinates of all waypoints"""
+        return self._data[: self._num_waypoints, Waypoint.Y]
 
     @property
     def z(self):
-        """`list`: List of the Z-coordinates of all waypoints"""
-        return [wp.z for wp in self._waypoints]
+        """`numpy.array`: Z-coordinates of all waypoints"""
+        return self._data[: self._num_waypoints, Waypoint.Z]
+
+    @property
+    def pos(self):
+        """`numpy.array`: `(N, 3)` array of the positions of all waypoints"""
+        return self._data[: self._num_waypoints, 0:3]
+
+    @property
+    def max_forward_speed(self):
+        """`numpy.array`: Max. forward speeds of all waypoints in m/s"""
+        return self._data[: self._num_waypoints, Waypoint.MAX_FORWARD_SPEED]
+
+    @property
+    def heading_offset(self):
+        """`numpy.array`: Heading offsets of all waypoints in radians, `nan` if not set"""
+        return self._data[: self._num_waypoints, Waypoint.HEADING_OFFSET]
 
     @property
     def is_empty(self):
         """`bool`: True if the list of waypoints is empty"""
-        return len(self._waypoints) == 0
+        return self._num_waypoints == 0
 
     @property
     def inertial_frame_id(self):
@@ -77,7 +111,8 @@ class WaypointSet:
 
     def clear_waypoints(self):
         """Clear the list of waypoints"""
-        self._waypoints = list()
+        self._data = np.zeros((0, len(Waypoint.FIELDS)))
+        self._num_waypoints = 0
 
     def set_constraint_status(self, index, flag):
         """Set the flag violates_constraint to a waypoint
@@ -91,9 +126,9 @@ class WaypointSet:
 
         `True` if successful, and `False` if the waypoint `index` is outsite of the list's range.
         """
-        if index < 0 or index >= len(self._waypoints):
+        if index < 0 or index >= self._num_waypoints:
             return False
-        self._waypoints[index].violates_constraint = flag
+        self._data[index, Waypoint.VIOLATES_CONSTRAINT] = flag
         return True
 
     def get_waypoint(self, index):
@@ -107,9 +142,9 @@ class WaypointSet:
 
         Return a waypoint as `uuv_waypoints.Waypoint` or `None` if `index` is outside of range.
         """
-        if index < 0 or index >= len(self._waypoints):
+        if index < 0 or index >= self._num_waypoints:
             return None
-        return self._waypoints[index]
+        return Waypoint.from_view(self._data[index])
 
     def add_waypoint(self, waypoint, add_to_beginning=False):
         """Add a waypoint to the set
@@ -121,22 +156,63 @@ class WaypointSet:
 
         > *Returns*
 
-        `True` if waypoint was added to the set. `False` if a repeated waypoint is already found in the set.
+        `True` if waypoint was added to the set. `False` if the waypoint repeats the position of its neighbour in the set.
         """
-        if len(self._waypoints):
-            if self._waypoints[-1] != waypoint:
-                if not add_to_beginning:
-                    self._waypoints.append(waypoint)
-                else:
-                    self._waypoints = [waypoint] + self._waypoints
-            else:
-                print("Cannot add repeated waypoint")
+        # Repeated positions are skipped as in `add_waypoints`
+        if self._num_waypoints:
+            neighbour = 0 if add_to_beginning else self._num_waypoints - 1
+            if np.all(waypoint.data[0:3] == self._data[neighbour, 0:3]):
                 return False
+        if not add_to_beginning:
+            self._reserve(self._num_waypoints + 1)
+            self._data[self._num_waypoints] = waypoint.data
         else:
-            if not add_to_beginning:
-                self._waypoints.append(waypoint)
-            else:
-                self._waypoints = [waypoint] + self._waypoints
+            self._data = np.vstack((waypoint.data, self.data))
+        self._num_waypoints += 1
+        return True
+
+    def add_waypoints(
+        self, pnts, max_forward_speed, heading_offset=0.0, use_fixed_heading=False
+    ):
+        """Add waypoints to the set from an array of positions at once.
+        Consecutive repeated positions, also with respect to the last
+        waypoint in the set, are skipped.
+
+        > *Input arguments*
+
+        * `pnts` (*type:* `numpy.array`): `(N, 3)` array of positions
+        * `max_forward_speed` (*type:* `float` or `numpy.array`): Max. forward speed set to each waypoint in m/s
+        * `heading_offset` (*type:* `float` or `numpy.array`, *default:* `0`): Heading offset set to the reference heading of the vehicle in radians
+        * `use_fixed_heading` (*type:* `bool` or `numpy.array`, *default:* `False`): Use the heading offset as a fixed heading reference
+
+        > *Returns*
+
+        `True` if the waypoints were added to the set. `False` if the array of positions is invalid.
+        """
+        pnts = np.asarray(pnts, dtype=float)
+        if pnts.ndim != 2 or pnts.shape[1] != 3:
+            print("Invalid array of positions, shape={}".format(pnts.shape))
+            return False
+        keep = np.ones(len(pnts), dtype=bool)
+        keep[1:] = np.any(pnts[1:] != pnts[:-1], axis=1)
+        if self._num_waypoints and len(pnts):
+            keep[0] = np.any(pnts[0] != self._data[self._num_waypoints - 1, 0:3])
+
+        num_pnts = int(np.sum(keep))
+        self._reserve(self._num_waypoints + num_pnts)
+        rows = self._data[self._num_waypoints : self._num_waypoints + num_pnts]
+        rows[:] = 0
+        rows[:, 0:3] = pnts[keep]
+        rows[:, Waypoint.MAX_FORWARD_SPEED] = np.broadcast_to(
+            max_forward_speed, len(pnts)
+        )[keep]
+        rows[:, Waypoint.HEADING_OFFSET] = np.broadcast_to(heading_offset, len(pnts))[
+            keep
+        ]
+        rows[:, Waypoint.USE_FIXED_HEADING] = np.broadcast_to(
+            use_fixed_heading, len(pnts)
+        )[keep]
+        self._num_waypoints += num_pnts
         return True
 
     def get_start_waypoint(self):
@@ -146,8 +222,8 @@ class WaypointSet:
 
         A `uuv_waypoints.Waypoint` object or None, if the list of waypoints is empty.
         """
-        if len(self._waypoints):
-            return self._waypoints[0]
+        if self._num_waypoints:
+            return self.get_waypoint(0)
         else:
             return None
 
@@ -158,8 +234,8 @@ class WaypointSet:
 
         A `uuv_waypoints.Waypoint` object or None, if the list of waypoints is empty.
         """
-        if len(self._waypoints):
-            return self._waypoints[-1]
+        if self._num_waypoints:
+            return self.get_waypoint(self._num_waypoints - 1)
         return None
 
     def remove_waypoint(self, waypoint):
@@ -169,15 +245,170 @@ class WaypointSet:
 
         * `waypoint` (*type:* `uuv_waypoints.Waypoint`): Waypoint object
         """
-        new_waypoints = list()
-        for point in self._waypoints:
-            if point == waypoint:
+        keep = np.any(self.pos != waypoint.pos, axis=1)
+        self._data = self.data[keep]
+        self._num_waypoints = len(self._data)
+
+    def simplify(self, tolerance, method="douglas_peucker"):
+        """Simplify the set of waypoints, e.g. a dense and noisy GPS track, by
+        removing waypoints that do not change the shape of the polyline
+        through them by more than `tolerance`. Near-duplicate waypoints,
+        closer than `tolerance` to the previous kept waypoint, are removed
+        first. The first and last waypoints are always kept.
+
+        > *Input arguments*
+
+        * `tolerance` (*type:* `float`): Tolerance in meters
+        * `method` (*type:* `str`, *default:* `'douglas_peucker'`): Simplification
+        algorithm, options are `douglas_peucker`, which keeps the polyline within
+        `tolerance` meters of the removed waypoints, and `visvalingam`, which
+        removes waypoints spanning a triangle with their neighbours of an area
+        smaller than `tolerance ** 2` square meters
+
+        > *Returns*
+
+        Number of removed waypoints. `None` if the input arguments are invalid.
+        """
+        if tolerance < 0:
+            print("Invalid tolerance, value={}".format(tolerance))
+            return None
+
+        if method not in ["douglas_peucker", "visvalingam"]:
+            print("Invalid simplification method, value={}".format(method))
+            return None
+
+        num_waypoints = self._num_waypoints
+        if num_waypoints < 3:
+            return 0
+
+        idx = self._get_radial_distance_idx(self.pos, tolerance)
+        if method == "douglas_peucker":
+            idx = idx[self._get_douglas_peucker_mask(self.pos[idx], tolerance)]
+        else:
+            idx = idx[self._get_visvalingam_mask(self.pos[idx], tolerance**2)]
+
+        self._data = self.data[idx]
+        self._num_waypoints = len(self._data)
+        return num_waypoints - self._num_waypoints
+
+    @staticmethod
+    def _get_radial_distance_idx(pnts, tolerance):
+        """Return the indices of the points that are at least `tolerance`
+        away from the previous kept point. The last point replaces the
+        previous kept point if they are too close.
+        """
+        idx = [0]
+        last = pnts[0].tolist()
+        for i, pnt in enumerate(pnts[1:].tolist(), start=1):
+            if (
+                (pnt[0] - last[0]) ** 2
+                + (pnt[1] - last[1]) ** 2
+                + (pnt[2] - last[2]) ** 2
+            ) >= tolerance**2:
+                idx.append(i)
+                last = pnt
+        if idx[-1] != len(pnts) - 1:
+            if len(idx) > 1:
+                idx[-1] = len(pnts) - 1
+            else:
+                idx.append(len(pnts) - 1)
+        return np.array(idx)
+
+    @staticmethod
+    def _get_douglas_peucker_mask(pnts, tolerance):
+        """Return a mask of the points kept by the Douglas-Peucker algorithm,
+        where the distance of every removed point to the segment replacing it
+        is at most `tolerance`.
+        """
+        keep = np.zeros(len(pnts), dtype=bool)
+        keep[[0, -1]] = True
+        stack = [(0, len(pnts) - 1)]
+        while stack:
+            first, last = stack.pop()
+            if last - first < 2:
+                continue
+            # Distances of the inner points to the segment from the first to
+            # the last point
+            segment = pnts[last] - pnts[first]
+            diff = pnts[first + 1 : last] - pnts[first]
+            length_sq = np.dot(segment, segment)
+            if length_sq > 0:
+                u = np.clip(diff @ segment / length_sq, 0, 1)
+                diff = diff - u[:, np.newaxis] * segment
+            dist_sq = np.einsum("ij,ij->i", diff, diff)
+            i = int(np.argmax(dist_sq))
+            if dist_sq[i] > tolerance**2:
+                i += first + 1
+                keep[i] = True
+                stack.append((first, i))
+                stack.append((i, last))
+        return keep
+
+    @staticmethod
+    def _get_visvalingam_mask(pnts, min_area):
+        """Return a mask of the points kept by the Visvalingam-Whyatt
+        algorithm, which repeatedly removes the point with the smallest
+        effective area, i.e. the area of the triangle it spans with its
+        neighbours, until all effective areas are at least `min_area`.
+        """
+
+        coords = pnts.tolist()
+
+        def get_area(i, j, k):
+            (xi, yi, zi), (xj, yj, zj), (xk, yk, zk) = coords[i], coords[j], coords[k]
+            ax, ay, az = xj - xi, yj - yi, zj - zi
+            bx, by, bz = xk - xj, yk - yj, zk - zj
+            return 0.5 * math.sqrt(
+                (ay * bz - az * by) ** 2
+                + (az * bx - ax * bz) ** 2
+                + (ax * by - ay * bx) ** 2
+            )
+
+        num_pnts = len(pnts)
+        prev_idx = list(range(-1, num_pnts - 1))
+        next_idx = list(range(1, num_pnts + 1))
+        cross = np.cross(pnts[1:-1] - pnts[:-2], pnts[2:] - pnts[1:-1])
+        areas = [np.inf] + (0.5 * np.linalg.norm(cross, axis=1)).tolist() + [np.inf]
+        heap = [(area, i) for i, area in enumerate(areas[1:-1], start=1)]
+        heapq.heapify(heap)
+
+        keep = np.ones(num_pnts, dtype=bool)
+        while heap:
+            area, i = heapq.heappop(heap)
+            # Skip removed points and areas that have been updated since
+            if not keep[i] or area != areas[i]:
                 continue
-            new_waypoints.append(point)
-        self._waypoints = new_waypoints
+            if area >= min_area:
+                break
+            keep[i] = False
+            j, k = prev_idx[i], next_idx[i]
+            next_idx[j], prev_idx[k] = k, j
+            # Update the effective areas of the neighbours, which are never
+            # smaller than the area of the removed point
+            for n in [j, k]:
+                if 0 < n < num_pnts - 1:
+                    areas[n] = max(area, get_area(prev_idx[n], n, next_idx[n]))
+                    heapq.heappush(heap, (areas[n], n))
+        return keep
+
+    def _reserve(self, num_waypoints):
+        """Make sure that the array of waypoint attributes has rows for
+        `num_waypoints` waypoints, growing it geometrically if needed.
+
+        > *Input arguments*
+
+        * `num_waypoints` (*type:* `int`): Number of waypoints
+        """
+        if num_waypoints <= len(self._data):
+            return
+        data = np.zeros((max(num_waypoints, 2 * len(self._data)), len(Waypoint.FIELDS)))
+        data[: self._num_waypoints] = self.data
+        self._data = data
 
     def read_from_file(self, filename):
-        """Read waypoint set from a YAML file.
+        """Read waypoint set from a YAML file. The file is parsed with the
+        C-accelerated YAML loader if available, and the waypoints are added to
+        the set as arrays.
 
         > *Input arguments*
 
@@ -193,38 +424,28 @@ class WaypointSet:
         try:
             self.clear_waypoints()
             with open(filename, "r") as wp_file:
-                wps = yaml.load(wp_file)
-                if isinstance(wps, list):
-                    for wp_data in wps:
-                        wp = Waypoint(
-                            x=wp_data["point"][0],
-                            y=wp_data["point"][1],
-                            z=wp_data["point"][2],
-                            max_forward_speed=wp_data["max_forward_speed"],
-                            heading_offset=wp_data["heading"],
-                            use_fixed_heading=wp_data["use_fixed_heading"],
-                            inertial_frame_id="world",
-                        )
-                        self.add_waypoint(wp)
-                    self._inertial_frame_id = "world"
-                else:
-                    assert (
-                        "inertial_frame_id" in wps
-                    ), "Waypoint input has no inertial_frame_id key"
-                    assert "waypoints" in wps
-                    assert wps["inertial_frame_id"] in ["world", "world_ned"]
-                    self._inertial_frame_id = wps["inertial_frame_id"]
-                    for wp_data in wps["waypoints"]:
-                        wp = Waypoint(
-                            x=wp_data["point"][0],
-                            y=wp_data["point"][1],
-                            z=wp_data["point"][2],
-                            max_forward_speed=wp_data["max_forward_speed"],
-                            heading_offset=wp_data["heading"],
-                            use_fixed_heading=wp_data["use_fixed_heading"],
-                            inertial_frame_id=wps["inertial_frame_id"],
-                        )
-                        self.add_waypoint(wp)
+                wps = yaml.load(wp_file, Loader=YAML_LOADER)
+            if isinstance(wps, list):
+                self._inertial_frame_id = "world"
+            else:
+                assert (
+                    "inertial_frame_id" in wps
+                ), "Waypoint input has no inertial_frame_id key"
+                assert "waypoints" in wps
+                assert wps["inertial_frame_id"] in ["world", "world_ned"]
+                self._inertial_frame_id = wps["inertial_frame_id"]
+                wps = wps["waypoints"]
+            self.add_waypoints(
+                np.array([wp_data["point"] for wp_data in wps], dtype=float).reshape(
+                    -1, 3
+                ),
+                max_forward_speed=[wp_data["max_forward_speed"] for wp_data in wps],
+                heading_offset=[
+                    np.nan if wp_data["heading"] is None else wp_data["heading"]
+                    for wp_data in wps
+                ],
+                use_fixed_heading=[wp_data["use_fixed_heading"] for wp_data in wps],
+            )
         except Exception as e:
             print("Error while loading the file, message={}".format(e))
             return False
@@ -243,19 +464,26 @@ class WaypointSet:
         `True` is waypoints could be exported to file. `False`, otherwise.
         """
         try:
-            output = dict(inertial_frame_id=self._inertial_frame_id, waypoints=list())
-            for wp in self._waypoints:
-                wp_elem = dict(
-                    point=[float(wp.x), float(wp.y), float(wp.z)],
-                    max_forward_speed=float(wp._max_forward_speed),
-                    heading=float(
-                        wp._heading_offset if wp._heading_offset is not None else 0.0
-                    ),
-                    use_fixed_heading=bool(wp._use_fixed_heading),
-                )
-                output["waypoints"].append(wp_elem)
+            data = self.data
+            output = dict(
+                inertial_frame_id=self._inertial_frame_id,
+                waypoints=[
+                    dict(
+                        point=point,
+                        max_forward_speed=max_forward_speed,
+                        heading=heading,
+                        use_fixed_heading=use_fixed_heading,
+                    )
+                    for point, max_forward_speed, heading, use_fixed_heading in zip(
+                        data[:, 0:3].tolist(),
+                        data[:, Waypoint.MAX_FORWARD_SPEED].tolist(),
+                        np.nan_to_num(data[:, Waypoint.HEADING_OFFSET]).tolist(),
+                        data[:, Waypoint.USE_FIXED_HEADING].astype(bool).tolist(),
+                    )
+                ],
+            )
             with open(os.path.join(path, filename), "w") as wp_file:
-                yaml.dump(output, wp_file, default_flow_style=False)
+                yaml.dump(output, wp_file, Dumper=YAML_DUMPER, default_flow_style=False)
             return True
         except Exception as e:
             print("Error occured while exporting waypoint file, message={}".format(e))
@@ -288,8 +516,8 @@ class WaypointSet:
         * `index` (*type:* `int`): Index of the waypoint
         * `radius` (*type:* `float`): Radius of the sphere representing the volume of acceptance
         """
-        if index >= 0 and index < len(self._waypoints):
-            self._waypoints[index].radius_of_acceptance = radius
+        if index >= 0 and index < self._num_waypoints:
+            self.get_waypoint(index).radius_of_acceptance = radius
 
     def get_radius_of_acceptance(self, index):
         """Return the radius of acceptance for a waypoint
@@ -304,8 +532,8 @@ class WaypointSet:
         given by `index` as a `float`. `None` if waypoint
         set is empty.
         """
-        if index >= 0 and index < len(self._waypoints):
-            return self._waypoints[index].radius_of_acceptance
+        if index >= 0 and index < self._num_waypoints:
+            return self.get_waypoint(index).radius_of_acceptance
         else:
             return None
 
@@ -352,15 +580,16 @@ class WaypointSet:
             # Clear current list
             self.clear_waypoints()
 
-        step_theta = 2 * np.pi / num_points
-        for i in range(num_points):
-            angle = i * step_theta + theta_offset
-            x = np.cos(angle) * radius + center.x
-            y = np.sin(angle) * radius + center.y
-            z = center.z
-            wp = Waypoint(x, y, z, max_forward_speed, heading_offset)
-            self.add_waypoint(wp)
-        return True
+        angle = theta_offset + 2 * np.pi / num_points * np.arange(num_points)
+        pnts = np.stack(
+            (
+                radius * np.cos(angle) + center.x,
+                radius * np.sin(angle) + center.y,
+                np.full(num_points, center.z, dtype=float),
+            ),
+            axis=-1,
+        )
+        return self.add_waypoints(pnts, max_forward_speed, heading_offset)
 
     def generate_helix(
         self,
@@ -415,12 +644,150 @@ class WaypointSet:
         total_angle = 2 * np.pi * num_turns
         step_angle = total_angle / num_points
         step_z = float(delta_z) / num_points
-        for i in range(num_points):
-            angle = theta_offset + i * step_angle
-            x = radius * np.cos(angle) + center.x
-            y = radius * np.sin(angle) + center.y
-            z = step_z * i + center.z
-
-            wp = Waypoint(x, y, z, max_forward_speed, heading_offset)
-            self.add_waypoint(wp)
-        return True
+        i = np.arange(num_points)
+        angle = theta_offset + i * step_angle
+        pnts = np.stack(
+            (
+                radius * np.cos(angle) + center.x,
+                radius * np.sin(angle) + center.y,
+                step_z * i + center.z,
+            ),
+            axis=-1,
+        )
+        return self.add_waypoints(pnts, max_forward_speed, heading_offset)
+
+    def generate_lawnmower(
+        self,
+        origin,
+        length,
+        width,
+        spacing,
+        max_forward_speed,
+        angle=0.0,
+        heading_offset=0.0,
+        append=False,
+    ):
+        """Generate a set of waypoints describing a lawnmower (boustrophedon)
+        survey pattern, made of parallel legs covering a rectangular area
+        and travelled in alternating directions
+
+        > *Input arguments*
+
+        * `origin` (*type:* `uuv_waypoints.Waypoint`): Corner of the area where the survey starts
+        * `length` (*type:* `float`): Length of each leg in meters
+        * `width` (*type:* `float`): Width of the area, perpendicular to the legs, in meters
+        * `spacing` (*type:* `float`): Distance between consecutive legs in meters
+        * `max_forward_speed` (*type:* `float`): Max. forward speed set to each waypoint in m/s
+        * `angle` (*type:* `float`, *default:* `0`): Direction of the legs in radians, the legs are stepped to the left of this direction
+        * `heading_offset` (*type:* `float`, *default:* `0`): Heading offset set to the reference heading of the vehicle in radians
+        * `append` (*type:* `bool`, *default:* `False`): If `True`, append the generated waypoints to the existent waypoints in the set
+
+        > *Returns*
+
+        `True` if the survey pattern was successfully generated, `False`, otherwise
+        """
+        if length <= 0:
+            print("Invalid leg length, value={}".format(length))
+            return False
+
+        if width < 0:
+            print("Invalid width, value={}".format(width))
+            return False
+
+        if spacing <= 0:
+            print("Invalid spacing between legs, value={}".format(spacing))
+            return False
+
+        if max_forward_speed <= 0:
+            print(
+                "Invalid absolute maximum velocity, value={}".format(max_forward_speed)
+            )
+            return False
+
+        if not append:
+            # Clear current list
+            self.clear_waypoints()
+
+        num_legs = int(np.floor(width / spacing + 1e-9)) + 1
+        # Start and end of each leg in the frame of the survey area, with
+        # every other leg reversed
+        along = np.tile([0.0, length], (num_legs, 1))
+        along[1::2] = along[1::2, ::-1]
+        across = np.repeat(spacing * np.arange(num_legs), 2)
+        along = along.flatten()
+
+        pnts = np.stack(
+            (
+                origin.x + np.cos(angle) * along - np.sin(angle) * across,
+                origin.y + np.sin(angle) * along + np.cos(angle) * across,
+                np.full(along.size, origin.z, dtype=float),
+            ),
+            axis=-1,
+        )
+        return self.add_waypoints(pnts, max_forward_speed, heading_offset)
+
+    def generate_spiral(
+        self,
+        center,
+        max_radius,
+        spacing,
+        num_points_per_turn,
+        max_forward_speed,
+        theta_offset=0.0,
+        heading_offset=0.0,
+        append=False,
+    ):
+        """Generate a set of waypoints describing an Archimedean spiral,
+        starting at the center and expanding with a constant distance between
+        consecutive turns
+
+        > *Input arguments*
+
+        * `center` (*type:* `uuv_waypoints.Waypoint`): Center of the spiral
+        * `max_radius` (*type:* `float`): Radius of the spiral's last point in meters
+        * `spacing` (*type:* `float`): Distance between consecutive turns in meters
+        * `num_points_per_turn` (*type:* `int`): Number of waypoints generated for each turn
+        * `max_forward_speed` (*type:* `float`): Max. forward speed set to each waypoint in m/s
+        * `theta_offset` (*type:* `float`, *default:* `0`): Angle offset to start generating the waypoints in radians
+        * `heading_offset` (*type:* `float`, *default:* `0`): Heading offset set to the reference heading of the vehicle in radians
+        * `append` (*type:* `bool`, *default:* `False`): If `True`, append the generated waypoints to the existent waypoints in the set
+
+        > *Returns*
+
+        `True` if the spiral was successfully generated, `False`, otherwise
+        """
+        if max_radius <= 0:
+            print("Invalid radius, value={}".format(max_radius))
+            return False
+
+        if spacing <= 0:
+            print("Invalid spacing between turns, value={}".format(spacing))
+            return False
+
+        if num_points_per_turn <= 0:
+            print("Invalid number of samples, value={}".format(num_points_per_turn))
+            return False
+
+        if max_forward_speed <= 0:
+            print(
+                "Invalid absolute maximum velocity, value={}".format(max_forward_speed)
+            )
+            return False
+
+        if not append:
+            # Clear current list
+            self.clear_waypoints()
+
+        num_turns = max_radius / spacing
+        num_points = int(np.ceil(num_turns * num_points_per_turn)) + 1
+        angle = np.linspace(0, 2 * np.pi * num_turns, num_points)
+        radius = spacing * angle / (2 * np.pi)
+        pnts = np.stack(
+            (
+                radius * np.cos(angle + theta_offset) + center.x,
+                radius * np.sin(angle + theta_offset) + center.y,
+                np.full(num_points, center.z, dtype=float),
+            ),
+            axis=-1,
+        )
+        return self.add_waypoints(pnts, max_forward_speed, heading_offset)